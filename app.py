@@ -1,8 +1,17 @@
+import os
 from dash import Dash, dcc, html
-from visualizations import viz1, viz2
-from callbacks import register_callbacks
+from callbacks import register_callbacks, prerender_tabs
+from tile_server import register_tile_routes
+from callback_cache import register_cache_routes
+from compression import register_compression
+from metrics import register_metrics_routes
+from profiling import register_profiling
+from memory_report import register_memory_routes
+from background_jobs import get_manager
+from data_reload import register_reload_watcher
+from export import register_export_routes
 
-app = Dash(__name__, suppress_callback_exceptions=True)
+app = Dash(__name__, suppress_callback_exceptions=True, background_callback_manager=get_manager())
 server = app.server
 
 app.layout = html.Div([
@@ -60,6 +69,8 @@ app.layout = html.Div([
     dcc.Loading(
         id="loading",
         type="default",
+        # Only the tab switch itself; the warm-up progress must stay visible
+        target_components={"tab-content": "children"},
         children=[
             html.Div([
                 html.Div(id="tab-content", className="content-container")
@@ -206,6 +217,21 @@ app.index_string = '''
 '''
 
 register_callbacks(app)
+register_tile_routes(app)
+register_cache_routes(app)
+register_compression(app)
+# Registered after compression so that its after_request hook sees the uncompressed payload
+register_metrics_routes(app)
+register_profiling(app)
+register_memory_routes(app)
+register_export_routes(app)
+
+# Opt-in warm-up: render every tab at boot so the first visits are served from cache
+if os.environ.get("PRERENDER_TABS", "").lower() in ("1", "true", "yes"):
+    prerender_tabs()
+
+# Picks up a new data file in the background, without restarting the workers
+register_reload_watcher(app)
 
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
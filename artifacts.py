@@ -0,0 +1,261 @@
+"""
+Build-time artifacts of the derived data
+`python artifacts.py` precomputes at deploy time everything the app otherwise
+computes on first use: a columnar snapshot of the prepared incidents, the
+district assignment, the aggregate cubes, the reduced map layers, the
+simplified geometry and the encoded static figures. Workers load them
+read-only, and only when they were built from the data being served
+
+Usage:
+    python artifacts.py
+    python artifacts.py --data data/actes-criminels.csv --geojson data/montreal.json --output /srv/artifacts
+
+The incidents CSV must be present at build time; without it nothing is built
+(and the command still succeeds), so the workers compute everything on first use
+
+Environment:
+    ARTIFACTS_DIR  Artifact directory read by the app (default <app>/artifacts)
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import pickle
+import platform
+import shutil
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+ARTIFACTS_DIR = os.environ.get("ARTIFACTS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "artifacts"))
+MANIFEST_NAME = "manifest.json"
+SNAPSHOT_NAME = "incidents.parquet"
+OBJECTS_DIR = "objects"
+GEOMETRY_DIR = "geometry"
+
+# Pickled pandas and numpy objects are only loaded by the versions that wrote them
+ENVIRONMENT = {
+    'python': platform.python_version(),
+    'pandas': pd.__version__,
+    'numpy': np.__version__,
+}
+
+_manifest = None
+_valid_versions = {}
+
+
+def _read_manifest() -> Optional[dict]:
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(os.path.join(ARTIFACTS_DIR, MANIFEST_NAME)) as f:
+                _manifest = json.load(f)
+        except (OSError, ValueError):
+            _manifest = {}
+    return _manifest or None
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def is_valid(data_path: str, data_version: str) -> bool:
+    """
+    Whether the artifacts were built from the served CSV, with the same library versions
+
+    The data version (mtime and size) is checked first; when only the mtime
+    differs, e.g. after the build output was copied, the content hash decides.
+    """
+    if data_version in _valid_versions:
+        return _valid_versions[data_version]
+
+    manifest = _read_manifest()
+    valid = False
+    if manifest is not None and manifest['environment'] == ENVIRONMENT:
+        if manifest['data_version'] == data_version:
+            valid = True
+        elif os.path.exists(data_path) and os.path.getsize(data_path) == manifest['data_size']:
+            valid = _file_digest(data_path) == manifest['data_sha256']
+    if manifest is not None:
+        if valid:
+            logger.info(f"Using the build artifacts in {ARTIFACTS_DIR} (built {manifest['created']})")
+        else:
+            logger.warning(f"Build artifacts in {ARTIFACTS_DIR} do not match the served data and are ignored")
+
+    _valid_versions[data_version] = valid
+    return valid
+
+
+def _current_data() -> tuple:
+    # Imported here: the data manager itself reads the snapshot from this module
+    from data_manager import data_manager
+    return data_manager.data_path, data_manager.get_data_version()
+
+
+def _object_path(directory: str, name: str, params: tuple) -> str:
+    suffix = hashlib.sha1(repr(params).encode()).hexdigest()[:12] if params else "all"
+    return os.path.join(directory, OBJECTS_DIR, f"{name}.{suffix}.pkl")
+
+
+def snapshot_path(data_path: str, data_version: str) -> Optional[str]:
+    """Columnar snapshot of the prepared incidents, None without valid artifacts"""
+    path = os.path.join(ARTIFACTS_DIR, SNAPSHOT_NAME)
+    if os.path.exists(path) and is_valid(data_path, data_version):
+        return path
+    return None
+
+
+def read_snapshot(path: str) -> pd.DataFrame:
+    """Reads the snapshot with the dtypes of the frame that was written"""
+    import pyarrow.parquet as pq
+
+    frame = pd.read_parquet(path)
+    # Text columns come back as str; those that were object columns stay object
+    object_columns = [
+        column['name'] for column in pq.read_schema(path).pandas_metadata['columns']
+        if column['numpy_type'] == "object" and column['name'] in frame
+    ]
+    return frame.astype({column: object for column in object_columns})
+
+
+def geometry_path(file_name: str) -> Optional[str]:
+    """Prebuilt simplified geometry file (named after its source digest), None if absent"""
+    path = os.path.join(ARTIFACTS_DIR, GEOMETRY_DIR, file_name)
+    return path if os.path.exists(path) else None
+
+
+def has(name: str, *params) -> bool:
+    path = _object_path(ARTIFACTS_DIR, name, params)
+    return os.path.exists(path) and is_valid(*_current_data())
+
+
+def load(name: str, *params):
+    """Artifact built for the served data, None if missing"""
+    path = _object_path(ARTIFACTS_DIR, name, params)
+    if not os.path.exists(path) or not is_valid(*_current_data()):
+        return None
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def _write(directory: str, name: str, value, *params):
+    path = _object_path(directory, name, params)
+    with open(path, "wb") as f:
+        pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+    logger.info(f"{name}{list(params) if params else ''}: {os.path.getsize(path) / 1e6:.2f} MB")
+
+
+def build(data_path: str, geojson_path: str, output: str) -> dict:
+    """
+    Computes every artifact from the CSV and montreal.json into output
+
+    The artifacts are written to a staging directory (so that nothing is read
+    back from a previous build) which then replaces output. The runtime caches
+    must be disabled before the app modules are imported, as main() does.
+    """
+    global ARTIFACTS_DIR
+
+    staging = f"{output.rstrip(os.sep)}.building"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(os.path.join(staging, OBJECTS_DIR))
+    ARTIFACTS_DIR = staging
+
+    os.environ["GEOMETRY_CACHE_DIR"] = os.path.join(staging, GEOMETRY_DIR)
+
+    from data_manager import data_manager
+    from serialization import encode
+    import callbacks
+    import geometry_manager
+    from visualizations import viz1, viz3, viz4, viz5
+
+    start = time.perf_counter()
+    data_manager.data_path = data_path
+    data_manager.raw_data = None
+    data_manager.data_version = None
+    viz3._cached_geojson_path = geojson_path
+
+    data_manager.load_raw_data()
+    data_manager.raw_data.to_parquet(os.path.join(staging, SNAPSHOT_NAME), index=False)
+    logger.info(f"Snapshot: {len(data_manager.raw_data)} rows")
+
+    _write(staging, "viz3.incidents", viz3.load_and_process_data())
+    _write(staging, "viz3.grouped_arrays", viz3.build_grouped_arrays())
+    for max_points in range(1, 6):
+        _write(staging, "viz3.reduced_data", viz3.precompute_reduced_data(max_points), max_points, None, None)
+    _write(staging, "viz3.grid_bins", viz3.precompute_grid_bins())
+    _write(staging, "viz4.summary", viz4.get_pdq_year_summary())
+    _write(staging, "viz5.cube", viz5.get_count_cube())
+
+    geometry_manager.build_all_levels(geojson_path)
+
+    for view in ("Yearly", "Seasonal", "Monthly"):
+        for chart_type in ("Line", "Bar"):
+            _write(staging, "viz1.figure", encode(viz1.update_graph(view, chart_type)), view, chart_type)
+    for tab in callbacks.TAB_IDS:
+        _write(staging, "tabs.content", encode(callbacks.build_tab_content(tab)), tab)
+
+    manifest = {
+        'created': datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        'data_version': data_manager.get_data_version(),
+        'data_size': os.path.getsize(data_path),
+        'data_sha256': _file_digest(data_path),
+        'rows': len(data_manager.raw_data),
+        'environment': ENVIRONMENT,
+        'build_seconds': round(time.perf_counter() - start, 2),
+    }
+    # Written last: a staging directory without manifest is never used
+    with open(os.path.join(staging, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    shutil.rmtree(output, ignore_errors=True)
+    os.replace(staging, output)
+    ARTIFACTS_DIR = output
+    return manifest
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--data", help="Incidents CSV (default: the file the app would serve)")
+    parser.add_argument("--geojson", help="montreal.json (default: the file the app would serve)")
+    parser.add_argument("--output", default=ARTIFACTS_DIR, help=f"Artifact directory (default: {ARTIFACTS_DIR})")
+    args = parser.parse_args(argv)
+
+    # Set before the app modules are imported: everything is computed here,
+    # not fetched from the runtime caches
+    os.environ["CALLBACK_CACHE_DISABLED"] = "1"
+    os.environ["BACKGROUND_CALLBACKS_DISABLED"] = "1"
+    logging.basicConfig(level=logging.INFO)
+    from data_manager import data_manager
+    from visualizations import viz3
+
+    data_path = args.data or data_manager.data_path
+    if not os.path.exists(data_path):
+        # A failed build would fail the deploy; the app still runs without artifacts
+        logger.warning(f"No incidents CSV at {data_path}: artifacts not built")
+        return 0
+
+    manifest = build(
+        data_path,
+        args.geojson or viz3._get_montreal_json_path(),
+        os.path.abspath(args.output),
+    )
+    print(f"Artifacts for {manifest['rows']} rows written to {args.output} in {manifest['build_seconds']} s")
+    return 0
+
+
+if __name__ == "__main__":
+    # Through the importable module, whose state the app modules share
+    import artifacts
+    sys.exit(artifacts.main())
@@ -0,0 +1,141 @@
+"""
+Background execution of the expensive first-time computations
+Dash background callbacks run in subprocesses managed by a DiskcacheManager, so
+that the spatial join, the reduced map layers, the viz4 summary and the viz5
+count cube never block a request thread. Their results are stored as artifacts
+in the same disk cache, keyed by data and app version, and reloaded by every worker
+instead of being recomputed. Without background callbacks, the same
+computations run in a thread of the worker while requests get a placeholder
+
+Environment:
+    BACKGROUND_CACHE_DIR           diskcache directory (default <tmp>/montreal_crimes_background)
+    BACKGROUND_CACHE_MAX_MB        Size limit of the disk cache (default 512)
+    BACKGROUND_CALLBACKS_DISABLED  Compute in worker threads, without shared artifacts
+"""
+
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Optional
+
+from dash import DiskcacheManager
+
+import artifacts
+import metrics
+from callback_cache import get_app_version
+from data_manager import data_manager
+
+try:
+    import diskcache
+except ImportError:
+    diskcache = None
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.environ.get("BACKGROUND_CACHE_DIR", os.path.join(tempfile.gettempdir(), "montreal_crimes_background"))
+MAX_BYTES = int(float(os.environ.get("BACKGROUND_CACHE_MAX_MB", 512)) * 1024 * 1024)
+DISABLED = os.environ.get("BACKGROUND_CALLBACKS_DISABLED", "").lower() in ("1", "true", "yes")
+
+# A job still holding its lock after this long is considered dead
+LOCK_EXPIRE_S = 600
+
+_cache = None
+_manager = None
+_threads = {}
+_threads_lock = threading.Lock()
+
+
+def get_cache():
+    """Disk cache shared by the jobs and the workers, None when disabled or unavailable"""
+    global _cache
+    if _cache is None and diskcache is not None and not DISABLED:
+        _cache = diskcache.Cache(CACHE_DIR, size_limit=MAX_BYTES)
+    return _cache
+
+
+def get_manager():
+    """Background callback manager of the app, None when background callbacks are unavailable"""
+    global _manager
+    if _manager is None and get_cache() is not None:
+        try:
+            _manager = DiskcacheManager(get_cache())
+        except ImportError as e:
+            # DiskcacheManager also needs psutil and multiprocess (dash[diskcache])
+            logger.warning(f"Background callbacks disabled: {e}")
+            return None
+    return _manager
+
+
+def is_enabled() -> bool:
+    return get_manager() is not None
+
+
+def _artifact_key(name: str, params, data_version: Optional[str] = None) -> tuple:
+    # The disk cache outlives deploys: a new release never reads what an older one computed
+    return ("artifact", name, get_app_version(), data_version or data_manager.get_data_version()) + tuple(params)
+
+
+def get_artifact(name: str, *params, data_version: Optional[str] = None):
+    """
+    Artifact built at deploy time or computed by any process, None if missing
+
+    Looked up for the current data version unless data_version is given.
+    """
+    if data_version is None:
+        value = artifacts.load(name, *params)
+        if value is not None:
+            return value
+    cache = get_cache()
+    if cache is None:
+        return None
+    value = cache.get(_artifact_key(name, params, data_version))
+    metrics.record_cache("background_artifact", value is not None)
+    return value
+
+
+def set_artifact(name: str, value, *params, data_version: Optional[str] = None):
+    cache = get_cache()
+    if cache is not None:
+        cache.set(_artifact_key(name, params, data_version), value, tag="artifact")
+
+
+def has_artifact(name: str, *params, data_version: Optional[str] = None) -> bool:
+    if data_version is None and artifacts.has(name, *params):
+        return True
+    cache = get_cache()
+    return cache is not None and _artifact_key(name, params, data_version) in cache
+
+
+@contextmanager
+def job_lock(name: str):
+    """Serializes the jobs computing the same artifacts across processes"""
+    cache = get_cache()
+    with (diskcache.Lock(cache, ("lock", name), expire=LOCK_EXPIRE_S) if cache is not None else nullcontext()):
+        yield
+
+
+def clear_artifacts():
+    cache = get_cache()
+    if cache is not None:
+        cache.evict("artifact")
+
+
+def run_in_thread(name: str, func: Callable):
+    """
+    Runs func in a daemon thread of this worker, off the request threads,
+    unless a thread of the same name is still running
+    """
+    def run():
+        try:
+            func()
+        except Exception:
+            logger.exception(f"Background computation {name} failed")
+
+    with _threads_lock:
+        thread = _threads.get(name)
+        if thread is not None and thread.is_alive():
+            return
+        _threads[name] = thread = threading.Thread(target=run, name=name, daemon=True)
+        thread.start()
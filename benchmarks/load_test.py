@@ -0,0 +1,429 @@
+"""
+Load test of the Dash callbacks under gunicorn
+Starts the app with each gunicorn configuration, replays realistic
+_dash-update-component requests (tab switches, viz2 slider sweeps, viz3 slider,
+viz4 filters) from concurrent asyncio clients, and reports throughput, latency
+percentiles and per-worker memory
+
+Usage:
+    python -m benchmarks.load_test --config 1x4 --config 2x2 --config 4x1
+    python -m benchmarks.load_test --config 2x4 --concurrency 32 --duration 60 --data benchmarks/data/actes-criminels-300000.csv
+    python -m benchmarks.load_test --url http://127.0.0.1:8050     # already running server
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from itertools import product
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Input values of every scenario, by "component.property"
+CRIME_TYPES = ["Motor Vehicle Theft", "Mischief", "Theft From/In Motor Vehicle",
+               "Breaking And Entering", "Robbery", "Offences Causing Death"]
+VIZ2_PDQS = ["All", 20, 21, 38, 44]
+VIZ2_YEAR_RANGES = [[2015, 2025], [2018, 2022], [2020, 2024], [2016, 2019], [2023, 2025]]
+VIZ4_YEAR_RANGES = [[2015, 2025], [2017, 2021], [2020, 2025]]
+VIZ4_DISTRICTS = [None, ["West"], ["East", "North"], ["East", "North", "South Central", "West"]]
+
+SCENARIOS = {
+    # Renders of warm tabs: before measuring, warm_up_tabs triggers the warm_up_tab
+    # background callback of each tab and polls it to completion, so the timings are
+    # those of the tab content and never of the warm-up placeholder
+    'tab_switch': [
+        {'tabs.value': tab} for tab in ("viz1", "viz2", "viz3", "viz4", "viz5")
+    ],
+    'viz2_sweep': [
+        {'pdq-dropdown.value': pdq, 'year-slider.value': years}
+        for pdq, years in product(VIZ2_PDQS, VIZ2_YEAR_RANGES)
+    ],
+    'viz3_slider': [
+        {'max-points-slider.value': points, 'map-mode.value': "points", 'map-viewport.data': None,
+         'map-year-range.value': [2015, 2025], 'map-crime-types.value': crime_types}
+        for points, crime_types in product(range(1, 6), [CRIME_TYPES, CRIME_TYPES[:2]])
+    ],
+    'viz4_filters': [
+        {'year-filter.value': years, 'district-filter.value': districts}
+        for years, districts in product(VIZ4_YEAR_RANGES, VIZ4_DISTRICTS)
+    ],
+}
+
+# Polling of the tab warm-ups before measuring: period, and consecutive renders
+# of a tab (across the workers) before it counts as warm
+WARM_UP_POLL_S = 0.5
+WARM_RENDERS = 10
+
+# Share of the traffic of each scenario
+SCENARIO_WEIGHTS = {'tab_switch': 0.3, 'viz2_sweep': 0.3, 'viz3_slider': 0.2, 'viz4_filters': 0.2}
+
+
+def _split_prop(prop_id: str):
+    component_id, prop = prop_id.rsplit(".", 1)
+    return component_id, prop
+
+
+def _find_dependency(dependencies: List[Dict], props) -> Optional[Dict]:
+    """Callback whose inputs are exactly props ("component.property")"""
+    return next(
+        (d for d in dependencies if {f"{i['id']}.{i['property']}" for i in d['inputs']} == set(props)), None
+    )
+
+
+def build_request_body(dependency: Dict, values: Dict) -> bytes:
+    outputs = [_split_prop(o) for o in dependency['output'].strip(".").split("...")]
+    output_specs = [{'id': i, 'property': p.split("@")[0]} for i, p in outputs]
+    body = {
+        'output': dependency['output'],
+        'outputs': output_specs if len(output_specs) > 1 else output_specs[0],
+        'inputs': [
+            {'id': i['id'], 'property': i['property'], 'value': values[f"{i['id']}.{i['property']}"]}
+            for i in dependency['inputs']
+        ],
+        'changedPropIds': [next(iter(values))],
+        'state': [{'id': s['id'], 'property': s['property']} for s in dependency.get('state', [])],
+    }
+    return json.dumps(body).encode()
+
+
+def build_request_bodies(dependencies: List[Dict]) -> Dict[str, List[bytes]]:
+    """
+    _dash-update-component bodies of every scenario, built against the
+    callback definitions served by /_dash-dependencies
+    """
+    return {
+        scenario: [build_request_body(_find_dependency(dependencies, values), values) for values in steps]
+        for scenario, steps in SCENARIOS.items()
+    }
+
+
+class HttpConnection:
+    """Minimal keep-alive HTTP/1.1 client on asyncio streams (no extra dependency)"""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def _connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+            self.reader = self.writer = None
+
+    async def post(self, path: str, body: bytes):
+        """Returns (status, response body length)"""
+        if self.writer is None:
+            await self._connect()
+        request = (
+            f"POST {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+            f"Content-Type: application/json\r\nAccept-Encoding: gzip, br\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n"
+        ).encode() + body
+        self.writer.write(request)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed by server")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            size = 0
+            while True:
+                chunk_size = int((await self.reader.readline()).split(b";")[0], 16)
+                await self.reader.readexactly(chunk_size + 2)
+                size += chunk_size
+                if chunk_size == 0:
+                    break
+        elif "content-length" in headers:
+            size = int(headers["content-length"])
+            await self.reader.readexactly(size)
+        else:
+            size = len(await self.reader.read())
+            headers["connection"] = "close"
+
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status, size
+
+
+async def _client(url: str, bodies: Dict[str, List[bytes]], deadline: float, samples: List, seed: int):
+    rng = random.Random(seed)
+    parts = urlsplit(url)
+    connection = HttpConnection(parts.hostname, parts.port or 80)
+    scenarios = list(SCENARIO_WEIGHTS)
+    weights = list(SCENARIO_WEIGHTS.values())
+    try:
+        while time.perf_counter() < deadline:
+            scenario = rng.choices(scenarios, weights)[0]
+            body = rng.choice(bodies[scenario])
+            start = time.perf_counter()
+            try:
+                status, size = await connection.post("/_dash-update-component", body)
+            except (ConnectionError, OSError, asyncio.IncompleteReadError, ValueError):
+                await connection.close()
+                status, size = 0, 0
+            samples.append((scenario, time.perf_counter() - start, status, size))
+    finally:
+        await connection.close()
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def summarize(samples: List, duration: float) -> Dict:
+    def stats(rows):
+        latencies = [latency for _, latency, status, _ in rows if status == 200]
+        return {
+            'requests': len(rows),
+            'errors': sum(1 for _, _, status, _ in rows if status != 200),
+            'throughput_rps': round(len(latencies) / duration, 2),
+            'p50_ms': round(_percentile(latencies, 50) * 1000, 1) if latencies else None,
+            'p95_ms': round(_percentile(latencies, 95) * 1000, 1) if latencies else None,
+            'p99_ms': round(_percentile(latencies, 99) * 1000, 1) if latencies else None,
+            'mean_ms': round(statistics.fmean(latencies) * 1000, 1) if latencies else None,
+            'mean_bytes': int(statistics.fmean(size for *_, size in rows)) if rows else 0,
+        }
+
+    report = stats(samples)
+    report['scenarios'] = {
+        scenario: stats([s for s in samples if s[0] == scenario]) for scenario in SCENARIOS
+    }
+    return report
+
+
+async def _run_load(url: str, bodies, concurrency: int, duration: float, seed: int) -> Dict:
+    samples = []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(_client(url, bodies, deadline, samples, seed + i) for i in range(concurrency)))
+    return summarize(samples, duration)
+
+
+def _get_json(url: str):
+    with urllib.request.urlopen(url, timeout=120) as response:
+        return json.loads(response.read())
+
+
+def _post(url: str, body: bytes, query: str = "") -> bytes:
+    request = urllib.request.Request(f"{url}/_dash-update-component{query}", data=body,
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=300) as response:
+        return response.read()
+
+
+def _is_placeholder(response: bytes) -> bool:
+    return b'"warmup-container"' in response
+
+
+def warm_up_tabs(url: str, dependencies: List[Dict], timeout: float = 600):
+    """
+    Warms every tab up as a browser would: triggers the warm_up_tab background
+    callback of each tab showing the placeholder and polls its job to completion.
+    Without background callbacks, the tab itself is requested until it renders,
+    WARM_RENDERS times in a row since each worker then warms up on its own.
+    """
+    deadline = time.time() + timeout
+    tab_dependency = _find_dependency(dependencies, ["tabs.value"])
+    warm_up_dependency = _find_dependency(dependencies, ["warmup-tab.data"])
+    for values in SCENARIOS['tab_switch']:
+        tab = values['tabs.value']
+        tab_body = build_request_body(tab_dependency, values)
+        if warm_up_dependency is not None and _is_placeholder(_post(url, tab_body)):
+            body = build_request_body(warm_up_dependency, {'warmup-tab.data': tab})
+            job = json.loads(_post(url, body))
+            query = f"?cacheKey={job['cacheKey']}&job={job['job']}"
+            while 'response' not in json.loads(_post(url, body, query)):
+                if time.time() > deadline:
+                    raise TimeoutError(f"Warm-up of {tab} not finished after {timeout} s")
+                time.sleep(WARM_UP_POLL_S)
+        renders = 0
+        while renders < WARM_RENDERS:
+            if _is_placeholder(_post(url, tab_body)):
+                if time.time() > deadline:
+                    raise TimeoutError(f"{tab} still warming up after {timeout} s")
+                renders = 0
+                time.sleep(WARM_UP_POLL_S)
+            else:
+                renders += 1
+
+
+def warm_up(url: str, bodies: Dict[str, List[bytes]]):
+    """Sends every request body once, so that measurements exclude the first cold computations"""
+    for scenario_bodies in bodies.values():
+        for body in scenario_bodies:
+            _post(url, body)
+
+
+def worker_memory(master_pid: int) -> Optional[Dict]:
+    """Resident memory of the gunicorn master and of each worker, in MB"""
+    if psutil is None or master_pid is None:
+        return None
+    try:
+        master = psutil.Process(master_pid)
+        workers = master.children()
+        return {
+            'master_mb': round(master.memory_info().rss / 1e6, 1),
+            'workers_mb': [round(worker.memory_info().rss / 1e6, 1) for worker in workers],
+        }
+    except psutil.Error:
+        return None
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(workers: int, threads: int, port: int, env: Dict[str, str], preload: bool, log_file):
+    command = [
+        sys.executable, "-m", "gunicorn", "app:server",
+        "--chdir", ROOT,
+        "--bind", f"127.0.0.1:{port}",
+        "--workers", str(workers),
+        "--threads", str(threads),
+        "--worker-class", "gthread" if threads > 1 else "sync",
+        "--timeout", "300",
+        "--log-level", "warning",
+    ]
+    if preload:
+        command.append("--preload")
+    # Logs go to a file: an undrained pipe would block the workers once full
+    return subprocess.Popen(command, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+
+
+def wait_until_ready(url: str, process, timeout: float = 300):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {process.returncode}")
+        try:
+            _get_json(f"{url}/_dash-dependencies")
+            return
+        except OSError:
+            time.sleep(0.5)
+    raise TimeoutError(f"{url} not ready after {timeout} s")
+
+
+def run_config(label: str, url: str, process, concurrency: int, duration: float, seed: int) -> Dict:
+    wait_until_ready(url, process)
+    dependencies = _get_json(f"{url}/_dash-dependencies")
+    bodies = build_request_bodies(dependencies)
+    warm_up_tabs(url, dependencies)
+    warm_up(url, bodies)
+    report = asyncio.run(_run_load(url, bodies, concurrency, duration, seed))
+    report['config'] = label
+    report['concurrency'] = concurrency
+    report['duration_s'] = duration
+    report['memory'] = worker_memory(process.pid if process is not None else None)
+    return report
+
+
+def print_report(reports: List[Dict]):
+    print(f"\n{'config':<14}{'rps':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}{'worker MB':>12}")
+    for report in reports:
+        memory = report.get('memory') or {}
+        workers_mb = memory.get('workers_mb') or []
+        worker_mb = f"{max(workers_mb):.0f}" if workers_mb else "-"
+        print(f"{report['config']:<14}{report['throughput_rps']:>8}{report['p50_ms'] or '-':>9}"
+              f"{report['p95_ms'] or '-':>9}{report['p99_ms'] or '-':>9}{report['errors']:>8}{worker_mb:>12}")
+
+
+def recommend(reports: List[Dict], p95_budget_ms: float) -> Optional[Dict]:
+    """Highest-throughput configuration without errors and within the p95 budget"""
+    eligible = [r for r in reports if not r['errors'] and r['p95_ms'] is not None and r['p95_ms'] <= p95_budget_ms]
+    return max(eligible, key=lambda r: r['throughput_rps']) if eligible else None
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--config", action="append", default=[],
+                        help="gunicorn WORKERSxTHREADS to test, repeatable (default: 1x4, 2x2, 4x1)")
+    parser.add_argument("--url", help="Test an already running server instead of starting gunicorn")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load per configuration")
+    parser.add_argument("--data", help="CSV served by the app (sets CRIMES_DATA_PATH)")
+    parser.add_argument("--preload", action="store_true", help="Start gunicorn with --preload")
+    parser.add_argument("--no-callback-cache", action="store_true",
+                        help="Disable the shared callback cache to measure computation under load")
+    parser.add_argument("--p95-budget", type=float, default=500, help="p95 budget in ms for the recommendation")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the reports as JSON to this path")
+    args = parser.parse_args(argv)
+
+    reports = []
+    if args.url:
+        reports.append(run_config(args.url, args.url.rstrip("/"), None, args.concurrency, args.duration, args.seed))
+    else:
+        env = dict(os.environ)
+        if args.data:
+            env["CRIMES_DATA_PATH"] = os.path.abspath(args.data)
+        if args.no_callback_cache:
+            env["CALLBACK_CACHE_DISABLED"] = "1"
+        for config in args.config or ["1x4", "2x2", "4x1"]:
+            workers, threads = (int(n) for n in config.lower().split("x"))
+            port = _free_port()
+            # Each configuration starts with an empty shared callback cache
+            env["CALLBACK_CACHE_DIR"] = os.path.join(tempfile.gettempdir(), f"montreal_crimes_load_test_{port}")
+            log_path = os.path.join(tempfile.gettempdir(), f"montreal_crimes_load_test_{port}.log")
+            log_file = open(log_path, "w")
+            process = start_gunicorn(workers, threads, port, env, args.preload, log_file)
+            try:
+                print(f"Testing {workers} workers x {threads} threads...")
+                reports.append(run_config(f"{workers}w x {threads}t", f"http://127.0.0.1:{port}",
+                                          process, args.concurrency, args.duration, args.seed))
+            except RuntimeError as e:
+                print(f"{e}; see {log_path}")
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+                log_file.close()
+
+    print_report(reports)
+    best = recommend(reports, args.p95_budget)
+    if best is not None:
+        print(f"\nBest within p95 <= {args.p95_budget:.0f} ms: {best['config']} "
+              f"({best['throughput_rps']} req/s, p95 {best['p95_ms']} ms)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(reports, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
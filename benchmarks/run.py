@@ -0,0 +1,205 @@
+"""
+Benchmark suite of the data and figure pipeline on synthetic data
+Times each step cold (its caches cleared before every run) and writes the
+results as JSON, optionally compared with a stored baseline
+
+Usage:
+    python -m benchmarks.run --scale 1x
+    python -m benchmarks.run --scale 10x --repeat 3 --output results-10x.json
+    python -m benchmarks.run --scale 1x --baseline benchmarks/baselines/1x.json --tolerance 0.25
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# Benchmarks measure computation, not the shared callback cache or background artifacts
+os.environ["CALLBACK_CACHE_DISABLED"] = "1"
+os.environ["BACKGROUND_CALLBACKS_DISABLED"] = "1"
+sys.path.insert(0, ROOT)
+
+from benchmarks import synthetic_data  # noqa: E402
+
+
+def _use_dataset(csv_path: str):
+    from data_manager import data_manager
+    data_manager.data_path = csv_path
+    data_manager.raw_data = None
+    data_manager.data_version = None
+    data_manager.clear_cache()
+
+
+def _clear_filtered():
+    from data_manager import data_manager
+    data_manager.clear_cache()
+
+
+def _clear_viz3_working_set():
+    from visualizations import viz3
+    viz3._cached_reduced_data = {}
+    viz3._cached_grouped_arrays = None
+    viz3._cached_grid_bins = None
+
+
+def _clear_viz3():
+    from visualizations import viz3
+    viz3._cached_data = None
+    _clear_viz3_working_set()
+
+
+def build_benchmarks(csv_path: str):
+    """
+    (name, setup, run) of every benchmark; setup runs untimed before each run
+    """
+    import plotly.graph_objects as go
+    from data_manager import data_manager
+    from callbacks import get_viz2_figures
+    from visualizations import viz1, viz3, viz4, viz5
+
+    base_map = {}
+
+    def setup_traces():
+        _clear_viz3_working_set()
+        viz3.load_and_process_data()
+        base_map['fig'] = go.Figure(viz3.create_initial_figure())
+
+    return [
+        ("load_raw_data", lambda: None, lambda: data_manager.load_raw_data(force_reload=True)),
+        ("get_filtered_data", _clear_filtered,
+         lambda: data_manager.get_filtered_data(start_year=2018, end_year=2022, pdq=38)),
+        ("viz1.update_graph", lambda: None, lambda: viz1.update_graph("Monthly", "Line")),
+        # Undecorated body of the update_all_charts callback
+        ("update_all_charts", _clear_filtered, lambda: get_viz2_figures.__wrapped__("All", [2016, 2024])),
+        ("viz3.load_and_process_data", _clear_viz3, viz3.load_and_process_data),
+        ("viz3.update_crime_traces", setup_traces, lambda: viz3.update_crime_traces(base_map['fig'], 3)),
+        ("viz4.create_scatter_plot", lambda: viz4._cached_summary.clear(), lambda: viz4.create_scatter_plot()),
+        ("viz5.get_heatmap_data", lambda: viz5._cached_cube.clear(), lambda: viz5.get_heatmap_data(None, (2016, 2024))),
+    ]
+
+
+def run_benchmark(setup, run, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        setup()
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return {
+        'min_s': round(min(timings), 6),
+        'median_s': round(statistics.median(timings), 6),
+        'mean_s': round(statistics.fmean(timings), 6),
+        'repeat': repeat,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(scale: str, repeat: int, rows=None, only=None):
+    rows = rows or synthetic_data.scale_rows(scale)
+    csv_path = os.path.join(DATA_DIR, f"actes-criminels-{rows}.csv")
+    if not os.path.exists(csv_path):
+        print(f"Generating {rows} synthetic rows in {csv_path}...")
+        synthetic_data.generate(csv_path, rows, synthetic_data.default_geojson_path())
+
+    _use_dataset(csv_path)
+
+    import numpy as np
+    import pandas as pd
+    import plotly
+
+    results = {}
+    for name, setup, run in build_benchmarks(csv_path):
+        if only and name not in only:
+            continue
+        setup()
+        run()  # warm-up: imports and first load
+        results[name] = run_benchmark(setup, run, repeat)
+        print(f"{name:<30}{results[name]['median_s']:>10.4f} s")
+
+    return {
+        'meta': {
+            'scale': scale,
+            'rows': rows,
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'plotly': plotly.__version__,
+        },
+        'results': results,
+    }
+
+
+def compare(report, baseline, tolerance: float):
+    """
+    Median time ratio of every benchmark against the baseline
+
+    Returns:
+        Names of the benchmarks slower than the baseline by more than tolerance
+    """
+    regressions = []
+    print(f"\n{'benchmark':<30}{'median':>10}{'baseline':>10}{'ratio':>8}")
+    for name, result in report['results'].items():
+        reference = baseline['results'].get(name)
+        if reference is None:
+            print(f"{name:<30}{result['median_s']:>10.4f}{'-':>10}{'-':>8}")
+            continue
+        ratio = result['median_s'] / reference['median_s'] if reference['median_s'] else float("inf")
+        flag = ""
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<30}{result['median_s']:>10.4f}{reference['median_s']:>10.4f}{ratio:>8.2f}{flag}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", choices=sorted(synthetic_data.SCALES), default="1x")
+    parser.add_argument("--rows", type=int, help="Exact number of synthetic rows (overrides --scale)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="*", help="Benchmarks to run (default: all)")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<scale>.json)")
+    parser.add_argument("--baseline", help="Baseline results to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown of the median before failing (default: 0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.scale, args.repeat, args.rows, args.only)
+
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", f"{args.scale}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"Slower than baseline by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""
+Synthetic actes-criminels generator
+Writes a CSV with the schema of the published dataset (CATEGORIE, DATE, QUART,
+PDQ, X, Y, LONGITUDE, LATITUDE) and roughly its distributions, at a multiple of
+the current volume
+
+Usage:
+    python -m benchmarks.synthetic_data --scale 10x --output benchmarks/data/actes-criminels-10x.csv
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Approximate size of the published dataset (2015 onwards)
+BASE_ROWS = 300_000
+SCALES = {"1x": 1, "10x": 10, "100x": 100}
+
+CATEGORY_WEIGHTS = {
+    "Vol dans / sur véhicule à moteur": 0.30,
+    "Introduction": 0.23,
+    "Méfait": 0.22,
+    "Vol de véhicule à moteur": 0.195,
+    "Vols qualifiés": 0.054,
+    "Infractions entrainant la mort": 0.001,
+}
+
+QUART_WEIGHTS = {"jour": 0.48, "soir": 0.35, "nuit": 0.17}
+
+# More incidents in summer and early fall
+MONTH_WEIGHTS = np.array([7.2, 6.6, 7.6, 7.9, 8.7, 8.9, 9.3, 9.3, 9.0, 9.1, 8.4, 8.0])
+
+PDQS = [1, 3, 4, 5, 7, 8, 9, 10, 11, 12, 13, 15, 16, 20, 21, 22, 23, 26, 27,
+        30, 31, 35, 38, 39, 42, 44, 45, 46, 48, 49, 50, 55]
+
+FIRST_DAY = pd.Timestamp("2015-01-01")
+LAST_DAY = pd.Timestamp("2025-06-30")
+
+# Shares of rows without a PDQ and without a location (LONGITUDE/LATITUDE = 1, X/Y = 0)
+MISSING_PDQ = 0.001
+MISSING_LOCATION = 0.12
+
+
+def scale_rows(scale: str) -> int:
+    return BASE_ROWS * SCALES[scale]
+
+
+def district_centers(geojson_path: str) -> np.ndarray:
+    """(lon, lat) of every district of montreal.json, as the mean of its vertices"""
+    with open(geojson_path) as f:
+        features = json.load(f)["features"]
+
+    centers = []
+    for feature in features:
+        geometry = feature["geometry"]
+        polygons = geometry["coordinates"] if geometry["type"] == "MultiPolygon" else [geometry["coordinates"]]
+        vertices = np.concatenate([np.asarray(polygon[0])[:, :2] for polygon in polygons])
+        centers.append(vertices.mean(axis=0))
+    return np.array(centers)
+
+
+def _choice(rng, weights: dict, n: int) -> np.ndarray:
+    values = np.array(list(weights), dtype=object)
+    p = np.array(list(weights.values()), dtype=float)
+    return values[rng.choice(len(values), n, p=p / p.sum())]
+
+
+def generate_chunk(rng, n: int, centers: np.ndarray, pdq_weights: np.ndarray) -> pd.DataFrame:
+    """n synthetic incidents"""
+    days = pd.date_range(FIRST_DAY, LAST_DAY, freq="D")
+    day_weights = MONTH_WEIGHTS[days.month - 1]
+    dates = days[rng.choice(len(days), n, p=day_weights / day_weights.sum())]
+
+    pdq = np.array(PDQS, dtype=float)[rng.choice(len(PDQS), n, p=pdq_weights)]
+    pdq[rng.random(n) < MISSING_PDQ] = np.nan
+
+    center = centers[rng.integers(0, len(centers), n)]
+    lon = center[:, 0] + rng.normal(0, 0.012, n)
+    lat = center[:, 1] + rng.normal(0, 0.008, n)
+    # Rough MTM zone 8 projection, enough for a realistic X/Y column
+    x = 304800 + (lon + 73.5) * 78000
+    y = 5040000 + (lat - 45.5) * 111100
+
+    missing = rng.random(n) < MISSING_LOCATION
+    lon[missing], lat[missing] = 1.0, 1.0
+    x[missing], y[missing] = 0.0, 0.0
+
+    return pd.DataFrame({
+        "CATEGORIE": _choice(rng, CATEGORY_WEIGHTS, n),
+        "DATE": dates.strftime("%Y-%m-%d"),
+        "QUART": _choice(rng, QUART_WEIGHTS, n),
+        "PDQ": pdq,
+        "X": np.round(x, 3),
+        "Y": np.round(y, 3),
+        "LONGITUDE": np.round(lon, 7),
+        "LATITUDE": np.round(lat, 7),
+    })
+
+
+def generate(output_path: str, rows: int, geojson_path: str, seed: int = 42, chunk_size: int = 1_000_000) -> str:
+    """
+    Writes rows synthetic incidents to output_path, chunk by chunk so that the
+    100x volume does not have to fit in memory
+
+    Returns:
+        output_path
+    """
+    rng = np.random.default_rng(seed)
+    centers = district_centers(geojson_path)
+    pdq_weights = rng.dirichlet(np.full(len(PDQS), 4.0))
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    tmp_path = f"{output_path}.tmp"
+    written = 0
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        while written < rows:
+            n = min(chunk_size, rows - written)
+            generate_chunk(rng, n, centers, pdq_weights).to_csv(f, index=False, header=written == 0)
+            written += n
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def default_geojson_path() -> str:
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "montreal.json")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", choices=sorted(SCALES), default="1x")
+    parser.add_argument("--rows", type=int, help="Exact number of rows (overrides --scale)")
+    parser.add_argument("--output", required=True, help="CSV file to write")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--geojson", default=default_geojson_path(), help="montreal.json used to place incidents")
+    args = parser.parse_args(argv)
+
+    rows = args.rows or scale_rows(args.scale)
+    generate(args.output, rows, args.geojson, args.seed)
+    print(f"Wrote {rows} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+Callback output memoization shared by every gunicorn worker of a machine
+Outputs are keyed on the callback name, its inputs, the data version and the app version, stored as JSON in a size-bounded local backend, and
+hit/miss counters are exposed on /cache/stats
+
+Environment:
+    CALLBACK_CACHE_DIR       Directory of the shared cache (default <tmp>/montreal_crimes_callback_cache)
+    CALLBACK_CACHE_MAX_MB    Size limit of the directory (default 256)
+    CALLBACK_CACHE_DISABLED  Run every callback without the cache
+    APP_VERSION              Release identifier (default: a hash of the app's source files)
+"""
+
+import functools
+import glob
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Optional
+
+from flask import jsonify
+import metrics
+from data_manager import data_manager
+from serialization import decode, encode
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "montreal_crimes_callback_cache")
+DEFAULT_MAX_MB = 256
+
+# The directory is rescanned at least this often to account for the writes of other workers
+RESCAN_INTERVAL_S = 30
+
+# Eviction brings the directory down to this share of max_bytes
+EVICTION_TARGET = 0.9
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class FileSystemCache:
+    """
+    Size-bounded key/value store in a local directory
+
+    Every worker process opening the same directory shares the entries.
+    Writes are atomic (temporary file + rename); when the directory grows
+    beyond max_bytes, the least recently used entries are deleted. The size
+    is tracked incrementally from this process's writes and resynchronized
+    by a scan every RESCAN_INTERVAL_S, so a write does not list the directory.
+    A cache daemon client with the same get/set/clear/info methods can replace it.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._bytes = None
+        self._scanned_at = 0.0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = f.read()
+            os.utime(path)  # mtime doubles as last access time for LRU eviction
+            return value
+        except OSError:
+            return None
+
+    def set(self, key: str, value: bytes):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(value)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Callback cache write failed for {path}: {e}")
+            return
+
+        with self._lock:
+            if self._bytes is None or time.monotonic() - self._scanned_at > RESCAN_INTERVAL_S:
+                self._bytes = sum(size for _, size, _ in self._entries())
+                self._scanned_at = time.monotonic()
+            else:
+                self._bytes += len(value) - replaced
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _evict(self) -> int:
+        """Deletes the least recently used entries down to EVICTION_TARGET of max_bytes"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes * EVICTION_TARGET:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                evicted += 1
+            except OSError:
+                pass
+        if evicted:
+            _stats["_backend"]["evictions"] += evicted
+        self._bytes = total
+        self._scanned_at = time.monotonic()
+        return evicted
+
+    def clear(self):
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with self._lock:
+            self._bytes = None
+
+    def info(self) -> Dict[str, Any]:
+        entries = self._entries()
+        return {
+            'backend': 'filesystem',
+            'directory': self.directory,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+        }
+
+
+_stats = defaultdict(lambda: defaultdict(int))
+_backend = None
+_app_version = None
+
+
+def get_backend() -> Optional[FileSystemCache]:
+    """Backend configured from CALLBACK_CACHE_DIR / CALLBACK_CACHE_MAX_MB (None when disabled)"""
+    global _backend
+    if os.environ.get("CALLBACK_CACHE_DISABLED", "").lower() in ("1", "true", "yes"):
+        return None
+    if _backend is None:
+        _backend = FileSystemCache(
+            os.environ.get("CALLBACK_CACHE_DIR", DEFAULT_CACHE_DIR),
+            int(float(os.environ.get("CALLBACK_CACHE_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024),
+        )
+    return _backend
+
+
+def get_app_version() -> str:
+    """
+    APP_VERSION, or a digest of the app's Python sources: a deploy that changes
+    a callback's output never reads the entries persisted by the previous one
+    """
+    global _app_version
+    if _app_version is None:
+        _app_version = os.environ.get("APP_VERSION")
+    if _app_version is None:
+        digest = hashlib.sha256()
+        sources = glob.glob(os.path.join(APP_DIR, "*.py")) + glob.glob(os.path.join(APP_DIR, "visualizations", "*.py"))
+        for path in sorted(sources):
+            digest.update(os.path.relpath(path, APP_DIR).encode())
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        _app_version = digest.hexdigest()[:16]
+    return _app_version
+
+
+def make_key(name: str, args, kwargs) -> str:
+    payload = json.dumps(
+        [name, get_app_version(), data_manager.get_data_version(), args, kwargs],
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def memoize(name: str) -> Callable:
+    """
+    Memoizes a callback (or the pure function behind it) in the shared backend
+
+    On a hit the output is returned as decoded JSON (plain dicts/lists),
+    which Dash sends unchanged; no_update and exceptions are never cached.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            backend = get_backend()
+            if backend is None:
+                return func(*args, **kwargs)
+
+            key = make_key(name, args, kwargs)
+            cached = backend.get(key)
+            if cached is not None:
+                _stats[name]["hits"] += 1
+                metrics.record_cache(f"callback:{name}", True)
+                return decode(cached)
+
+            _stats[name]["misses"] += 1
+            metrics.record_cache(f"callback:{name}", False)
+            result = func(*args, **kwargs)
+
+            from dash import no_update
+            if result is no_update or (isinstance(result, (list, tuple)) and any(r is no_update for r in result)):
+                return result
+
+            backend.set(key, encode(result))
+            return result
+        return wrapper
+    return decorator
+
+
+def get_stats() -> Dict[str, Any]:
+    """Hit/miss counters of this worker per memoized callback, and backend usage"""
+    callbacks = {}
+    for name, counters in _stats.items():
+        if name.startswith("_"):
+            continue
+        lookups = counters["hits"] + counters["misses"]
+        callbacks[name] = {
+            'hits': counters["hits"],
+            'misses': counters["misses"],
+            'hit_rate': round(counters["hits"] / lookups, 4) if lookups else None,
+        }
+    backend = get_backend()
+    return {
+        'pid': os.getpid(),
+        'callbacks': callbacks,
+        'app_version': get_app_version(),
+        'evictions': _stats["_backend"]["evictions"],
+        'backend': backend.info() if backend is not None else None,
+    }
+
+
+def clear_cache():
+    """Deletes every shared entry (all workers) and resets local counters"""
+    backend = get_backend()
+    if backend is not None:
+        backend.clear()
+    _stats.clear()
+
+
+def register_cache_routes(app):
+    """Registers the cache statistics endpoint on the Flask server of the Dash app"""
+
+    @app.server.route("/cache/stats")
+    def callback_cache_stats():
+        return jsonify(get_stats())
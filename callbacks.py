@@ -1,9 +1,288 @@
-from dash import Input, Output, html, dcc
+from dash import Input, Output, State, html, dcc, no_update
 import visualizations.viz1 as viz1
 import visualizations.viz2 as viz2
 import visualizations.viz3 as viz3
 import visualizations.viz4 as viz4
 import visualizations.viz5 as viz5
+from data_manager import data_manager
+from callback_cache import memoize
+import background_jobs
+from serialization import decode, encode
+import artifacts
+import metrics
+
+TAB_IDS = ["viz1", "viz2", "viz3", "viz4", "viz5"]
+
+_tab_content_cache = {}
+
+# Data version each tab was warmed up for in this worker, and the progress of running warm-ups
+_warm_tabs = {}
+_warm_up_progress = {}
+
+# Polling period of the placeholder when the warm-up runs in a worker thread
+WARMUP_POLL_MS = 1000
+
+# Expensive first-time computations of each tab: (progress label, artifact, step).
+# They run in a background callback (or, without one, in a thread of the worker)
+# until their artifacts exist for the data version; requests get a placeholder meanwhile.
+WARMUP_STEPS = {
+    "viz3": [
+        ("Loading the incidents", None, data_manager.load_raw_data),
+        ("Assigning incidents to districts (spatial join)", "viz3.incidents", viz3.load_and_process_data),
+        ("Grouping incidents by year and crime type", "viz3.grouped_arrays", viz3.build_grouped_arrays),
+        ("Reducing the map layers", None, lambda: viz3.precompute_reduced_data(viz3.DEFAULT_MAX_POINTS)),
+    ],
+    "viz4": [
+        ("Loading the incidents", None, data_manager.load_raw_data),
+        ("Summarizing crimes per PDQ and year", "viz4.summary", viz4.get_pdq_year_summary),
+    ],
+    "viz5": [
+        ("Loading the incidents", None, data_manager.load_raw_data),
+        ("Counting crimes per time dimension", "viz5.cube", viz5.get_count_cube),
+    ],
+}
+
+def build_tab_content(tab):
+    """Builds the component tree of a tab (header, description and viz layout)"""
+    content_style = {
+        "animation": "fadeIn 0.5s ease-in-out",
+        "width": "100%"
+    }
+
+    if tab == "viz1":
+        return html.Div([
+            html.Div([
+                html.H3("Visualization 1", 
+                       style={
+                           "color": "#2c3e50", 
+                           "marginBottom": "20px",
+                           "borderBottom": "3px solid #2c3e50",
+                           "paddingBottom": "10px",
+                           "fontSize": "28px",
+                           "fontWeight": "600"
+                       }),
+                html.P("The first visualization is an interactive chart (toggle between line and bar chart). It visualises the total number of crimes recorded, segmented by year, season, or month. The x axis represents the selected time unit, while the y axis shows the number of crimes. Each bar or line point corresponds to the number of crimes during that time period. A dashed red line represents the median crime count across the selected timeframe. This helps compare data points above or below the midpoint. The legend clearly differentiates between the crime data and the median line. ",
+                       style={"color": "#6c757d", "fontSize": "16px", "marginBottom": "30px"}),
+            ]),
+            viz1.layout()
+        ], style=content_style)
+
+    elif tab == "viz2":
+        return html.Div([
+            html.Div([
+                html.H3("Visualization 2", 
+                       style={
+                           "color": "#2c3e50", 
+                           "marginBottom": "20px",
+                           "borderBottom": "3px solid #2c3e50",
+                           "paddingBottom": "10px",
+                           "fontSize": "28px",
+                           "fontWeight": "600"
+                       }),
+                html.P("​​This visualization explores how crime in Montreal has changed over time, focusing on three key aspects: time of day, day of the week, and long-term trends in night-time activity. It consists of three connected charts that highlight different dimensions of temporal crime data from 2015 to 2025.",
+                       style={"color": "#6c757d", "fontSize": "16px", "marginBottom": "30px"}),
+            ]),
+            viz2.layout()
+        ], style=content_style)
+
+    elif tab == "viz3":
+        return html.Div([
+            html.Div([
+                html.H3("Visualization 3", 
+                       style={
+                           "color": "#2c3e50", 
+                           "marginBottom": "20px",
+                           "borderBottom": "3px solid #2c3e50",
+                           "paddingBottom": "10px",
+                           "fontSize": "28px",
+                           "fontWeight": "600"
+                       }),
+                html.P("This type of visualization is called a scatter_mapbox created with Plotly, which displays the geographical distribution of various crime types across the city of Montreal. Each dot represents an individual criminal  incident, where the color indicates the type of crime. The visualization uses Mapbox to provide an interactive, zoomable map overlaid with spatial crime data.",
+                       style={"color": "#6c757d", "fontSize": "16px", "marginBottom": "30px"}),
+            ]),
+            viz3.layout()
+        ], style=content_style)
+
+    elif tab == "viz4":
+        return html.Div([
+            html.Div([
+                html.H3("Visualization 4", 
+                       style={
+                           "color": "#2c3e50", 
+                           "marginBottom": "20px",
+                           "borderBottom": "3px solid #2c3e50",
+                           "paddingBottom": "10px",
+                           "fontSize": "28px",
+                           "fontWeight": "600"
+                       }),
+                html.Div([
+                    html.P("This visualization, consisting of a temporal scatter plot, offers a perspective on the evolution of crime across Montreal's different police districts, allowing users to simultaneously visualize the temporal, geographical, and typological dimensions of criminal acts.",
+                           style={"color": "#6c757d", "fontSize": "16px", "marginBottom": "15px", "lineHeight": "1.6"}),
+
+                    html.P("It comprises a multidimensional scatter plot where the x-axis represents temporal progression from 2015 to 2025, while the y-axis displays the various police districts (PDQs), that have a range from 1 to 55. Each point corresponds to a specific district for a given year, creating a visual of criminal activities across time and Montreal's different police districts.",
+                           style={"color": "#6c757d", "fontSize": "16px", "marginBottom": "15px", "lineHeight": "1.6"}),
+
+                    html.P([
+                        "The color dimension encodes the dominant crime type in each district for the corresponding year, revealing four main categories: ",
+                        html.Strong('"Breaking And Entering"', style={"color": "#495057"}),
+                        " (introduction), ",
+                        html.Strong('"Theft From/In Motor Vehicle"', style={"color": "#495057"}),
+                        " (vol dans/sur véhicule), ",
+                        html.Strong('"Motor Vehicle Theft"', style={"color": "#495057"}),
+                        " (vol de véhicule), and ",
+                        html.Strong('"Mischief"', style={"color": "#495057"}),
+                        " (méfait, vandalism)."
+                    ], style={"color": "#6c757d", "fontSize": "16px", "marginBottom": "15px", "lineHeight": "1.6"}),
+
+                    html.P("The size of the points adds dimension, which is proportional to the total number of crimes recorded in the concerned district for the specific year. This visual allows easy identification of zones and periods of high criminal activity.",
+                           style={"color": "#6c757d", "fontSize": "16px", "marginBottom": "15px", "lineHeight": "1.6"}),
+
+                    html.P("This visualization thus allows users to explore criminal patterns along three analytical axes: the temporal evolution of crimes, distribution by district, and by type of offense.",
+                           style={"color": "#6c757d", "fontSize": "16px", "marginBottom": "30px", "lineHeight": "1.6", "fontWeight": "500"})
+                ], style={
+                    "marginBottom": "25px"
+                })
+            ]),
+            viz4.layout()
+        ], style=content_style)
+
+    elif tab == "viz5":
+        return html.Div([
+            html.Div([
+                html.H3("Visualization 5", 
+                       style={
+                           "color": "#2c3e50", 
+                           "marginBottom": "20px",
+                           "borderBottom": "3px solid #2c3e50",
+                           "paddingBottom": "10px",
+                           "fontSize": "28px",
+                           "fontWeight": "600"
+                       }),
+                html.Div([
+                    html.P("This interactive visualization presents three different perspectives on crime patterns in Montreal, helping us to better understand when certain crimes happen most frequently. Each heatmap uses the same color scale to keep comparisons fair: the darker the cell, the higher the number of crimes.",
+                           style={"color": "#6c757d", "fontSize": "16px", "marginBottom": "15px", "lineHeight": "1.6"}),
+
+                    html.P([
+                        html.Strong("By Time of Day:", style={"color": "#495057"}),
+                        " This view compares crime types based on whether they occur during the day, evening or night. We can clearly see which types of crimes are more common at different moments of the day, highlighting the importance of time in criminal activity patterns."
+                    ], style={"color": "#6c757d", "fontSize": "16px", "marginBottom": "15px", "lineHeight": "1.6"}),
+
+                    html.P([
+                        html.Strong("By Season:", style={"color": "#495057"}),
+                        " This graph shows how crime activity changes with the seasons (winter, spring, summer and fall). Some crimes appear to spike in warmer months, while others are more consistent year-round."
+                    ], style={"color": "#6c757d", "fontSize": "16px", "marginBottom": "15px", "lineHeight": "1.6"}),
+
+                    html.P([
+                        html.Strong("By Year:", style={"color": "#495057"}),
+                        " This final view lets us observe how each crime type has evolved over time. It's especially useful for spotting long-term trends, such as increases, decreases or stability over time."
+                    ], style={"color": "#6c757d", "fontSize": "16px", "marginBottom": "30px", "lineHeight": "1.6"})
+                ], style={
+                    "marginBottom": "25px"
+                })
+            ]),
+            viz5.layout()
+        ], style=content_style)
+
+def get_tab_content(tab):
+    """
+    Tab component tree, rendered once per tab and data version
+
+    Cached as plain JSON (dicts and lists), which Dash encodes without
+    walking the component objects again.
+    """
+    cache_key = (tab, data_manager.get_data_version())
+    metrics.record_cache("tab_content", cache_key in _tab_content_cache)
+    if cache_key not in _tab_content_cache:
+        encoded = artifacts.load("tabs.content", tab)
+        _tab_content_cache[cache_key] = decode(encoded if encoded is not None else encode(build_tab_content(tab)))
+    return _tab_content_cache[cache_key]
+
+def is_tab_warm(tab):
+    """Whether a tab can be rendered without its expensive first-time computations"""
+    data_version = data_manager.get_data_version()
+    if (tab, data_version) in _tab_content_cache or _warm_tabs.get(tab) == data_version:
+        return True
+    return all(background_jobs.has_artifact(artifact) for _, artifact, _ in WARMUP_STEPS[tab] if artifact)
+
+def build_warmup_placeholder(tab):
+    """Progress view shown while the warm_up_tab background callback prepares a tab"""
+    steps = WARMUP_STEPS[tab]
+    # Without background callbacks, the placeholder polls the warm-up thread (see poll_warm_up)
+    poll = [] if background_jobs.is_enabled() else [dcc.Interval(id="warmup-poll", interval=WARMUP_POLL_MS)]
+    return html.Div(id="warmup-container", children=poll + [
+        dcc.Store(id="warmup-tab", data=tab),
+        html.Div([
+            html.H4("Preparing this visualization for its first display...",
+                    style={"color": "#2c3e50", "marginBottom": "15px"}),
+            html.Progress(id="warmup-progress", value="0", max=str(len(steps)),
+                          style={"width": "60%", "height": "18px"}),
+            html.P(steps[0][0], id="warmup-status", style={"color": "#6c757d", "marginTop": "10px"})
+        ], style={"padding": "60px 20px", "textAlign": "center"})
+    ])
+
+def run_warm_up_steps(tab, set_progress):
+    """Runs the first-time computations of a tab, reporting each step"""
+    steps = WARMUP_STEPS[tab]
+    data_version = data_manager.get_data_version()
+    # A second job for the same tab waits, then finds the artifacts of the first one
+    with background_jobs.job_lock(f"warmup:{tab}"):
+        for i, (label, _, step) in enumerate(steps):
+            set_progress((str(i), str(len(steps)), label))
+            step()
+    set_progress((str(len(steps)), str(len(steps)), "Rendering"))
+    _warm_tabs[tab] = data_version
+
+def warm_up_tab(set_progress, tab):
+    """Background callback: warms a tab up, then renders it"""
+    run_warm_up_steps(tab, set_progress)
+    return get_tab_content(tab)
+
+def start_warm_up(tab):
+    """Warms a tab up in a thread of this worker (used without background callbacks)"""
+    background_jobs.run_in_thread(
+        f"warmup:{tab}", lambda: run_warm_up_steps(tab, lambda progress: _warm_up_progress.__setitem__(tab, progress))
+    )
+
+def prerender_tabs():
+    """Renders every tab ahead of the first request (worker warm-up)"""
+    for tab in TAB_IDS:
+        get_tab_content(tab)
+
+def clear_tab_cache():
+    _tab_content_cache.clear()
+
+@memoize("update_viz1_graph")
+def get_viz1_figure(view, chart_type):
+    return viz1.get_graph_figure(view, chart_type)
+
+@memoize("update_all_charts")
+def get_viz2_figures(selected_pdq, selected_years):
+    """Bar, pie and line charts of viz2 for a PDQ and year range"""
+    start_year, end_year = selected_years
+    pdq_value = None if selected_pdq == "All" else selected_pdq
+
+    filtered_df = viz2.filter_data(start_year, end_year, pdq=pdq_value)
+
+    bar_fig = viz2.create_bar_chart(filtered_df)
+    pie_fig = viz2.create_pie_chart(filtered_df)
+    line_fig = viz2.create_line_chart(filtered_df)
+    
+    for fig in [bar_fig, pie_fig, line_fig]:
+        fig.update_layout(
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            font=dict(family="Segoe UI, Roboto, Helvetica Neue", size=12),
+            margin=dict(l=40, r=40, t=60, b=40),
+            title=dict(font=dict(size=18, color="#2c3e50")),
+            legend=dict(
+                bgcolor="rgba(255,255,255,0.8)",
+                bordercolor="rgba(0,0,0,0.2)",
+                borderwidth=1,
+                font=dict(size=11)
+            )
+        )
+
+    return bar_fig, pie_fig, line_fig
 
 def register_callbacks(app):
     
@@ -15,7 +294,7 @@ def register_callbacks(app):
     )
     def update_viz1_graph(view, chart_type):
         try:
-            return viz1.update_graph(view, chart_type)
+            return get_viz1_figure(view, chart_type)
         except Exception as e:
             import plotly.graph_objects as go
             fig = go.Figure()
@@ -41,145 +320,11 @@ def register_callbacks(app):
     )
     def render_tab(tab):
         try:
-            content_style = {
-                "animation": "fadeIn 0.5s ease-in-out",
-                "width": "100%"
-            }
-            
-            if tab == "viz1":
-                return html.Div([
-                    html.Div([
-                        html.H3("Visualization 1", 
-                               style={
-                                   "color": "#2c3e50", 
-                                   "marginBottom": "20px",
-                                   "borderBottom": "3px solid #2c3e50",
-                                   "paddingBottom": "10px",
-                                   "fontSize": "28px",
-                                   "fontWeight": "600"
-                               }),
-                        html.P("The first visualization is an interactive chart (toggle between line and bar chart). It visualises the total number of crimes recorded, segmented by year, season, or month. The x axis represents the selected time unit, while the y axis shows the number of crimes. Each bar or line point corresponds to the number of crimes during that time period. A dashed red line represents the median crime count across the selected timeframe. This helps compare data points above or below the midpoint. The legend clearly differentiates between the crime data and the median line. ",
-                               style={"color": "#6c757d", "fontSize": "16px", "marginBottom": "30px"}),
-                    ]),
-                    viz1.layout()
-                ], style=content_style)
-                
-            elif tab == "viz2":
-                return html.Div([
-                    html.Div([
-                        html.H3("Visualization 2", 
-                               style={
-                                   "color": "#2c3e50", 
-                                   "marginBottom": "20px",
-                                   "borderBottom": "3px solid #2c3e50",
-                                   "paddingBottom": "10px",
-                                   "fontSize": "28px",
-                                   "fontWeight": "600"
-                               }),
-                        html.P("​​This visualization explores how crime in Montreal has changed over time, focusing on three key aspects: time of day, day of the week, and long-term trends in night-time activity. It consists of three connected charts that highlight different dimensions of temporal crime data from 2015 to 2025.",
-                               style={"color": "#6c757d", "fontSize": "16px", "marginBottom": "30px"}),
-                    ]),
-                    viz2.layout()
-                ], style=content_style)
-                
-            elif tab == "viz3":
-                return html.Div([
-                    html.Div([
-                        html.H3("Visualization 3", 
-                               style={
-                                   "color": "#2c3e50", 
-                                   "marginBottom": "20px",
-                                   "borderBottom": "3px solid #2c3e50",
-                                   "paddingBottom": "10px",
-                                   "fontSize": "28px",
-                                   "fontWeight": "600"
-                               }),
-                        html.P("This type of visualization is called a scatter_mapbox created with Plotly, which displays the geographical distribution of various crime types across the city of Montreal. Each dot represents an individual criminal  incident, where the color indicates the type of crime. The visualization uses Mapbox to provide an interactive, zoomable map overlaid with spatial crime data.",
-                               style={"color": "#6c757d", "fontSize": "16px", "marginBottom": "30px"}),
-                    ]),
-                    viz3.layout()
-                ], style=content_style)
-                
-            elif tab == "viz4":
-                return html.Div([
-                    html.Div([
-                        html.H3("Visualization 4", 
-                               style={
-                                   "color": "#2c3e50", 
-                                   "marginBottom": "20px",
-                                   "borderBottom": "3px solid #2c3e50",
-                                   "paddingBottom": "10px",
-                                   "fontSize": "28px",
-                                   "fontWeight": "600"
-                               }),
-                        html.Div([
-                            html.P("This visualization, consisting of a temporal scatter plot, offers a perspective on the evolution of crime across Montreal's different police districts, allowing users to simultaneously visualize the temporal, geographical, and typological dimensions of criminal acts.",
-                                   style={"color": "#6c757d", "fontSize": "16px", "marginBottom": "15px", "lineHeight": "1.6"}),
-                            
-                            html.P("It comprises a multidimensional scatter plot where the x-axis represents temporal progression from 2015 to 2025, while the y-axis displays the various police districts (PDQs), that have a range from 1 to 55. Each point corresponds to a specific district for a given year, creating a visual of criminal activities across time and Montreal's different police districts.",
-                                   style={"color": "#6c757d", "fontSize": "16px", "marginBottom": "15px", "lineHeight": "1.6"}),
-                            
-                            html.P([
-                                "The color dimension encodes the dominant crime type in each district for the corresponding year, revealing four main categories: ",
-                                html.Strong('"Introduction"', style={"color": "#495057"}),
-                                " (breaking & entering), ",
-                                html.Strong('"Vol dans/sur véhicule"', style={"color": "#495057"}),
-                                " (theft from/on vehicle), ",
-                                html.Strong('"Vol de véhicule"', style={"color": "#495057"}),
-                                " (vehicle theft), and ",
-                                html.Strong('"Méfait"', style={"color": "#495057"}),
-                                " (mischief/vandalism)."
-                            ], style={"color": "#6c757d", "fontSize": "16px", "marginBottom": "15px", "lineHeight": "1.6"}),
-                            
-                            html.P("The size of the points adds dimension, which is proportional to the total number of crimes recorded in the concerned district for the specific year. This visual allows easy identification of zones and periods of high criminal activity.",
-                                   style={"color": "#6c757d", "fontSize": "16px", "marginBottom": "15px", "lineHeight": "1.6"}),
-                            
-                            html.P("This visualization thus allows users to explore criminal patterns along three analytical axes: the temporal evolution of crimes, distribution by district, and by type of offense.",
-                                   style={"color": "#6c757d", "fontSize": "16px", "marginBottom": "30px", "lineHeight": "1.6", "fontWeight": "500"})
-                        ], style={
-                            "marginBottom": "25px"
-                        })
-                    ]),
-                    viz4.layout()
-                ], style=content_style)
-                
-            elif tab == "viz5":
-                return html.Div([
-                    html.Div([
-                        html.H3("Visualization 5", 
-                               style={
-                                   "color": "#2c3e50", 
-                                   "marginBottom": "20px",
-                                   "borderBottom": "3px solid #2c3e50",
-                                   "paddingBottom": "10px",
-                                   "fontSize": "28px",
-                                   "fontWeight": "600"
-                               }),
-                        html.Div([
-                            html.P("This interactive visualization presents three different perspectives on crime patterns in Montreal, helping us to better understand when certain crimes happen most frequently. Each heatmap uses the same color scale to keep comparisons fair: the darker the cell, the higher the number of crimes.",
-                                   style={"color": "#6c757d", "fontSize": "16px", "marginBottom": "15px", "lineHeight": "1.6"}),
-                            
-                            html.P([
-                                html.Strong("By Time of Day:", style={"color": "#495057"}),
-                                " This view compares crime types based on whether they occur during the day, evening or night. We can clearly see which types of crimes are more common at different moments of the day, highlighting the importance of time in criminal activity patterns."
-                            ], style={"color": "#6c757d", "fontSize": "16px", "marginBottom": "15px", "lineHeight": "1.6"}),
-                            
-                            html.P([
-                                html.Strong("By Season:", style={"color": "#495057"}),
-                                " This graph shows how crime activity changes with the seasons (winter, spring, summer and fall). Some crimes appear to spike in warmer months, while others are more consistent year-round."
-                            ], style={"color": "#6c757d", "fontSize": "16px", "marginBottom": "15px", "lineHeight": "1.6"}),
-                            
-                            html.P([
-                                html.Strong("By Year:", style={"color": "#495057"}),
-                                " This final view lets us observe how each crime type has evolved over time. It's especially useful for spotting long-term trends, such as increases, decreases or stability over time."
-                            ], style={"color": "#6c757d", "fontSize": "16px", "marginBottom": "30px", "lineHeight": "1.6"})
-                        ], style={
-                            "marginBottom": "25px"
-                        })
-                    ]),
-                    viz5.layout()
-                ], style=content_style)
-            
+            if tab in WARMUP_STEPS and not is_tab_warm(tab):
+                if not background_jobs.is_enabled():
+                    start_warm_up(tab)
+                return build_warmup_placeholder(tab)
+            return get_tab_content(tab)
             
         except Exception as e:
             return html.Div([
@@ -209,31 +354,7 @@ def register_callbacks(app):
     )
     def update_all_charts(selected_pdq, selected_years):
         try:
-            start_year, end_year = selected_years
-            pdq_value = None if selected_pdq == "All" else selected_pdq
-
-            filtered_df = viz2.filter_data(start_year, end_year, pdq=pdq_value)
-
-            bar_fig = viz2.create_bar_chart(filtered_df)
-            pie_fig = viz2.create_pie_chart(filtered_df)
-            line_fig = viz2.create_line_chart(filtered_df)
-            
-            for fig in [bar_fig, pie_fig, line_fig]:
-                fig.update_layout(
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    font=dict(family="Segoe UI, Roboto, Helvetica Neue", size=12),
-                    margin=dict(l=40, r=40, t=60, b=40),
-                    title=dict(font=dict(size=18, color="#2c3e50")),
-                    legend=dict(
-                        bgcolor="rgba(255,255,255,0.8)",
-                        bordercolor="rgba(0,0,0,0.2)",
-                        borderwidth=1,
-                        font=dict(size=11)
-                    )
-                )
-
-            return bar_fig, pie_fig, line_fig
+            return get_viz2_figures(selected_pdq, selected_years)
             
         except Exception as e:
             import plotly.graph_objects as go
@@ -253,4 +374,35 @@ def register_callbacks(app):
                 paper_bgcolor='rgba(0,0,0,0)',
             )
             
-            return error_fig, error_fig, error_fig
\ No newline at end of file
+            return error_fig, error_fig, error_fig
+
+    if background_jobs.is_enabled():
+        app.callback(
+            Output("warmup-container", "children"),
+            Input("warmup-tab", "data"),
+            background=True,
+            progress=[
+                Output("warmup-progress", "value"),
+                Output("warmup-progress", "max"),
+                Output("warmup-status", "children"),
+            ],
+            prevent_initial_call=False
+        )(warm_up_tab)
+    else:
+        @app.callback(
+            Output("warmup-container", "children"),
+            Output("warmup-progress", "value"),
+            Output("warmup-progress", "max"),
+            Output("warmup-status", "children"),
+            Input("warmup-poll", "n_intervals"),
+            State("warmup-tab", "data"),
+            prevent_initial_call=True
+        )
+        def poll_warm_up(_, tab):
+            if is_tab_warm(tab):
+                return get_tab_content(tab), no_update, no_update, no_update
+            # The poll may reach another worker than the one that started the warm-up
+            start_warm_up(tab)
+            steps = WARMUP_STEPS[tab]
+            value, maximum, label = _warm_up_progress.get(tab, ("0", str(len(steps)), steps[0][0]))
+            return no_update, value, maximum, label
@@ -0,0 +1,79 @@
+"""
+Response compression for the Dash transport endpoints
+Compresses layout and callback responses with brotli (when installed) or
+gzip above a size threshold, and logs their size before and after per callback
+"""
+
+import gzip
+import logging
+import os
+import time
+
+from flask import request
+
+logger = logging.getLogger(__name__)
+
+COMPRESSED_PATHS = ("/_dash-update-component", "/_dash-layout", "/_dash-dependencies")
+
+# Responses smaller than this are sent as is (compression overhead beats the gain)
+MIN_SIZE = int(os.environ.get("COMPRESS_MIN_BYTES", 1024))
+GZIP_LEVEL = int(os.environ.get("COMPRESS_GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.environ.get("COMPRESS_BROTLI_QUALITY", 5))
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def choose_encoding(accept_encoding: str):
+    """Best supported encoding accepted by the client, None if there is none"""
+    accepted = {part.split(";")[0].strip().lower() for part in accept_encoding.split(",")}
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def _payload_name() -> str:
+    """Callback output ids for update requests, the path otherwise"""
+    if request.path == "/_dash-update-component":
+        body = request.get_json(silent=True) or {}
+        return body.get("output", request.path)
+    return request.path
+
+
+def register_compression(app):
+    """Compresses the Dash transport responses of the Flask server of the app"""
+
+    @app.server.after_request
+    def compress_response(response):
+        if request.path not in COMPRESSED_PATHS:
+            return response
+        if response.status_code != 200 or response.direct_passthrough or "Content-Encoding" in response.headers:
+            return response
+
+        response.vary.add("Accept-Encoding")
+        data = response.get_data()
+        encoding = choose_encoding(request.headers.get("Accept-Encoding", ""))
+        if encoding is None or len(data) < MIN_SIZE:
+            logger.info(f"{_payload_name()}: {len(data)} B (uncompressed)")
+            return response
+
+        start = time.perf_counter()
+        compressed = compress(data, encoding)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        logger.info(
+            f"{_payload_name()}: {len(data)} B -> {len(compressed)} B {encoding} "
+            f"({len(compressed) / len(data):.1%}, {elapsed_ms:.1f} ms)"
+        )
+        return response
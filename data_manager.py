@@ -4,21 +4,72 @@ Optimizes performance by loading data only once and caching it
 """
 
 import pandas as pd
+import numpy as np
 import os
-from functools import lru_cache
-from typing import Optional, Dict, Any
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Callable, Sequence, Tuple
 import logging
 
+import artifacts
+import metrics
+import profiling
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Nombre de résultats de get_filtered_data gardés en cache (LRU)
+MAX_FILTERED_ENTRIES = 32
+
+# Traduction anglaise des catégories (après normalisation .strip().lower().title())
+CRIME_TRANSLATION = {
+    "Vol De Véhicule À Moteur": "Motor Vehicle Theft",
+    "Méfait": "Mischief",
+    "Vol Dans / Sur Véhicule À Moteur": "Theft From/In Motor Vehicle",
+    "Introduction": "Breaking And Entering",
+    "Vols Qualifiés": "Robbery",
+    "Infractions Entrainant La Mort": "Offences Causing Death"
+}
+
+# Quart de travail (QUART normalisé) vers libellé anglais
+SHIFT_TRANSLATION = {
+    "jour": "Day",
+    "soir": "Evening",
+    "nuit": "Night"
+}
+
+TIME_OF_DAY_LABELS = {
+    'jour': 'Day (09:01–16:00)',
+    'soir': 'Evening (16:01–00:00)',
+    'nuit': 'Night (00:01–08:00)'
+}
+
+
+def normalize_categorical(values: pd.Series, normalizer: Callable[[pd.Index], pd.Index]) -> pd.Categorical:
+    """
+    Applique une normalisation de chaînes aux valeurs distinctes seulement,
+    puis la propage aux lignes par les codes de la catégorie
+
+    Args:
+        values: Colonne à normaliser
+        normalizer: Fonction appliquée à l'Index des valeurs distinctes
+
+    Returns:
+        Catégorielle des valeurs normalisées (les valeurs manquantes restent manquantes)
+    """
+    raw = pd.Categorical(values)
+    normalized = pd.Index(normalizer(pd.Index(raw.categories.astype(str))))
+    categories = pd.Index(normalized.dropna().unique())
+    lookup = np.append(categories.get_indexer(normalized), -1)
+    return pd.Categorical.from_codes(lookup[raw.codes], categories=categories)
+
 class DataManager:
     """
     Gestionnaire centralisé des données avec mise en cache
     """
     _instance = None
     _data_cache = {}
-    _processed_cache = {}
+    _processed_cache = OrderedDict()
     
     def __new__(cls):
         """Singleton pattern pour s'assurer qu'une seule instance existe"""
@@ -31,14 +82,22 @@ class DataManager:
         if not hasattr(self, 'initialized'):
             self.data_path = self._get_data_path()
             self.raw_data = None
+            self.data_version = None
+            self._swap_lock = threading.Lock()
+            self._row_index = None
             self.initialized = True
             logger.info("DataManager initialisé")
     
     def _get_data_path(self) -> str:
         """
         Détermine le chemin correct vers le fichier CSV
+        (CRIMES_DATA_PATH a priorité, p. ex. pour servir des données synthétiques)
         """
-       
+        env_path = os.environ.get("CRIMES_DATA_PATH")
+        if env_path:
+            logger.info(f"Fichier CSV fourni par CRIMES_DATA_PATH: {env_path}")
+            return env_path
+
         possible_paths = [
             "src/data/actes-criminels.csv",
             "data/actes-criminels.csv",
@@ -57,6 +116,8 @@ class DataManager:
         logger.warning(f"Fichier CSV non trouvé, utilisation du chemin par défaut: {default_path}")
         return default_path
     
+    @metrics.timed("load_raw_data")
+    @profiling.profiled("load_raw_data")
     def load_raw_data(self, force_reload: bool = False) -> pd.DataFrame:
         """
         Charge les données brutes du CSV avec mise en cache
@@ -69,12 +130,10 @@ class DataManager:
         """
         if self.raw_data is None or force_reload:
             try:
-                logger.info(f"Chargement des données depuis: {self.data_path}")
-                self.raw_data = pd.read_csv(self.data_path, parse_dates=["DATE"])
-                logger.info(f"Données chargées: {len(self.raw_data)} lignes, {len(self.raw_data.columns)} colonnes")
-                
-               
-                self._prepare_base_data()
+                data_version = self._compute_data_version()
+                raw_data = self.read_data(data_version)
+                with self._swap_lock:
+                    self.raw_data, self.data_version = raw_data, data_version
                 
             except Exception as e:
                 logger.error(f"Erreur lors du chargement des données: {e}")
@@ -82,35 +141,113 @@ class DataManager:
         
         return self.raw_data.copy()
     
-    def _prepare_base_data(self):
+    def read_data(self, data_version: str) -> pd.DataFrame:
+        """
+        Lit et prépare les données du CSV sans les installer comme données courantes
+        
+        Args:
+            data_version: Version du fichier lu (choisit l'instantané du déploiement s'il correspond)
+            
+        Returns:
+            DataFrame préparé (colonnes temporelles et catégories normalisées)
+        """
+        snapshot = artifacts.snapshot_path(self.data_path, data_version)
+        if snapshot is not None:
+            # Instantané colonnaire construit au déploiement, déjà préparé
+            logger.info(f"Chargement de l'instantané: {snapshot}")
+            data = artifacts.read_snapshot(snapshot)
+        else:
+            logger.info(f"Chargement des données depuis: {self.data_path}")
+            data = self._prepare_base_data(pd.read_csv(self.data_path, parse_dates=["DATE"]))
+        metrics.DATA_ROWS.inc(len(data), operation="load_raw_data")
+        logger.info(f"Données chargées: {len(data)} lignes, {len(data.columns)} colonnes")
+        return data
+    
+    def swap_data(self, raw_data: pd.DataFrame, data_version: str):
+        """
+        Remplace d'un coup les données courantes par une version déjà préparée
+        
+        Les requêtes en cours gardent leur copie de l'ancienne version; leurs
+        résultats sont mis en cache sous l'ancienne version et ne sont donc
+        jamais servis pour la nouvelle. Les caches sont vidés pour libérer la mémoire.
+        
+        Args:
+            raw_data: Données préparées (voir read_data)
+            data_version: Version correspondante
+        """
+        with self._swap_lock:
+            self.raw_data, self.data_version = raw_data, data_version
+            self.clear_cache()
+        logger.info(f"Données remplacées par la version {data_version}")
+    
+    def _compute_data_version(self) -> str:
+        """
+        Identifiant de version des données (date de modification et taille du CSV),
+        identique dans tous les workers qui lisent le même fichier
+        """
+        stat = os.stat(self.data_path)
+        return f"{int(stat.st_mtime)}-{stat.st_size}"
+    
+    def _current_data(self) -> tuple:
+        """
+        Données courantes et leur version, lues ensemble (charge les données au besoin)
+        
+        Returns:
+            (DataFrame non copié, version)
+        """
+        if self.raw_data is None:
+            self.load_raw_data()
+        with self._swap_lock:
+            return self.raw_data, self.data_version
+    
+    def get_data_version(self) -> str:
+        """
+        Retourne la version des données chargées, à utiliser dans les clés de cache
+        des résultats dérivés (calculée sans lire le CSV s'il n'est pas encore chargé)
+        """
+        if self.data_version is None:
+            return self._compute_data_version()
+        return self.data_version
+    
+    def _prepare_base_data(self, data: pd.DataFrame) -> pd.DataFrame:
         """
         Prépare les données de base (colonnes communes utilisées par plusieurs visualisations)
         """
-        if self.raw_data is not None:
-            self.raw_data["YEAR"] = self.raw_data["DATE"].dt.year
-            self.raw_data["MONTH"] = self.raw_data["DATE"].dt.month
-            self.raw_data["SEASON"] = self.raw_data["MONTH"] % 12 // 3 + 1
+        if data is not None:
+            data["YEAR"] = data["DATE"].dt.year
+            data["MONTH"] = data["DATE"].dt.month
+            data["SEASON"] = data["MONTH"] % 12 // 3 + 1
             
             season_map = {1: "Winter", 2: "Spring", 3: "Summer", 4: "Autumn"}
-            self.raw_data["SEASON"] = self.raw_data["SEASON"].map(season_map)
+            data["SEASON"] = data["SEASON"].map(season_map)
             
-            if 'QUART' in self.raw_data.columns:
-                self.raw_data['QUART'] = self.raw_data['QUART'].str.lower()
-                self.raw_data['DayOfWeek'] = self.raw_data['DATE'].dt.dayofweek
-                self.raw_data['Day Type'] = self.raw_data['DayOfWeek'].apply(
-                    lambda x: 'Weekend' if x >= 5 else 'Weekday'
+            if 'CATEGORIE' in data.columns:
+                data['CATEGORIE'] = data['CATEGORIE'].astype('category')
+                data['CrimeType'] = normalize_categorical(
+                    data['CATEGORIE'],
+                    lambda cats: cats.str.strip().str.lower().str.title().map(
+                        lambda c: CRIME_TRANSLATION.get(c, c)
+                    )
+                )
+            
+            if 'QUART' in data.columns:
+                data['QUART'] = normalize_categorical(
+                    data['QUART'], lambda cats: cats.str.strip().str.lower()
+                )
+                data['Shift'] = data['QUART'].map(SHIFT_TRANSLATION)
+                data['DayOfWeek'] = data['DATE'].dt.dayofweek
+                data['Day Type'] = np.where(
+                    data['DayOfWeek'] >= 5, 'Weekend', 'Weekday'
+                )
+                data['Time of Day'] = (
+                    data['QUART'].map(TIME_OF_DAY_LABELS).astype(object)
                 )
-                
-                time_labels = {
-                    'jour': 'Day (09:01–16:00)',
-                    'soir': 'Evening (16:01–00:00)',
-                    'nuit': 'Night (00:01–08:00)'
-                }
-                self.raw_data['Time of Day'] = self.raw_data['QUART'].map(time_labels)
             
             logger.info("Données de base préparées avec colonnes temporelles")
+        return data
     
-    @lru_cache(maxsize=32)
+    @metrics.timed("get_filtered_data")
+    @profiling.profiled("get_filtered_data")
     def get_filtered_data(self, 
                          start_year: Optional[int] = None,
                          end_year: Optional[int] = None,
@@ -119,6 +256,9 @@ class DataManager:
         """
         Retourne les données filtrées avec mise en cache LRU
         
+        La clé de cache inclut la version des données filtrées: un filtrage
+        commencé avant un remplacement des données reste associé à l'ancienne version.
+        
         Args:
             start_year: Année de début (incluse)
             end_year: Année de fin (incluse)
@@ -128,14 +268,16 @@ class DataManager:
         Returns:
             DataFrame filtré
         """
-        cache_key = f"{start_year}_{end_year}_{pdq}_{category}"
+        data, data_version = self._current_data()
+        cache_key = (data_version, start_year, end_year, pdq, category)
         
+        metrics.record_cache("get_filtered_data", cache_key in self._processed_cache)
         if cache_key in self._processed_cache:
             logger.debug(f"Données filtrées trouvées en cache: {cache_key}")
+            self._processed_cache.move_to_end(cache_key)
             return self._processed_cache[cache_key].copy()
         
-       
-        data = self.load_raw_data()
+        metrics.DATA_ROWS.inc(len(data), operation="get_filtered_data")
         
         if start_year is not None:
             data = data[data['YEAR'] >= start_year]
@@ -147,10 +289,65 @@ class DataManager:
             data = data[data['CATEGORIE'] == category]
         
         self._processed_cache[cache_key] = data.copy()
+        if len(self._processed_cache) > MAX_FILTERED_ENTRIES:
+            self._processed_cache.popitem(last=False)
         logger.debug(f"Données filtrées mises en cache: {cache_key} ({len(data)} lignes)")
         
         return data.copy()
     
+    def _build_row_index(self, data: pd.DataFrame, data_version: str) -> Dict[str, Any]:
+        """
+        Trie une fois les positions des lignes par (YEAR, PDQ): les lignes de
+        chaque couple forment une plage contiguë de l'ordre trié
+        """
+        # Les lignes sans date (année NaN) ont l'année -1, hors de toute plage d'années
+        years = data['YEAR'].fillna(-1).to_numpy(dtype=np.int64)
+        pdqs = data['PDQ'].fillna(-1).to_numpy(dtype=np.int64)
+        order = np.lexsort((pdqs, years))
+        keys = years[order] * 1000 + pdqs[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.array([], dtype=np.int64)
+        ends = np.r_[starts[1:], len(keys)]
+        index = {
+            'version': data_version,
+            'order': order,
+            'runs': {
+                (int(years[order[start]]), int(pdqs[order[start]])): (int(start), int(end))
+                for start, end in zip(starts, ends)
+            },
+        }
+        self._row_index = index
+        logger.info(f"Index (YEAR, PDQ) construit: {len(index['runs'])} plages")
+        return index
+    
+    def get_indexed_rows(self,
+                         year_range: Optional[Tuple[int, int]] = None,
+                         pdqs: Optional[Sequence[int]] = None) -> Tuple[pd.DataFrame, np.ndarray]:
+        """
+        Positions des lignes d'une plage d'années et d'une liste de PDQ, lues
+        dans l'index (YEAR, PDQ) de la version courante sans parcourir les données
+        
+        Args:
+            year_range: Années (début, fin) incluses (None pour toutes)
+            pdqs: Numéros PDQ à garder (None pour tous)
+            
+        Returns:
+            (Données courantes non copiées, positions croissantes des lignes correspondantes)
+        """
+        data, data_version = self._current_data()
+        index = self._row_index
+        if index is None or index['version'] != data_version:
+            index = self._build_row_index(data, data_version)
+        
+        wanted_pdqs = None if pdqs is None else set(pdqs)
+        runs = [
+            index['order'][start:end]
+            for (year, pdq), (start, end) in index['runs'].items()
+            if (year_range is None or year_range[0] <= year <= year_range[1])
+            and (wanted_pdqs is None or pdq in wanted_pdqs)
+        ]
+        positions = np.sort(np.concatenate(runs)) if runs else np.array([], dtype=np.int64)
+        return data, positions
+    
     def get_data_for_viz1(self) -> pd.DataFrame:
         """
         Retourne les données préparées pour la visualisation 1
@@ -186,7 +383,7 @@ class DataManager:
         Vide tous les caches
         """
         self._processed_cache.clear()
-        self.get_filtered_data.cache_clear()
+        self._row_index = None
         logger.info("Cache vidé")
     
     def get_cache_info(self) -> Dict[str, Any]:
@@ -195,8 +392,8 @@ class DataManager:
         """
         return {
             'processed_cache_size': len(self._processed_cache),
-            'lru_cache_info': self.get_filtered_data.cache_info(),
             'data_loaded': self.raw_data is not None,
+            'data_version': self.data_version,
             'data_shape': self.raw_data.shape if self.raw_data is not None else None
         }
 
@@ -0,0 +1,197 @@
+"""
+Hot reload of the incidents CSV without restarting the workers
+A watcher thread in every worker polls the data file. Once a new version has
+stopped changing, the artifacts of every tab are built for it in a separate
+process (once per machine, shared through the background job cache), along
+with a parquet snapshot of the prepared frame that every worker reads off the
+request path. Both are then swapped in at once: in-flight requests finish
+against the old version, the next ones find the new one warm. The thread is
+started by the first request of each worker, so it also runs in the workers
+forked by gunicorn --preload (and never in the master)
+
+Environment:
+    DATA_RELOAD_INTERVAL      Seconds between two checks of the data file (default 60, 0 disables)
+    DATA_RELOAD_TIMEOUT       Seconds allowed to build the artifacts of a new version (default 900)
+    DATA_RELOAD_SNAPSHOT_DIR  Snapshots of the new versions (default <tmp>/montreal_crimes_reload)
+"""
+
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Optional
+
+import artifacts
+import background_jobs
+import callbacks
+import memory_report
+import metrics
+from data_manager import data_manager
+from visualizations import viz3
+
+logger = logging.getLogger(__name__)
+
+INTERVAL = float(os.environ.get("DATA_RELOAD_INTERVAL", 60))
+BUILD_TIMEOUT = float(os.environ.get("DATA_RELOAD_TIMEOUT", 900))
+SNAPSHOT_DIR = os.environ.get("DATA_RELOAD_SNAPSHOT_DIR", os.path.join(tempfile.gettempdir(), "montreal_crimes_reload"))
+
+# In-memory caches built from the previous version (see memory_report.CACHES).
+# Their keys include the data version, so entries of the previous version are
+# never served after the swap; they are evicted to free their memory at once
+STALE_CACHES = [
+    'viz1.figures', 'viz3.incidents', 'viz3.reduced_data', 'viz3.grouped_arrays', 'viz3.grid_bins',
+    'viz4.figures', 'viz5.figures', 'tabs.content', 'tiles.index', 'tiles.tiles',
+]
+
+DATA_RELOADS = metrics.Counter(
+    "data_reloads_total", "Hot reloads of the data file by result (swapped or error)", ("result",)
+)
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def snapshot_path(data_version: str) -> str:
+    """Parquet snapshot of the prepared frame of a data version"""
+    return os.path.join(SNAPSHOT_DIR, f"incidents-{data_version}.parquet")
+
+
+def prepare():
+    """
+    Computes every tab's artifacts and the snapshot of the prepared frame for the data file on disk
+
+    Runs in the separate process started by build_artifacts. The frame is
+    written as parquet rather than stored in the background cache, whose size
+    limit it could exceed at the larger benchmark scales.
+    """
+    for steps in callbacks.WARMUP_STEPS.values():
+        for _, _, step in steps:
+            step()
+    viz3.precompute_grid_bins()
+
+    path = snapshot_path(data_manager.data_version)
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    data_manager.raw_data.to_parquet(f"{path}.{os.getpid()}.tmp", index=False)
+    os.replace(f"{path}.{os.getpid()}.tmp", path)  # written last: its presence marks the build as complete
+
+
+def build_artifacts(data_version: str):
+    """Builds the artifacts of a version in a separate process, unless another worker did"""
+    with background_jobs.job_lock(f"reload:{data_version}"):
+        if os.path.exists(snapshot_path(data_version)):
+            return
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--prepare"],
+            env={**os.environ, "CRIMES_DATA_PATH": os.path.abspath(data_manager.data_path)},
+            timeout=BUILD_TIMEOUT,
+            check=True,
+        )
+        logger.info(f"Artifacts of data version {data_version} built in {time.perf_counter() - start:.1f} s")
+
+
+def reload(data_version: str):
+    """Swaps in a new data version, its artifacts built and its frame read beforehand"""
+    raw_data = None
+    if background_jobs.get_cache() is not None:
+        build_artifacts(data_version)
+        try:
+            raw_data = artifacts.read_snapshot(snapshot_path(data_version))
+        except OSError as e:
+            logger.warning(f"Snapshot of data version {data_version} unreadable ({e}), reading the CSV")
+    if raw_data is None:
+        raw_data = data_manager.read_data(data_version)
+
+    data_manager.swap_data(raw_data, data_version)
+    _remove_old_snapshots(data_version)
+    for name in STALE_CACHES:
+        memory_report.CACHES[name][1]()
+    # Tab layouts of the new version, from its artifacts
+    callbacks.prerender_tabs()
+    DATA_RELOADS.inc(result="swapped")
+
+
+def _remove_old_snapshots(data_version: str):
+    """Deletes the snapshots of the versions before data_version (no worker reloads them anymore)"""
+    current = os.path.basename(snapshot_path(data_version))
+    try:
+        names = os.listdir(SNAPSHOT_DIR)
+    except OSError:
+        return
+    for name in names:
+        if name.startswith("incidents-") and name != current:
+            try:
+                os.remove(os.path.join(SNAPSHOT_DIR, name))
+            except OSError:
+                pass
+
+
+def check_for_update(pending: Optional[str] = None) -> Optional[str]:
+    """
+    Reloads the data file once the same new version is seen on two checks in
+    a row (so not while it is being written)
+
+    Returns:
+        New version waiting for the next check, None if there is none
+    """
+    if data_manager.data_version is None:
+        return None  # not loaded yet: the first load reads the new file
+    try:
+        data_version = data_manager._compute_data_version()
+    except OSError:
+        return None  # being replaced
+    if data_version == data_manager.data_version:
+        return None
+    if data_version != pending:
+        return data_version
+
+    logger.info(f"New data file version {data_version}, reloading")
+    reload(data_version)
+    return None
+
+
+def _watch():
+    pending = None
+    while True:
+        time.sleep(INTERVAL)
+        try:
+            pending = check_for_update(pending)
+        except Exception:
+            logger.exception("Data reload failed, keeping the current version")
+            DATA_RELOADS.inc(result="error")
+            pending = None
+
+
+def start_watcher():
+    """
+    Starts the watcher thread of this process (no-op when disabled or already running)
+
+    Threads do not survive a fork: in a worker forked from a preloaded master,
+    the inherited _watcher is not alive and a new thread is started.
+    """
+    global _watcher
+    with _watcher_lock:
+        if INTERVAL <= 0 or (_watcher is not None and _watcher.is_alive()):
+            return
+        _watcher = threading.Thread(target=_watch, name="data-reload-watcher", daemon=True)
+        _watcher.start()
+    logger.info(f"Watching {data_manager.data_path} every {INTERVAL:g} s")
+
+
+def register_reload_watcher(app):
+    """Starts the watcher of each worker with its first request, never in a gunicorn master"""
+
+    @app.server.before_request
+    def ensure_watcher():
+        if _watcher is None or not _watcher.is_alive():
+            start_watcher()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["--prepare"]:
+        sys.exit(f"usage: {sys.argv[0]} --prepare")
+    logging.basicConfig(level=logging.INFO)
+    prepare()
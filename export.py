@@ -0,0 +1,151 @@
+"""
+Streaming export of the filtered incidents as CSV or Parquet
+The rows of the year range and PDQs are found in the DataManager (YEAR, PDQ)
+index, then taken in fixed-size batches; only the rows of the current batch
+are filtered on category, encoded and sent, so memory stays bounded by the
+batch size whatever the size of the export
+"""
+
+import io
+import logging
+import os
+from typing import Iterator, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from flask import Response, abort, request, stream_with_context
+
+import metrics
+from data_manager import data_manager
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+# Rows of the loaded frame scanned per batch
+BATCH_ROWS = int(os.environ.get("EXPORT_BATCH_ROWS", 50_000))
+
+# Columns of the published CSV; derived columns are left out
+EXPORT_COLUMNS = ["CATEGORIE", "DATE", "QUART", "PDQ", "X", "Y", "LONGITUDE", "LATITUDE"]
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def _category_mask(batch: pd.DataFrame, categories: Sequence[str]) -> np.ndarray:
+    # French category of the CSV or its English crime type
+    matches = batch["CATEGORIE"].isin(categories)
+    if "CrimeType" in batch:
+        matches |= batch["CrimeType"].isin(categories)
+    return matches.to_numpy()
+
+
+def iter_batches(data: pd.DataFrame,
+                 positions: np.ndarray,
+                 categories: Optional[Sequence[str]] = None,
+                 batch_rows: int = BATCH_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Incidents at positions of data (see DataManager.get_indexed_rows), in
+    their original order, one possibly empty frame per batch of taken rows
+
+    data is the loaded frame itself, not a copy; an export keeps using it even
+    if a data reload swaps in a new version meanwhile.
+    """
+    columns = [column for column in EXPORT_COLUMNS if column in data]
+    if not len(positions):
+        yield data.iloc[:0][columns]  # the CSV header is still sent
+
+    for start in range(0, len(positions), batch_rows):
+        batch = data.iloc[positions[start:start + batch_rows]]
+        metrics.DATA_ROWS.inc(len(batch), operation="export")
+        if categories is not None:
+            batch = batch.loc[_category_mask(batch, categories)]
+        yield batch[columns]
+
+
+def stream_csv(batches: Iterator[pd.DataFrame]) -> Iterator[bytes]:
+    header = True
+    for batch in batches:
+        if len(batch) or header:
+            yield batch.to_csv(index=False, header=header).encode("utf-8")
+            header = False
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file whose written bytes are drained after every row group"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_parquet(data: pd.DataFrame, batches: Iterator[pd.DataFrame]) -> Iterator[bytes]:
+    """One row group per non-empty batch, sent as soon as it is written"""
+    columns = [column for column in EXPORT_COLUMNS if column in data]
+    schema = pa.Schema.from_pandas(data.iloc[:0][columns], preserve_index=False)
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for batch in batches:
+            if len(batch):
+                writer.write_table(pa.Table.from_pandas(batch, schema=schema, preserve_index=False))
+                yield sink.drain()
+    yield sink.drain()
+
+
+def register_export_routes(app):
+    """Registers the export endpoint on the Flask server of the Dash app"""
+
+    @app.server.route("/export/incidents.<fmt>")
+    def export_incidents(fmt):
+        """Optional filters: ?years=2016-2020&pdq=21,22&category=Méfait,Robbery"""
+        if fmt not in FORMATS:
+            abort(404)
+        if fmt == "parquet" and pq is None:
+            abort(501)
+
+        year_range = None
+        pdqs = None
+        try:
+            if request.args.get("years"):
+                first, last = (int(year) for year in request.args["years"].split("-"))
+                year_range = (first, last)
+            if request.args.get("pdq"):
+                pdqs = [int(pdq) for pdq in request.args["pdq"].split(",")]
+        except ValueError:
+            abort(400)
+
+        categories = None
+        if request.args.get("category"):
+            categories = request.args["category"].split(",")
+
+        data, positions = data_manager.get_indexed_rows(year_range, pdqs)
+        batches = iter_batches(data, positions, categories)
+        body = stream_csv(batches) if fmt == "csv" else stream_parquet(data, batches)
+        logger.info(f"Export {fmt}: years={year_range} pdq={pdqs} category={categories}")
+        return Response(
+            stream_with_context(body),
+            content_type=FORMATS[fmt],
+            headers={"Content-Disposition": f'attachment; filename="incidents.{fmt}"'},
+        )
@@ -0,0 +1,143 @@
+"""
+Simplified district geometry for the Montreal crime map
+Builds topology-preserving, quantized versions of montreal.json at several
+levels of detail and caches them on disk and in memory
+"""
+
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Optional
+
+import artifacts
+
+logger = logging.getLogger(__name__)
+
+# Simplification tolerance (in degrees) for each level of detail
+GEOMETRY_LEVELS = {
+    "low": 0.001,
+    "medium": 0.0003,
+    "high": 0.0001,
+}
+
+# Highest mapbox zoom served by each level, checked in order
+ZOOM_LEVELS = [
+    (10.5, "low"),
+    (12.5, "medium"),
+    (float("inf"), "high"),
+]
+
+# 5 decimals is ~1 m at Montreal's latitude, well below a screen pixel
+COORD_PRECISION = 5
+
+_geojson_cache: Dict[tuple, dict] = {}
+
+
+def get_level_for_zoom(zoom: Optional[float]) -> str:
+    """Returns the level of detail matching a mapbox zoom"""
+    if zoom is None:
+        return ZOOM_LEVELS[0][1]
+    for max_zoom, level in ZOOM_LEVELS:
+        if zoom <= max_zoom:
+            return level
+    return ZOOM_LEVELS[-1][1]
+
+
+def _get_cache_dir(source_path: str) -> str:
+    default_dir = os.path.join(os.path.dirname(os.path.abspath(source_path)), "cache")
+    return os.environ.get("GEOMETRY_CACHE_DIR", default_dir)
+
+
+def _source_digest(source_path: str) -> str:
+    with open(source_path, "rb") as f:
+        digest = hashlib.sha1(f.read())
+    digest.update(f"{sorted(GEOMETRY_LEVELS.items())}|{COORD_PRECISION}".encode())
+    return digest.hexdigest()[:12]
+
+
+def _simplify(geometries, tolerance: float):
+    """
+    Simplifies the districts as a coverage so shared borders stay shared
+    (no gaps or overlaps between neighbours), then snaps them to a grid
+    """
+    import shapely
+
+    if hasattr(shapely, "coverage_simplify") and shapely.geos_version >= (3, 12, 0):
+        simplified = shapely.coverage_simplify(geometries, tolerance)
+    else:
+        simplified = shapely.simplify(geometries, tolerance, preserve_topology=True)
+    return shapely.set_precision(simplified, 10 ** -COORD_PRECISION)
+
+
+def build_simplified_geojson(source_path: str, level: str) -> str:
+    """
+    Builds the GeoJSON text of one level of detail
+
+    Only the NOM property is kept since it is the featureidkey of the map.
+    """
+    import geopandas as gpd
+
+    gdf = gpd.read_file(source_path)
+    simplified = gpd.GeoDataFrame(
+        {"NOM": gdf["NOM"]},
+        geometry=_simplify(gdf.geometry.values, GEOMETRY_LEVELS[level]),
+        crs=gdf.crs,
+    )
+    return simplified.to_json(drop_id=True, separators=(",", ":"))
+
+
+def get_simplified_geojson(source_path: str, level: str) -> dict:
+    """
+    Returns the simplified GeoJSON of a level, built once and cached on disk
+
+    Args:
+        source_path: Path to the full resolution montreal.json
+        level: One of GEOMETRY_LEVELS
+
+    Returns:
+        GeoJSON FeatureCollection as a dict
+    """
+    if level not in GEOMETRY_LEVELS:
+        raise ValueError(f"Unknown geometry level: {level}")
+
+    memory_key = (os.path.abspath(source_path), os.path.getmtime(source_path), level)
+    if memory_key in _geojson_cache:
+        return _geojson_cache[memory_key]
+
+    cache_dir = _get_cache_dir(source_path)
+    base_name = os.path.splitext(os.path.basename(source_path))[0]
+    cache_path = os.path.join(cache_dir, f"{base_name}.{level}.{_source_digest(source_path)}.json")
+
+    artifact_path = artifacts.geometry_path(os.path.basename(cache_path))
+    if artifact_path is not None:
+        with open(artifact_path) as f:
+            geojson_text = f.read()
+    elif os.path.exists(cache_path):
+        with open(cache_path) as f:
+            geojson_text = f.read()
+    else:
+        geojson_text = build_simplified_geojson(source_path, level)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(geojson_text)
+            os.replace(tmp_path, cache_path)
+            logger.info(f"Simplified geometry '{level}' written to {cache_path} ({len(geojson_text)} bytes)")
+        except OSError as e:
+            logger.warning(f"Could not write geometry cache {cache_path}: {e}")
+
+    geojson = json.loads(geojson_text)
+    _geojson_cache[memory_key] = geojson
+    return geojson
+
+
+def build_all_levels(source_path: str) -> Dict[str, dict]:
+    """Builds (or loads) every level of detail"""
+    return {level: get_simplified_geojson(source_path, level) for level in GEOMETRY_LEVELS}
+
+
+def clear_cache():
+    """Empties the in-memory cache (files on disk are kept)"""
+    _geojson_cache.clear()
@@ -0,0 +1,227 @@
+"""
+Memory accounting of every in-process cache, with targeted eviction
+Reports the deep byte size of the raw frame, the DataManager caches, the viz
+working sets and the figure and layout caches next to the worker RSS, to
+diagnose OOM kills; /debug/memory/evict drops chosen caches
+
+The routes expose internals and let a caller empty every cache, so they are only
+registered when DEBUG_ROUTES_TOKEN is set, and every request must send it as
+"Authorization: Bearer <token>"
+
+Environment:
+    DEBUG_ROUTES_TOKEN  Secret enabling the /debug/memory routes (unset: routes not registered)
+"""
+
+import gc
+import hmac
+import logging
+import os
+import sys
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from flask import abort, jsonify, request
+
+import callback_cache
+import callbacks
+import geometry_manager
+import tile_server
+from data_manager import data_manager
+from visualizations import viz1, viz3, viz4, viz5
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+DEBUG_ROUTES_TOKEN = os.environ.get("DEBUG_ROUTES_TOKEN", "")
+
+
+def deep_sizeof(obj, seen: Optional[set] = None) -> int:
+    """
+    Approximate deep size in bytes; objects reachable several times are counted once
+
+    pandas objects use memory_usage(deep=True), numpy arrays their buffer,
+    figures and components the size of their plotly JSON structure.
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True, index=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index, pd.Categorical)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        size = obj.nbytes
+        if obj.dtype == object:
+            size += sum(deep_sizeof(item, seen) for item in obj.ravel())
+        return size
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool)) or obj is None:
+        return sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum(deep_sizeof(item, seen) for item in obj)
+    if hasattr(obj, "to_plotly_json"):
+        return deep_sizeof(obj.to_plotly_json(), seen)
+    return sys.getsizeof(obj)
+
+
+def _entries_report(entries: Dict, detail: bool) -> Dict[str, Any]:
+    sizes = {str(key): deep_sizeof(value) for key, value in entries.items()}
+    report = {'bytes': sum(sizes.values()), 'entries': len(sizes)}
+    if detail:
+        report['entry_bytes'] = dict(sorted(sizes.items(), key=lambda kv: -kv[1]))
+    return report
+
+
+def _object_report(obj) -> Dict[str, Any]:
+    return {'bytes': deep_sizeof(obj) if obj is not None else 0, 'entries': int(obj is not None)}
+
+
+def _viz3_incidents_report(detail: bool) -> Dict[str, Any]:
+    cached = viz3._cached_data
+    if cached is None:
+        return {'bytes': 0, 'entries': 0}
+    return {
+        'bytes': viz3._frame_bytes(cached['incidents']) + deep_sizeof(cached['district_names']),
+        'entries': 1,
+        'rows': len(cached['incidents']),
+        'joined_geodataframe_peak_bytes': cached.get('joined_bytes'),
+    }
+
+
+def _set(module, attribute: str, value) -> Callable[[], None]:
+    return lambda: setattr(module, attribute, value)
+
+
+def _evict_raw_data():
+    data_manager.raw_data = None
+    data_manager.clear_cache()
+
+
+def _evict_callback_cache():
+    backend = callback_cache.get_backend()
+    if backend is not None:
+        backend.clear()
+
+
+# name -> (report(detail), evict)
+CACHES = {
+    'data_manager.raw_data': (lambda detail: _object_report(data_manager.raw_data), _evict_raw_data),
+    'data_manager.row_index': (lambda detail: _object_report(data_manager._row_index),
+                               _set(data_manager, '_row_index', None)),
+    'data_manager.processed_cache': (lambda detail: _entries_report(data_manager._processed_cache, detail),
+                                     data_manager.clear_cache),
+    'viz1.figures': (lambda detail: _entries_report(viz1._cached_figures, detail), viz1._cached_figures.clear),
+    'viz3.incidents': (_viz3_incidents_report, _set(viz3, '_cached_data', None)),
+    'viz3.reduced_data': (lambda detail: _entries_report(viz3._cached_reduced_data, detail),
+                          lambda: viz3._cached_reduced_data.clear()),
+    'viz3.grouped_arrays': (lambda detail: _object_report(viz3._cached_grouped_arrays),
+                            _set(viz3, '_cached_grouped_arrays', None)),
+    'viz3.grid_bins': (lambda detail: _object_report(viz3._cached_grid_bins), _set(viz3, '_cached_grid_bins', None)),
+    'viz3.base_figure': (lambda detail: _object_report(viz3._cached_figure), _set(viz3, '_cached_figure', None)),
+    'viz4.dimension_table': (lambda detail: _object_report(viz4._pdq_dimension_table),
+                             _set(viz4, '_pdq_dimension_table', None)),
+    'viz4.summary': (lambda detail: _entries_report(viz4._cached_summary, detail), viz4._cached_summary.clear),
+    'viz4.figures': (lambda detail: _entries_report(viz4._cached_figures, detail), viz4._cached_figures.clear),
+    'viz5.cube': (lambda detail: _entries_report(viz5._cached_cube, detail), viz5._cached_cube.clear),
+    'viz5.figures': (lambda detail: _entries_report(viz5._cached_figures, detail), viz5._cached_figures.clear),
+    'tabs.content': (lambda detail: _entries_report(callbacks._tab_content_cache, detail),
+                     callbacks.clear_tab_cache),
+    'geometry.geojson': (lambda detail: _entries_report(geometry_manager._geojson_cache, detail),
+                         geometry_manager.clear_cache),
+    'tiles.index': (lambda detail: _object_report(tile_server._tile_index), tile_server.clear_cache),
+    'tiles.tiles': (lambda detail: _entries_report(tile_server._tile_cache, detail), tile_server._tile_cache.clear),
+}
+
+
+def process_rss() -> Optional[int]:
+    """Resident memory of this worker in bytes"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def get_report(detail: bool = False) -> Dict[str, Any]:
+    """Deep size of every cache (largest first), their total and the worker RSS"""
+    caches = {name: report(detail) for name, (report, _) in CACHES.items()}
+    disk = callback_cache.get_backend()
+    return {
+        'pid': os.getpid(),
+        'rss_bytes': process_rss(),
+        'accounted_bytes': sum(c['bytes'] or 0 for c in caches.values()),
+        'data_version': data_manager.data_version,
+        'caches': dict(sorted(caches.items(), key=lambda kv: -(kv[1]['bytes'] or 0))),
+        # Shared by the workers of the machine, on disk rather than in memory
+        'callback_cache': disk.info() if disk is not None else None,
+    }
+
+
+def evict(names: List[str]) -> Dict[str, Any]:
+    """
+    Drops the named caches ("all" for every in-memory cache, "callback_cache"
+    for the shared disk cache of every worker)
+
+    Returns:
+        Evicted names and RSS before and after
+    """
+    if names == ["all"]:
+        names = list(CACHES)
+    unknown = [name for name in names if name not in CACHES and name != "callback_cache"]
+    if unknown:
+        raise KeyError(", ".join(unknown))
+
+    rss_before = process_rss()
+    for name in names:
+        if name == "callback_cache":
+            _evict_callback_cache()
+        else:
+            CACHES[name][1]()
+    gc.collect()
+    return {'evicted': names, 'rss_before_bytes': rss_before, 'rss_after_bytes': process_rss()}
+
+
+def _check_token():
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), DEBUG_ROUTES_TOKEN.encode()):
+        abort(401)
+
+
+def register_memory_routes(app):
+    """
+    Registers the memory endpoints on the Flask server of the Dash app,
+    only when DEBUG_ROUTES_TOKEN is set
+
+    GET  /debug/memory[?detail=1]           report (with per-entry sizes)
+    POST /debug/memory/evict?cache=a,b      targeted eviction ("all" for every cache)
+    """
+    if not DEBUG_ROUTES_TOKEN:
+        return
+    logger.info("Memory debug routes enabled")
+
+    @app.server.route("/debug/memory")
+    def memory_report():
+        _check_token()
+        return jsonify(get_report(detail=request.args.get("detail") in ("1", "true", "yes")))
+
+    @app.server.route("/debug/memory/evict", methods=["POST"])
+    def memory_evict():
+        _check_token()
+        names = [n.strip() for n in request.args.get("cache", "").split(",") if n.strip()]
+        if not names:
+            abort(400)
+        try:
+            return jsonify(evict(names))
+        except KeyError as e:
+            return jsonify({'error': f"Unknown cache: {e.args[0]}", 'caches': list(CACHES)}), 400
@@ -0,0 +1,289 @@
+"""
+Latency, payload and cache instrumentation exposed in Prometheus text format
+Every Dash callback request is timed on the Flask server, DataManager loads and
+filters are timed with the rows they scan, and caches report hits and misses.
+
+Values are kept per process. Behind one gunicorn port a scrape reaches a single
+worker, so with several workers METRICS_DIR must be set: every worker then
+writes its values to a file of that directory (at most every
+METRICS_FLUSH_INTERVAL seconds) and /metrics serves the sum over all the files.
+Without it, the metrics only describe the worker that answered the scrape and
+hold only with a single worker
+
+Environment:
+    METRICS_DIR             Directory shared by the workers of the machine (empty it before starting gunicorn)
+    METRICS_FLUSH_INTERVAL  Seconds between two writes of a worker's values (default 5)
+"""
+
+import atexit
+import bisect
+import functools
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from flask import Response, g, request
+
+METRICS_DIR = os.environ.get("METRICS_DIR")
+FLUSH_INTERVAL_S = float(os.environ.get("METRICS_FLUSH_INTERVAL", 5))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7)
+
+_lock = threading.Lock()
+_registry = []
+_collectors = []
+
+# File of this process in METRICS_DIR, renamed after a fork
+_process_file = None
+_process_pid = None
+_last_flush = 0.0
+
+
+def _format_labels(labelnames: Sequence[str], values: Tuple, extra: str = "") -> str:
+    parts = []
+    for name, value in zip(labelnames, values):
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{name}="{escaped}"')
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """Monotonic counter per label values"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = defaultdict(float)
+        _registry.append(self)
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with _lock:
+            self._values[key] += amount
+
+    def set(self, value: float, **labels):
+        """Mirrors a total kept elsewhere (e.g. functools.lru_cache statistics)"""
+        key = tuple(labels[name] for name in self.labelnames)
+        with _lock:
+            self._values[key] = value
+
+    def snapshot(self) -> Dict[Tuple, float]:
+        with _lock:
+            return dict(self._values)
+
+    @staticmethod
+    def merge(snapshots: List[Dict[Tuple, float]]) -> Dict[Tuple, float]:
+        merged = defaultdict(float)
+        for snapshot in snapshots:
+            for key, value in snapshot.items():
+                merged[key] += value
+        return merged
+
+    def lines(self, values: Dict[Tuple, float] = None) -> List[str]:
+        values = self.snapshot() if values is None else values
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """Cumulative bucket histogram per label values"""
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        _registry.append(self)
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with _lock:
+            series = self._series.setdefault(key, {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0})
+            series['counts'][bisect.bisect_left(self.buckets, value)] += 1
+            series['sum'] += value
+
+    def snapshot(self) -> Dict[Tuple, dict]:
+        with _lock:
+            return {key: {'counts': list(s['counts']), 'sum': s['sum']} for key, s in self._series.items()}
+
+    @staticmethod
+    def merge(snapshots: List[Dict[Tuple, dict]]) -> Dict[Tuple, dict]:
+        merged = {}
+        for snapshot in snapshots:
+            for key, series in snapshot.items():
+                if key not in merged:
+                    merged[key] = {'counts': list(series['counts']), 'sum': series['sum']}
+                else:
+                    merged[key]['counts'] = [a + b for a, b in zip(merged[key]['counts'], series['counts'])]
+                    merged[key]['sum'] += series['sum']
+        return merged
+
+    def lines(self, series_by_key: Dict[Tuple, dict] = None) -> List[str]:
+        series_by_key = self.snapshot() if series_by_key is None else series_by_key
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(series_by_key.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series['counts']):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                labels = _format_labels(self.labelnames, key, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {series['sum']:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+CALLBACK_LATENCY = Histogram(
+    "dash_callback_duration_seconds", "Time to run and serialize a Dash callback",
+    LATENCY_BUCKETS, ("callback",)
+)
+CALLBACK_PAYLOAD = Histogram(
+    "dash_callback_payload_bytes", "Uncompressed size of Dash callback responses",
+    SIZE_BUCKETS, ("callback",)
+)
+CALLBACK_REQUESTS = Counter(
+    "dash_callback_requests_total", "Dash callback requests by response status",
+    ("callback", "status")
+)
+DATA_LATENCY = Histogram(
+    "data_manager_duration_seconds", "Time spent in DataManager loads and filters",
+    LATENCY_BUCKETS, ("operation",)
+)
+DATA_ROWS = Counter(
+    "data_manager_rows_scanned_total", "Rows read or scanned by DataManager operations",
+    ("operation",)
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit or miss)",
+    ("cache", "result")
+)
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def timed(operation: str) -> Callable:
+    """Records the duration of a function in data_manager_duration_seconds"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                DATA_LATENCY.observe(time.perf_counter() - start, operation=operation)
+        return wrapper
+    return decorator
+
+
+def register_collector(collector: Callable[[], None]):
+    """Registers a function run before each scrape to refresh mirrored values"""
+    _collectors.append(collector)
+
+
+def flush(force: bool = True):
+    """
+    Writes the values of this process to its file in METRICS_DIR
+
+    Unless forced, at most once every FLUSH_INTERVAL_S seconds.
+    """
+    global _process_file, _process_pid, _last_flush
+    if not METRICS_DIR or (not force and time.monotonic() - _last_flush < FLUSH_INTERVAL_S):
+        return
+    _last_flush = time.monotonic()
+    if _process_pid != os.getpid():
+        # A new name per process: a reused pid never overwrites the totals of a dead worker
+        _process_pid = os.getpid()
+        _process_file = os.path.join(METRICS_DIR, f"metrics-{_process_pid}-{uuid.uuid4().hex[:8]}.json")
+
+    payload = {
+        metric.name: [[list(key), value] for key, value in metric.snapshot().items()]
+        for metric in _registry
+    }
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    temporary = f"{_process_file}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(payload, f)
+    os.replace(temporary, _process_file)
+
+
+def _read_process_files() -> List[dict]:
+    snapshots = []
+    for path in glob.glob(os.path.join(METRICS_DIR, "metrics-*.json")):
+        try:
+            with open(path) as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            continue  # replaced while listed
+        snapshots.append({
+            name: {tuple(key): value for key, value in values}
+            for name, values in payload.items()
+        })
+    return snapshots
+
+
+def render() -> str:
+    """
+    Prometheus text of this process, or of every process of METRICS_DIR
+    (dead workers included, so that totals never decrease)
+    """
+    for collector in _collectors:
+        collector()
+    if METRICS_DIR:
+        flush()
+        snapshots = _read_process_files()
+    lines = []
+    for metric in _registry:
+        if METRICS_DIR:
+            lines.extend(metric.lines(metric.merge([s.get(metric.name, {}) for s in snapshots])))
+        else:
+            lines.extend(metric.lines())
+    return "\n".join(lines) + "\n"
+
+
+if METRICS_DIR:
+    atexit.register(flush)
+
+
+def _callback_name() -> str:
+    body = request.get_json(silent=True) or {}
+    return body.get("output", "unknown")
+
+
+def register_metrics_routes(app):
+    """Times callback requests on the Flask server of the Dash app and serves /metrics"""
+
+    @app.server.before_request
+    def start_callback_timer():
+        if request.path == "/_dash-update-component":
+            g.callback_start = time.perf_counter()
+
+    @app.server.after_request
+    def record_callback(response):
+        start = g.pop("callback_start", None)
+        if start is None:
+            return response
+        name = _callback_name()
+        CALLBACK_LATENCY.observe(time.perf_counter() - start, callback=name)
+        CALLBACK_REQUESTS.inc(callback=name, status=str(response.status_code))
+        if not response.direct_passthrough:
+            CALLBACK_PAYLOAD.observe(len(response.get_data()), callback=name)
+        flush(force=False)
+        return response
+
+    @app.server.route("/metrics")
+    def prometheus_metrics():
+        return Response(render(), mimetype="text/plain; version=0.0.4")
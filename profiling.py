@@ -0,0 +1,127 @@
+"""
+Opt-in sampling profiler for Dash callbacks and DataManager calls
+Disabled unless PROFILE_TARGETS is set. A sampled call is profiled with
+cProfile and written as a .prof file (open with snakeviz, flameprof or
+`python -m pstats`)
+
+Environment:
+    PROFILE_TARGETS      Comma-separated callback outputs or DataManager operations
+                         to profile, matched as substrings ("crime-map,load_raw_data"), or "*"
+    PROFILE_SAMPLE_RATE  Share of matching calls that are profiled (default 0.01)
+    PROFILE_DIR          Output directory (default <tmp>/montreal_crimes_profiles)
+    PROFILE_MAX_FILES    Oldest files are deleted beyond this count (default 500)
+"""
+
+import cProfile
+import functools
+import logging
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from typing import Callable
+
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+TARGETS = [t.strip() for t in os.environ.get("PROFILE_TARGETS", "").split(",") if t.strip()]
+SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0.01))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "montreal_crimes_profiles"))
+MAX_FILES = int(os.environ.get("PROFILE_MAX_FILES", 500))
+
+# cProfile profilers cannot be nested: a call inside a profiled request is not profiled again
+_active = threading.local()
+
+
+def is_enabled() -> bool:
+    return bool(TARGETS)
+
+
+def should_profile(name: str) -> bool:
+    if not TARGETS or getattr(_active, 'profiling', False):
+        return False
+    if "*" not in TARGETS and not any(target in name for target in TARGETS):
+        return False
+    return random.random() < SAMPLE_RATE
+
+
+def _start() -> cProfile.Profile:
+    _active.profiling = True
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def _dump(profiler: cProfile.Profile, name: str, elapsed: float):
+    profiler.disable()
+    _active.profiling = False
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("._")[:80]
+    path = os.path.join(
+        PROFILE_DIR,
+        f"{time.strftime('%Y%m%dT%H%M%S')}-{safe_name}-{elapsed * 1000:.0f}ms-{os.getpid()}.prof"
+    )
+    try:
+        profiler.dump_stats(path)
+        _prune()
+    except OSError as e:
+        logger.warning(f"Profile write failed for {path}: {e}")
+        return
+    logger.info(f"Profile of {name} ({elapsed * 1000:.0f} ms) written to {path}")
+
+
+def _prune():
+    files = sorted(
+        (entry.stat().st_mtime, entry.path) for entry in os.scandir(PROFILE_DIR) if entry.name.endswith(".prof")
+    )
+    for _, path in files[:max(len(files) - MAX_FILES, 0)]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def profiled(name: str) -> Callable:
+    """Profiles a sampled share of the calls of a function when name is targeted"""
+    def decorator(func):
+        if not TARGETS:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not should_profile(name):
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            profiler = _start()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _dump(profiler, name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def register_profiling(app):
+    """Profiles sampled callback requests (callback body and JSON encoding) of the Dash app"""
+    if not is_enabled():
+        return
+
+    @app.server.before_request
+    def start_callback_profile():
+        if request.path != "/_dash-update-component":
+            return
+        name = (request.get_json(silent=True) or {}).get("output", "unknown")
+        if should_profile(name):
+            g.callback_profile = (name, time.perf_counter(), _start())
+
+    @app.server.teardown_request
+    def dump_callback_profile(exc=None):
+        profile = g.pop("callback_profile", None)
+        if profile is not None:
+            name, start, profiler = profile
+            _dump(profiler, name, time.perf_counter() - start)
+
+    logger.info(f"Profiling {', '.join(TARGETS)} at rate {SAMPLE_RATE} into {PROFILE_DIR}")
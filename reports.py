@@ -0,0 +1,338 @@
+"""
+Monthly PDF report of every PDQ
+`python reports.py` computes the statistics of all PDQs in a single aggregation
+of the incidents (the monthly trend of viz1, the time of day and day of week
+breakdown of viz2, the crime type matrices of viz5) and renders one PDF per PDQ
+in a process pool. It runs as its own process, outside the web workers
+
+Usage:
+    python reports.py
+    python reports.py --month 2024-06 --pdq 21 22 --output /srv/reports --workers 4
+
+Environment:
+    REPORTS_DIR  Output directory (default <app>/reports, one sub-directory per month)
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from fpdf import FPDF
+from fpdf.enums import XPos, YPos
+
+logger = logging.getLogger(__name__)
+
+REPORTS_DIR = os.environ.get("REPORTS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "reports"))
+
+MONTH_NAMES = ["January", "February", "March", "April", "May", "June", "July",
+               "August", "September", "October", "November", "December"]
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+SHIFT_HOURS = {"Day": "09:01-16:00", "Evening": "16:01-00:00", "Night": "00:01-08:00"}
+
+# Months of the trend table, the report month included
+TREND_MONTHS = 12
+
+
+def _codes(values, categories=None):
+    categorical = pd.Categorical(values, categories=categories)
+    return categorical.codes.astype(np.int64), list(categorical.categories)
+
+
+def get_count_cube(data: pd.DataFrame) -> dict:
+    """
+    Incident counts per (PDQ, year, month, crime type, shift, day of week)
+
+    Every report statistic is a sum over some axes of this cube. Incidents
+    without PDQ or crime type are left out; shift keeps an extra last slot
+    for missing values so that the totals match the PDQ's incidents. Years
+    are every calendar year from the first to the last, those without
+    incidents zero-filled, so that consecutive slots are consecutive months.
+    """
+    df = data.dropna(subset=["PDQ", "CrimeType"])
+
+    pdq_codes, pdqs = _codes(df["PDQ"])
+    first_year = int(df["YEAR"].min()) if len(df) else 0
+    years = list(range(first_year, int(df["YEAR"].max()) + 1)) if len(df) else []
+    year_codes = df["YEAR"].to_numpy(np.int64) - first_year
+    crime_codes, crime_types = _codes(df["CrimeType"].astype(str), sorted(df["CrimeType"].dropna().unique()))
+    shift_codes, shifts = _codes(df["Shift"].astype(object), sorted(df["Shift"].dropna().unique()))
+    shift_codes[shift_codes < 0] = len(shifts)
+
+    shape = (len(pdqs), len(years), 12, len(crime_types), len(shifts) + 1, 7)
+    flat = np.ravel_multi_index(
+        (pdq_codes, year_codes, df["MONTH"].to_numpy(np.int64) - 1, crime_codes, shift_codes,
+         df["DayOfWeek"].to_numpy(np.int64)),
+        shape,
+    )
+    counts = np.bincount(flat, minlength=int(np.prod(shape))).reshape(shape)
+
+    return {
+        'counts': counts,
+        'pdqs': [int(pdq) for pdq in pdqs],
+        'years': years,
+        'crime_types': crime_types,
+        'shifts': shifts + ["Unknown"],
+    }
+
+
+def latest_month(data: pd.DataFrame) -> str:
+    """Month of the most recent incident, as YYYY-MM"""
+    return data["DATE"].max().strftime("%Y-%m")
+
+
+def compute_statistics(cube: dict, month: str, pdq_names: Optional[Dict[int, str]] = None) -> List[dict]:
+    """
+    Report statistics of every PDQ for month (YYYY-MM), computed on all PDQs at once
+
+    Returns:
+        One small dict of labels and plain lists per PDQ, cheap to send to a worker process
+    """
+    year, month_number = (int(part) for part in month.split("-"))
+    if not 1 <= month_number <= 12:
+        raise ValueError(f"Invalid month: {month}")
+    years = cube['years']
+    if year not in years:
+        raise ValueError(f"No incident in {year} (data covers {years[0]}-{years[-1]})")
+
+    # (PDQ, period, crime type, shift, day of week) with one period per calendar
+    # month: the years of the cube are consecutive, so period - 1 is the previous
+    # month and period - 12 the same month of the previous year
+    counts = cube['counts']
+    periods = counts.reshape((counts.shape[0], -1) + counts.shape[3:])
+    period = years.index(year) * 12 + month_number - 1
+
+    current = periods[:, period]
+    previous = periods[:, period - 1].sum(axis=(1, 2, 3)) if period >= 1 else None
+    last_year = periods[:, period - 12].sum(axis=(2, 3)) if period >= 12 else None
+
+    first = max(period - TREND_MONTHS + 1, 0)
+    trend = periods[:, first:period + 1].sum(axis=(2, 3, 4))
+    trend_labels = [f"{MONTH_NAMES[p % 12][:3]} {years[p // 12]}" for p in range(first, period + 1)]
+
+    by_crime_shift = current.sum(axis=3)
+    by_shift = by_crime_shift.sum(axis=1)
+    by_day = current.sum(axis=(1, 2))
+    # Year to date, January to the report month, of every year up to the report year
+    year_to_date = counts[:, :years.index(year) + 1, :month_number].sum(axis=(2, 4, 5))
+
+    shifts = cube['shifts']
+    crime_types = cube['crime_types']
+    pdq_names = pdq_names or {}
+    statistics = []
+    for i, pdq in enumerate(cube['pdqs']):
+        shown_shifts = [s for s, label in enumerate(shifts) if label != "Unknown" or by_shift[i, s]]
+        statistics.append({
+            'pdq': pdq,
+            'name': pdq_names.get(pdq, f"PDQ {pdq}"),
+            'month': month,
+            'month_label': f"{MONTH_NAMES[month_number - 1]} {year}",
+            'total': int(current[i].sum()),
+            'previous_month': int(previous[i]) if previous is not None else None,
+            'same_month_last_year': int(last_year[i].sum()) if last_year is not None else None,
+            'trend': list(zip(trend_labels, trend[i].tolist())),
+            'trend_median': float(np.median(trend[i])),
+            'shifts': [shifts[s] for s in shown_shifts],
+            'by_shift': by_shift[i, shown_shifts].tolist(),
+            'by_day': list(zip(DAY_NAMES, by_day[i].tolist())),
+            'crime_types': crime_types,
+            'by_crime_shift': by_crime_shift[i][:, shown_shifts].tolist(),
+            'by_crime_last_year': last_year[i].tolist() if last_year is not None else None,
+            'years': years[:years.index(year) + 1],
+            'by_crime_year_to_date': year_to_date[i].T.tolist(),
+        })
+    return statistics
+
+
+def _change(current: int, reference: Optional[int]) -> str:
+    if not reference:
+        return "-"
+    return f"{(current - reference) / reference:+.0%}"
+
+
+def _share(count: int, total: int) -> str:
+    return f"{count / total:.0%}" if total else "-"
+
+
+# Characters of the PDQ names outside Latin-1, with their closest Latin-1 spelling
+LATIN1_SUBSTITUTES = str.maketrans({"–": "-", "—": "-", "œ": "oe", "Œ": "OE", "’": "'"})
+
+
+def _latin1(text: str) -> str:
+    # The core PDF fonts only cover Latin-1
+    return text.translate(LATIN1_SUBSTITUTES).encode("latin-1", "replace").decode("latin-1")
+
+
+class PDQReportPDF(FPDF):
+    def __init__(self, statistics: dict):
+        super().__init__(orientation="P", unit="mm", format="A4")
+        self.statistics = statistics
+        self.set_auto_page_break(auto=True, margin=15)
+        self.set_title(f"PDQ {statistics['pdq']} - {statistics['month_label']}")
+
+    def header(self):
+        self.set_font("Helvetica", "B", 15)
+        self.cell(0, 9, f"Montreal Crime Report - PDQ {self.statistics['pdq']}",
+                  new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C")
+        self.set_font("Helvetica", "", 10)
+        self.cell(0, 6, _latin1(self.statistics['name']), new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C")
+        self.cell(0, 6, self.statistics['month_label'], new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C")
+        self.ln(4)
+
+    def footer(self):
+        self.set_y(-12)
+        self.set_font("Helvetica", "I", 8)
+        self.cell(0, 6, f"Page {self.page_no()}/{{nb}}", align="C")
+
+    def add_table(self, title: str, headers: Sequence[str], rows: Sequence[Sequence], col_widths: Sequence[float]):
+        """Table with a bold header row; the first column is a label, the others are right-aligned"""
+        if self.will_page_break(8 + 6 * (len(rows) + 1)):
+            self.add_page()
+        self.set_font("Helvetica", "B", 11)
+        self.cell(0, 8, title, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+        self.set_font("Helvetica", "B", 8)
+        for header, width in zip(headers, col_widths):
+            self.cell(width, 6, header, border=1, align="C")
+        self.ln()
+
+        self.set_font("Helvetica", "", 8)
+        for row in rows:
+            for i, (value, width) in enumerate(zip(row, col_widths)):
+                self.cell(width, 6, _latin1(str(value)), border=1, align="L" if i == 0 else "R")
+            self.ln()
+        self.ln(4)
+
+
+def render_report(statistics: dict, path: str) -> str:
+    """Writes the PDF of one PDQ; runs in a worker process"""
+    pdf = PDQReportPDF(statistics)
+    pdf.add_page()
+    total = statistics['total']
+
+    pdf.add_table(
+        "Summary",
+        ["", "Incidents", "Change"],
+        [
+            ["Report month", total, ""],
+            ["Previous month", statistics['previous_month'] if statistics['previous_month'] is not None else "-",
+             _change(total, statistics['previous_month'])],
+            ["Same month last year",
+             statistics['same_month_last_year'] if statistics['same_month_last_year'] is not None else "-",
+             _change(total, statistics['same_month_last_year'])],
+            [f"Median of the last {len(statistics['trend'])} months", f"{statistics['trend_median']:g}",
+             _change(total, statistics['trend_median'])],
+        ],
+        [80, 30, 30],
+    )
+
+    pdf.add_table("Monthly trend", ["Month", "Incidents"], statistics['trend'], [40, 30])
+
+    pdf.add_table(
+        "Time of day",
+        ["Shift", "Hours", "Incidents", "Share"],
+        [[shift, SHIFT_HOURS.get(shift, "-"), count, _share(count, total)]
+         for shift, count in zip(statistics['shifts'], statistics['by_shift'])],
+        [40, 35, 30, 25],
+    )
+
+    pdf.add_table(
+        "Day of week",
+        ["Day", "Incidents", "Share"],
+        [[day, count, _share(count, total)] for day, count in statistics['by_day']],
+        [40, 30, 25],
+    )
+
+    last_year = statistics['by_crime_last_year']
+    shift_width = min(25, 90 / len(statistics['shifts']))
+    pdf.add_table(
+        "Crime type by shift",
+        ["Crime type"] + statistics['shifts'] + ["Total", "vs last year"],
+        [
+            [crime] + row + [sum(row), _change(sum(row), last_year[c] if last_year else None)]
+            for c, (crime, row) in enumerate(zip(statistics['crime_types'], statistics['by_crime_shift']))
+        ],
+        [50] + [shift_width] * len(statistics['shifts']) + [20, 25],
+    )
+
+    years = statistics['years']
+    year_width = min(20, 140 / len(years))
+    pdf.add_table(
+        f"Crime type by year, January to {statistics['month_label'].split()[0]}",
+        ["Crime type"] + [str(year) for year in years],
+        [[crime] + row for crime, row in zip(statistics['crime_types'], statistics['by_crime_year_to_date'])],
+        [50] + [year_width] * len(years),
+    )
+
+    pdf.output(path)
+    return path
+
+
+def generate_reports(data: pd.DataFrame,
+                     month: str,
+                     output: str,
+                     pdqs: Optional[Sequence[int]] = None,
+                     workers: Optional[int] = None,
+                     pdq_names: Optional[Dict[int, str]] = None) -> List[str]:
+    """
+    Renders the report of every PDQ (or of pdqs) for month into output
+
+    Returns:
+        Paths of the written PDFs
+    """
+    start = time.perf_counter()
+    statistics = compute_statistics(get_count_cube(data), month, pdq_names)
+    if pdqs is not None:
+        statistics = [s for s in statistics if s['pdq'] in pdqs]
+    logger.info(f"Statistics of {len(statistics)} PDQs in {time.perf_counter() - start:.2f} s")
+
+    os.makedirs(output, exist_ok=True)
+    paths = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(render_report, s, os.path.join(output, f"PDQ-{s['pdq']:02d}_{month}.pdf")): s['pdq']
+            for s in statistics
+        }
+        for future in as_completed(futures):
+            try:
+                paths.append(future.result())
+            except Exception as e:
+                logger.error(f"Report of PDQ {futures[future]} failed: {e}")
+    logger.info(f"{len(paths)} reports written to {output} in {time.perf_counter() - start:.2f} s")
+    return sorted(paths)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--month", help="Report month as YYYY-MM (default: month of the latest incident)")
+    parser.add_argument("--pdq", type=int, nargs="+", help="PDQs to report (default: all)")
+    parser.add_argument("--data", help="Incidents CSV (default: the file the app would serve)")
+    parser.add_argument("--output", help=f"Output directory (default: {REPORTS_DIR}/<month>)")
+    parser.add_argument("--workers", type=int, help="Rendering processes (default: number of CPUs)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    from data_manager import data_manager
+    from visualizations.viz2 import pdq_names
+
+    if args.data:
+        data_manager.data_path = args.data
+    data_manager.load_raw_data()
+    data = data_manager.raw_data
+
+    month = args.month or latest_month(data)
+    output = args.output or os.path.join(REPORTS_DIR, month)
+    try:
+        paths = generate_reports(data, month, output, args.pdq, args.workers, pdq_names)
+    except ValueError as e:
+        parser.error(str(e))
+    return 0 if paths else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
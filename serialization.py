@@ -0,0 +1,57 @@
+"""
+Fast JSON serialization of plotly figures and Dash components
+Encodes with orjson (numpy arrays written directly from their buffers) and
+decodes back to plain dicts and lists. The figure caches keep that decoded
+form, which Dash encodes much faster than figure objects, since it skips
+plotly's validation and per-value cleaning
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+from plotly.io.json import to_json_plotly
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj):
+    """Types orjson cannot write natively (figures, components, pandas, object arrays)"""
+    if hasattr(obj, "to_plotly_json"):
+        return obj.to_plotly_json()
+    if isinstance(obj, np.ndarray):
+        # Non-contiguous or non-numeric arrays
+        if obj.dtype.kind in "iufb":
+            return np.ascontiguousarray(obj)
+        return obj.tolist()
+    if isinstance(obj, (pd.Series, pd.Index, pd.Categorical)):
+        return _default(np.asarray(obj))
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if obj is pd.NaT:
+        return None
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def encode(obj) -> bytes:
+    """Encodes a figure, component tree or plain structure to JSON bytes"""
+    if orjson is None:
+        return to_json_plotly(obj).encode()
+    try:
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+    except TypeError:
+        # Rare types (PIL images, sage numbers...) handled by plotly's cleaning encoder
+        return to_json_plotly(obj).encode()
+
+
+def decode(data: bytes):
+    """Decodes encoded bytes to plain dicts and lists, ready to return from a callback"""
+    if orjson is None:
+        return json.loads(data)
+    return orjson.loads(data)
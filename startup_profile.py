@@ -0,0 +1,106 @@
+"""
+Import-time startup profile of the Dash application
+Runs `python -X importtime -c "import app"` in a fresh interpreter and reports
+the cost of each imported package, to guard worker boot time on deploy
+
+Usage:
+    python startup_profile.py                   # report
+    python startup_profile.py --budget 3.0      # fail if startup exceeds 3 s
+    python startup_profile.py --json report.json
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List
+
+# Dependencies that must only be imported by the tab/callback that needs them
+LAZY_MODULES = ["geopandas", "shapely", "pyproj", "pyogrio", "plotly.express"]
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def profile_imports(module: str = "app") -> List[Dict]:
+    """
+    Imports a module in a fresh interpreter and parses its -X importtime output
+
+    Returns:
+        One entry per imported module with self and cumulative time in seconds
+    """
+    root = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")])))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Import of '{module}' failed:\n{result.stderr[-2000:]}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append({
+                'module': name,
+                'self_s': int(self_us) / 1e6,
+                'cumulative_s': int(cumulative_us) / 1e6,
+                'depth': len(indent) // 2,
+            })
+    return entries
+
+
+def summarize(entries: List[Dict], module: str = "app") -> Dict:
+    """Aggregates self time per top-level package"""
+    per_package = defaultdict(float)
+    for entry in entries:
+        per_package[entry['module'].split(".")[0]] += entry['self_s']
+
+    total = next((e['cumulative_s'] for e in entries if e['module'] == module), sum(per_package.values()))
+    imported = {entry['module'] for entry in entries}
+    return {
+        'module': module,
+        'total_s': round(total, 4),
+        'packages': dict(sorted(((k, round(v, 4)) for k, v in per_package.items()), key=lambda kv: -kv[1])),
+        'lazy_modules_loaded': [m for m in LAZY_MODULES if m in imported],
+    }
+
+
+def print_report(summary: Dict, top: int = 20):
+    print(f"Startup import time of '{summary['module']}': {summary['total_s']:.3f} s")
+    print(f"{'package':<30}{'seconds':>10}{'share':>8}")
+    for package, seconds in list(summary['packages'].items())[:top]:
+        share = seconds / summary['total_s'] * 100 if summary['total_s'] else 0
+        print(f"{package:<30}{seconds:>10.3f}{share:>7.1f}%")
+    if summary['lazy_modules_loaded']:
+        print(f"Loaded at startup but expected lazy: {', '.join(summary['lazy_modules_loaded'])}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--module", default="app", help="Module to import (default: app)")
+    parser.add_argument("--top", type=int, default=20, help="Number of packages to show")
+    parser.add_argument("--budget", type=float, help="Fail if total import time exceeds this many seconds")
+    parser.add_argument("--json", dest="json_path", help="Also write the report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    summary = summarize(profile_imports(args.module), args.module)
+    print_report(summary, args.top)
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    failed = bool(summary['lazy_modules_loaded'])
+    if args.budget is not None and summary['total_s'] > args.budget:
+        print(f"Startup budget exceeded: {summary['total_s']:.3f} s > {args.budget:.3f} s")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+"""
+Shared test setup
+The app modules read their configuration from the environment at import time,
+so a small synthetic incidents CSV and private cache directories are set up
+before any of them is imported
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks import synthetic_data
+
+TEST_DIR = tempfile.mkdtemp(prefix="montreal_crimes_tests_")
+DATA_PATH = os.path.join(TEST_DIR, "actes-criminels.csv")
+ROWS = 20_000
+
+os.environ["CRIMES_DATA_PATH"] = DATA_PATH
+os.environ["ARTIFACTS_DIR"] = os.path.join(TEST_DIR, "artifacts")
+os.environ["GEOMETRY_CACHE_DIR"] = os.path.join(TEST_DIR, "geometry")
+os.environ["CALLBACK_CACHE_DIR"] = os.path.join(TEST_DIR, "callback_cache")
+os.environ["BACKGROUND_CALLBACKS_DISABLED"] = "1"
+os.environ["DATA_RELOAD_INTERVAL"] = "0"
+os.environ.pop("METRICS_DIR", None)
+
+synthetic_data.generate(DATA_PATH, ROWS, synthetic_data.default_geojson_path(), seed=7)
+
+
+@pytest.fixture(scope="session")
+def incidents():
+    """Prepared incidents of the synthetic CSV, as loaded by the DataManager"""
+    from data_manager import data_manager
+    return data_manager.load_raw_data()
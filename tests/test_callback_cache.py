@@ -0,0 +1,123 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from dash import no_update
+
+import callback_cache
+from callback_cache import FileSystemCache, memoize
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    monkeypatch.delenv("CALLBACK_CACHE_DISABLED", raising=False)
+    backend = FileSystemCache(str(tmp_path), max_bytes=1024 * 1024)
+    monkeypatch.setattr(callback_cache, "_backend", backend)
+    callback_cache.clear_cache()
+    return backend
+
+
+def test_memoize_serves_hits_from_the_backend(backend):
+    calls = []
+
+    @memoize("test.figure")
+    def figure(pdq, years=None):
+        calls.append((pdq, years))
+        return {'data': [{'x': [1, 2], 'y': [pdq, pdq]}], 'layout': {'title': str(years)}}
+
+    first = figure(22, years=[2018, 2020])
+    second = figure(22, years=[2018, 2020])
+    figure(23, years=[2018, 2020])
+
+    assert calls == [(22, [2018, 2020]), (23, [2018, 2020])]
+    assert second == first
+    assert callback_cache.get_stats()['callbacks']['test.figure'] == {'hits': 1, 'misses': 2, 'hit_rate': 0.3333}
+    assert backend.info()['entries'] == 2
+
+
+def test_memoize_never_caches_no_update(backend):
+    calls = []
+
+    @memoize("test.no_update")
+    def callback(value):
+        calls.append(value)
+        return no_update, value
+
+    callback(1)
+    callback(1)
+    assert calls == [1, 1]
+    assert backend.info()['entries'] == 0
+
+
+def test_keys_change_with_the_app_version(backend, monkeypatch):
+    key = callback_cache.make_key("test.version", (1,), {})
+    monkeypatch.setattr(callback_cache, "_app_version", "another-release")
+    assert callback_cache.make_key("test.version", (1,), {}) != key
+
+
+def test_disabled_cache_runs_every_call(backend, monkeypatch):
+    monkeypatch.setenv("CALLBACK_CACHE_DISABLED", "1")
+    calls = []
+
+    @memoize("test.disabled")
+    def callback(value):
+        calls.append(value)
+        return value
+
+    callback(1)
+    callback(1)
+    assert calls == [1, 1]
+
+
+def test_eviction_drops_least_recently_used_entries(tmp_path):
+    cache = FileSystemCache(str(tmp_path), max_bytes=10_000)
+    value = b"x" * 1000
+    for i in range(9):
+        cache.set(f"k{i}", value)
+        os.utime(cache._path(f"k{i}"), (1_000_000 + i, 1_000_000 + i))
+    # Reading an entry makes it the most recently used
+    assert cache.get("k0") == value
+
+    cache.set("k9", value)
+    cache.set("k10", value)
+
+    info = cache.info()
+    assert info['bytes'] <= 10_000 * callback_cache.EVICTION_TARGET
+    assert cache.get("k0") == value
+    assert cache.get("k1") is None and cache.get("k2") is None
+    assert cache.get("k10") == value
+
+
+def test_tracked_size_follows_overwrites(tmp_path):
+    cache = FileSystemCache(str(tmp_path), max_bytes=10_000)
+    cache.set("a", b"x" * 100)
+    cache.set("a", b"x" * 300)
+    cache.set("b", b"x" * 50)
+    assert cache._bytes == cache.info()['bytes'] == 350
+
+
+WORKER = """
+import json
+import callback_cache
+from visualizations import viz4
+
+viz4.update_scatter_plot([2017, 2022], ["West", "North"])
+print(json.dumps(callback_cache.get_stats()['callbacks']['update_scatter_plot']))
+"""
+
+
+def test_scatter_outputs_are_shared_between_workers(tmp_path):
+    env = {**os.environ, "CALLBACK_CACHE_DIR": str(tmp_path)}
+    env.pop("CALLBACK_CACHE_DISABLED", None)
+
+    def run_worker():
+        result = subprocess.run([sys.executable, "-c", WORKER], cwd=ROOT, env=env,
+                                capture_output=True, text=True, check=True)
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    assert run_worker()['misses'] == 1
+    assert run_worker() == {'hits': 1, 'misses': 0, 'hit_rate': 1.0}
@@ -0,0 +1,17 @@
+import background_jobs
+import callbacks
+
+
+def test_tabs_warm_up_in_a_worker_thread(monkeypatch):
+    monkeypatch.setattr(callbacks, "_warm_tabs", {})
+    monkeypatch.setattr(callbacks, "_tab_content_cache", {})
+    assert not background_jobs.is_enabled()
+    assert not callbacks.is_tab_warm("viz5")
+
+    placeholder = callbacks.build_warmup_placeholder("viz5")
+    assert placeholder.children[0].id == "warmup-poll"
+
+    callbacks.start_warm_up("viz5")
+    background_jobs._threads["warmup:viz5"].join(timeout=60)
+    assert callbacks.is_tab_warm("viz5")
+    assert callbacks._warm_up_progress["viz5"][2] == "Rendering"
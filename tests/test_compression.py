@@ -0,0 +1,61 @@
+import gzip
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+import compression
+
+
+@pytest.fixture
+def client():
+    server = Flask(__name__)
+
+    @server.route("/_dash-layout")
+    def layout():
+        return "x" * int(server.config["BODY_SIZE"])
+
+    @server.route("/assets/app.js")
+    def asset():
+        return "x" * int(server.config["BODY_SIZE"])
+
+    compression.register_compression(SimpleNamespace(server=server))
+    server.config["BODY_SIZE"] = compression.MIN_SIZE
+    return server.test_client()
+
+
+def test_responses_from_the_threshold_are_gzipped(client):
+    response = client.get("/_dash-layout", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert gzip.decompress(response.data) == b"x" * compression.MIN_SIZE
+
+
+def test_responses_below_the_threshold_are_sent_as_is(client):
+    client.application.config["BODY_SIZE"] = compression.MIN_SIZE - 1
+    response = client.get("/_dash-layout", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert len(response.data) == compression.MIN_SIZE - 1
+
+
+def test_clients_without_gzip_get_plain_responses(client):
+    response = client.get("/_dash-layout", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in response.headers
+
+
+def test_other_paths_are_left_alone(client):
+    response = client.get("/assets/app.js", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+
+
+@pytest.mark.parametrize("accept_encoding, with_brotli, expected", [
+    ("gzip, deflate, br", True, "br"),
+    ("gzip, deflate, br", False, "gzip"),
+    ("br;q=1.0, gzip;q=0.8", True, "br"),
+    ("GZIP", False, "gzip"),
+    ("deflate", True, None),
+    ("", True, None),
+])
+def test_choose_encoding(monkeypatch, accept_encoding, with_brotli, expected):
+    monkeypatch.setattr(compression, "brotli", object() if with_brotli else None)
+    assert compression.choose_encoding(accept_encoding) == expected
@@ -0,0 +1,43 @@
+import os
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+from flask import Flask
+
+import data_reload
+from data_manager import data_manager
+
+
+def test_reload_swaps_in_the_parquet_snapshot(incidents, tmp_path, monkeypatch):
+    monkeypatch.setattr(data_reload, "SNAPSHOT_DIR", str(tmp_path))
+    monkeypatch.setattr(data_reload.background_jobs, "get_cache", lambda: object())
+    monkeypatch.setattr(data_reload.callbacks, "prerender_tabs", lambda: None)
+    data_version = data_manager.data_version
+    frame = data_manager.raw_data
+
+    def build_artifacts(version):
+        frame.to_parquet(data_reload.snapshot_path(version), index=False)
+    monkeypatch.setattr(data_reload, "build_artifacts", build_artifacts)
+    monkeypatch.setattr(data_manager, "read_data", lambda version: pytest.fail("CSV read instead of the snapshot"))
+    (tmp_path / "incidents-old-version.parquet").write_bytes(b"")
+
+    data_reload.reload(data_version)
+
+    assert data_manager.data_version == data_version
+    assert data_manager.raw_data is not frame
+    pd.testing.assert_frame_equal(data_manager.raw_data, frame)
+    assert os.listdir(tmp_path) == [os.path.basename(data_reload.snapshot_path(data_version))]
+
+
+def test_watcher_starts_with_the_first_request_of_a_worker(monkeypatch):
+    started = []
+    monkeypatch.setattr(data_reload, "_watcher", None)
+    monkeypatch.setattr(data_reload, "start_watcher", lambda: started.append(os.getpid()))
+    server = Flask(__name__)
+    server.route("/")(lambda: "ok")
+    data_reload.register_reload_watcher(SimpleNamespace(server=server))
+
+    assert started == []
+    server.test_client().get("/")
+    assert started == [os.getpid()]
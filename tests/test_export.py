@@ -0,0 +1,98 @@
+import io
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+from flask import Flask
+
+import export
+from data_manager import data_manager
+
+
+@pytest.fixture(scope="module")
+def client():
+    server = Flask(__name__)
+    export.register_export_routes(SimpleNamespace(server=server))
+    return server.test_client()
+
+
+def _mask(data, year_range=None, pdqs=None, categories=None):
+    mask = np.ones(len(data), dtype=bool)
+    if year_range is not None:
+        mask &= data["YEAR"].between(*year_range).to_numpy()
+    if pdqs is not None:
+        mask &= data["PDQ"].isin(pdqs).to_numpy()
+    if categories is not None:
+        mask &= (data["CATEGORIE"].isin(categories) | data["CrimeType"].isin(categories)).to_numpy()
+    return mask
+
+
+@pytest.mark.parametrize("year_range, pdqs", [
+    (None, None), ((2018, 2020), None), (None, [21, 22]), ((2016, 2016), [38, 5, 999]), ((1990, 1991), None),
+])
+def test_indexed_rows_match_a_scan(incidents, year_range, pdqs):
+    data, positions = data_manager.get_indexed_rows(year_range, pdqs)
+    assert positions.tolist() == np.flatnonzero(_mask(data, year_range, pdqs)).tolist()
+
+
+@pytest.mark.filterwarnings("error")
+def test_rows_without_a_date_only_match_without_a_year_range(incidents, monkeypatch):
+    data = incidents.copy()
+    data.loc[data.index[[3, 10]], "DATE"] = pd.NaT
+    data["YEAR"] = data["DATE"].dt.year
+    monkeypatch.setattr(data_manager, "_current_data", lambda: (data, "without-dates"))
+    monkeypatch.setattr(data_manager, "_row_index", None)
+
+    for year_range, pdqs in [(None, None), ((2015, 2025), None), (None, [21, 22])]:
+        _, positions = data_manager.get_indexed_rows(year_range, pdqs)
+        assert positions.tolist() == np.flatnonzero(_mask(data, year_range, pdqs)).tolist()
+    assert {3, 10} <= set(data_manager.get_indexed_rows()[1].tolist())
+
+
+def test_batches_keep_order_and_filter_categories(incidents):
+    data, positions = data_manager.get_indexed_rows((2017, 2021), None)
+    categories = ["Méfait", "Robbery"]  # French category or English crime type
+
+    batches = list(export.iter_batches(data, positions, categories, batch_rows=1000))
+    assert len(batches) == -(-len(positions) // 1000)
+    exported = pd.concat(batches)
+    expected = data[_mask(data, (2017, 2021), None, categories)]
+    assert exported.index.tolist() == expected.index.tolist()
+    assert list(exported.columns) == export.EXPORT_COLUMNS
+    assert set(exported["CATEGORIE"]) == {"Méfait", "Vols qualifiés"}
+
+
+def test_csv_export_equals_the_filtered_frame(client, incidents):
+    response = client.get("/export/incidents.csv?years=2019-2022&pdq=21,22,38&category=Introduction")
+    assert response.status_code == 200
+
+    data = data_manager.raw_data
+    expected = data[_mask(data, (2019, 2022), [21, 22, 38], ["Introduction"])][export.EXPORT_COLUMNS]
+    assert response.data == expected.to_csv(index=False).encode("utf-8")
+
+
+def test_empty_csv_export_still_has_the_header(client):
+    response = client.get("/export/incidents.csv?years=1990-1991")
+    assert response.data.decode("utf-8").strip() == ",".join(export.EXPORT_COLUMNS)
+
+
+@pytest.mark.skipif(export.pq is None, reason="pyarrow is not installed")
+def test_parquet_export_round_trips(client, incidents):
+    response = client.get("/export/incidents.parquet?years=2020-2020")
+    exported = pd.read_parquet(io.BytesIO(response.data))
+
+    data = data_manager.raw_data
+    expected = data[_mask(data, (2020, 2020))][export.EXPORT_COLUMNS]
+    assert len(exported) == len(expected)
+    assert exported["PDQ"].tolist() == pytest.approx(expected["PDQ"].tolist(), nan_ok=True)
+    assert exported["DATE"].tolist() == expected["DATE"].tolist()
+
+
+@pytest.mark.parametrize("query", ["years=2019", "years=a-b", "pdq=twenty"])
+def test_invalid_filters_are_rejected(client, query):
+    assert client.get(f"/export/incidents.csv?{query}").status_code == 400
+
+
+def test_unknown_format_is_not_found(client):
+    assert client.get("/export/incidents.xlsx").status_code == 404
@@ -0,0 +1,89 @@
+import pandas as pd
+import pytest
+
+import reports
+
+
+@pytest.fixture(scope="module")
+def cube(incidents):
+    return reports.get_count_cube(incidents)
+
+
+def test_count_cube_covers_every_incident_with_a_pdq(incidents, cube):
+    assert cube['counts'].sum() == len(incidents.dropna(subset=["PDQ", "CrimeType"]))
+
+
+def _period(data, year, month):
+    return data[(data["YEAR"] == year) & (data["MONTH"] == month)]
+
+
+@pytest.mark.parametrize("month", ["2025-06", "2020-03", "2015-01"])
+def test_statistics_match_pandas(incidents, cube, month):
+    year, month_number = (int(part) for part in month.split("-"))
+    statistics = {s['pdq']: s for s in reports.compute_statistics(cube, month, {22: "Centre-Sud"})}
+    data = incidents.dropna(subset=["PDQ", "CrimeType"])
+
+    assert sorted(statistics) == sorted(int(pdq) for pdq in data["PDQ"].unique())
+    assert statistics[22]['name'] == "Centre-Sud"
+    assert statistics[38]['name'] == "PDQ 38"
+
+    for pdq in (22, 38, 5):
+        stats = statistics[pdq]
+        rows = data[data["PDQ"] == pdq]
+        current = _period(rows, year, month_number)
+        previous = pd.Timestamp(year=year, month=month_number, day=1) - pd.DateOffset(months=1)
+
+        assert stats['total'] == len(current)
+        if year == cube['years'][0] and month_number == 1:
+            assert stats['previous_month'] is None and stats['same_month_last_year'] is None
+        else:
+            assert stats['previous_month'] == len(_period(rows, previous.year, previous.month))
+        if year > cube['years'][0]:
+            assert stats['same_month_last_year'] == len(_period(rows, year - 1, month_number))
+
+        by_day = current["DayOfWeek"].value_counts()
+        assert [count for _, count in stats['by_day']] == [int(by_day.get(d, 0)) for d in range(7)]
+        by_shift = current["Shift"].astype(object).value_counts()
+        assert stats['by_shift'] == [int(by_shift.get(shift, 0)) for shift in stats['shifts']]
+
+        trend_months = pd.period_range(end=pd.Period(month, "M"), periods=reports.TREND_MONTHS, freq="M")
+        trend_months = trend_months[trend_months.year >= cube['years'][0]]
+        assert [count for _, count in stats['trend']] == [len(_period(rows, p.year, p.month)) for p in trend_months]
+
+        year_to_date = rows[(rows["YEAR"] <= year) & (rows["MONTH"] <= month_number)]
+        expected = pd.crosstab(year_to_date["CrimeType"].astype(str), year_to_date["YEAR"])
+        expected = expected.reindex(index=cube['crime_types'], columns=stats['years'], fill_value=0)
+        assert stats['by_crime_year_to_date'] == expected.values.tolist()
+
+
+def test_statistics_reject_months_outside_the_data(cube):
+    with pytest.raises(ValueError):
+        reports.compute_statistics(cube, "1990-01")
+    with pytest.raises(ValueError):
+        reports.compute_statistics(cube, "2020-13")
+
+
+def test_statistics_skip_years_without_incidents(incidents):
+    data = incidents.dropna(subset=["PDQ", "CrimeType"])
+    data = data[data["YEAR"] != 2019]
+    cube = reports.get_count_cube(data)
+    assert cube['years'] == list(range(2015, 2026))
+
+    stats = {s['pdq']: s for s in reports.compute_statistics(cube, "2020-01")}[22]
+    rows = data[data["PDQ"] == 22]
+    assert stats['previous_month'] == 0
+    assert stats['same_month_last_year'] == 0
+    assert stats['trend'][-1] == ("Jan 2020", len(_period(rows, 2020, 1)))
+    assert stats['trend'][-2] == ("Dec 2019", 0)
+    assert stats['years'] == list(range(2015, 2021))
+
+    stats = {s['pdq']: s for s in reports.compute_statistics(cube, "2021-03")}[22]
+    assert stats['same_month_last_year'] == len(_period(rows, 2020, 3))
+
+
+def test_pdq_names_fit_the_pdf_fonts():
+    from visualizations.viz2 import pdq_names
+
+    for name in pdq_names.values():
+        assert "contentReference" not in name
+        assert "?" not in reports._latin1(name)
@@ -0,0 +1,101 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from flask import Flask
+
+import tile_server
+from visualizations import viz3
+
+
+@pytest.fixture(scope="module")
+def index():
+    return tile_server.build_tile_index()
+
+
+def _tiles_at(index, z):
+    """Tile (x, y) of every indexed incident at zoom z"""
+    tx, ty = tile_server.lonlat_to_tile(index['lon'], index['lat'], tile_server.INDEX_ZOOM)
+    shift = tile_server.INDEX_ZOOM - z
+    return tx.astype(np.int64) >> shift, ty.astype(np.int64) >> shift
+
+
+def _busiest_tile(index, z):
+    xs, ys = _tiles_at(index, z)
+    tiles, counts = np.unique(np.stack([xs, ys], axis=1), axis=0, return_counts=True)
+    x, y = tiles[np.argmax(counts)]
+    return int(x), int(y)
+
+
+def test_morton_interleaves_bits():
+    x = np.array([0, 1, 0, 1, 2, 3, 5])
+    y = np.array([0, 0, 1, 1, 0, 3, 9])
+    assert tile_server._morton(x, y).tolist() == [0, 1, 2, 3, 4, 15, 0b10010011]
+
+
+def test_index_is_sorted_by_morton_code(index):
+    assert np.all(np.diff(index['codes'].astype(np.float64)) >= 0)
+
+
+@pytest.mark.parametrize("z", [0, 8, 12, 15, 18, tile_server.INDEX_ZOOM])
+def test_tile_slice_holds_exactly_the_tile_incidents(index, z):
+    x, y = _busiest_tile(index, z)
+    xs, ys = _tiles_at(index, z)
+
+    rows = tile_server._tile_slice(index, z, x, y)
+    expected = np.flatnonzero((xs == x) & (ys == y))
+    assert np.arange(rows.start, rows.stop).tolist() == expected.tolist()
+
+
+def test_child_tiles_partition_their_parent(index):
+    z = 14
+    x, y = _busiest_tile(index, z)
+    x, y = x - x % 2, y - y % 2  # the four children of one parent tile
+    slices = [tile_server._tile_slice(index, z, x + dx, y + dy) for dx in (0, 1) for dy in (0, 1)]
+    covered = [row for s in slices for row in range(s.start, s.stop)]
+    assert len(covered) == len(set(covered))
+
+    parent = tile_server._tile_slice(index, z - 1, x // 2, y // 2)
+    assert sorted(covered) == list(range(parent.start, parent.stop))
+
+
+@pytest.mark.parametrize("z", [11, tile_server.CLUSTER_UNTIL_ZOOM])
+def test_tile_counts_add_up_to_its_filtered_incidents(index, z):
+    x, y = _busiest_tile(index, z)
+    rows = np.arange(*tile_server._tile_slice(index, z, x, y).indices(len(index['codes'])))
+    labels = index['crime_labels']
+    crime_types = tuple(sorted(labels[:2]))
+    wanted = [labels.index(c) for c in crime_types]
+    keep = (index['year'][rows] >= 2017) & (index['year'][rows] <= 2020) & np.isin(index['crime_codes'][rows], wanted)
+
+    tile = tile_server.get_tile(z, x, y, (2017, 2020), crime_types)
+    assert tile['clustered'] == (z < tile_server.CLUSTER_UNTIL_ZOOM)
+    assert sum(tile['count']) == int(keep.sum())
+    assert set(tile['crime_type']) <= set(crime_types)
+    assert len(tile['lat']) == len(tile['lon']) == len(tile['count']) == len(tile['crime_type'])
+
+
+def test_viewport_tiles_cover_the_centre_and_are_capped():
+    viewport = {'center': {'lat': 45.55, 'lon': -73.65}, 'zoom': 11}
+    tiles = tile_server.tiles_for_viewport(viewport)
+
+    assert 0 < len(tiles) <= tile_server.MAX_VIEWPORT_TILES
+    z = tiles[0][0]
+    assert all(tile[0] == z for tile in tiles)
+    cx, cy = tile_server.lonlat_to_tile(-73.65, 45.55, z)
+    assert (z, int(cx), int(cy)) in tiles
+
+
+def test_tiles_are_not_built_in_the_request_thread(monkeypatch):
+    started = []
+    monkeypatch.setattr(tile_server, "_tile_index", None)
+    monkeypatch.setattr(viz3, "is_working_set_ready", lambda: False)
+    monkeypatch.setattr(viz3, "warm_up_in_background", lambda: started.append(True))
+    monkeypatch.setattr(viz3, "load_and_process_data", lambda: pytest.fail("spatial join in a request"))
+    server = Flask(__name__)
+    tile_server.register_tile_routes(SimpleNamespace(server=server))
+
+    response = server.test_client().get("/tiles/crimes/11/604/732.json")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(tile_server.RETRY_AFTER_S)
+    assert started == [True]
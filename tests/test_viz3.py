@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from visualizations import viz3
+
+
+@pytest.fixture(scope="module")
+def joined():
+    """Incidents of the viz3 working set (after the district join)"""
+    return viz3.load_and_process_data()['incidents']
+
+
+def _select(joined, crime_types=None, years=None):
+    rows = joined
+    if crime_types is not None:
+        rows = rows[rows["CrimeType"].isin(crime_types)]
+    if years is not None:
+        rows = rows[rows["YEAR"].isin(list(years))]
+    return rows
+
+
+def _expected_density(rows):
+    col = np.floor((rows["Longitude"].to_numpy() - viz3.GRID_BOUNDS["west"]) / viz3.GRID_CELL_SIZE)
+    row = np.floor((rows["Latitude"].to_numpy() - viz3.GRID_BOUNDS["south"]) / viz3.GRID_CELL_SIZE)
+    return pd.Series(1, index=pd.MultiIndex.from_arrays([row.astype(np.int64), col.astype(np.int64)])).groupby(level=[0, 1]).sum()
+
+
+def _actual_density(density):
+    row = np.floor((density["Latitude"] - viz3.GRID_BOUNDS["south"]) / viz3.GRID_CELL_SIZE)
+    col = np.floor((density["Longitude"] - viz3.GRID_BOUNDS["west"]) / viz3.GRID_CELL_SIZE)
+    index = pd.MultiIndex.from_arrays([row.astype(np.int64), col.astype(np.int64)])
+    return pd.Series(density["crime_count"].to_numpy(), index=index).sort_index()
+
+
+@pytest.mark.parametrize("crime_types, years", [
+    (None, None),
+    (["Mischief", "Breaking And Entering"], None),
+    (None, range(2018, 2021)),
+    (["Motor Vehicle Theft"], [2022]),
+])
+def test_grid_density_matches_cell_counts(joined, crime_types, years):
+    density = viz3.get_grid_density(crime_types, years)
+    rows = _select(joined, crime_types, years)
+
+    assert density["crime_count"].sum() == len(rows)
+    pd.testing.assert_series_equal(
+        _actual_density(density), _expected_density(rows).sort_index(), check_names=False, check_dtype=False
+    )
+
+
+def test_grid_density_without_match_is_empty():
+    density = viz3.get_grid_density(["Not a crime type"])
+    assert density.empty
+    assert list(density.columns) == ["Latitude", "Longitude", "crime_count"]
+
+
+@pytest.mark.parametrize("max_points, year_range, crime_types", [
+    (1, None, None),
+    (3, (2016, 2019), None),
+    (10, (2021, 2024), ["Robbery", "Mischief", "Motor Vehicle Theft"]),
+])
+def test_reduced_data_keeps_the_top_crime_types_of_each_district(joined, max_points, year_range, crime_types):
+    reduced = viz3.precompute_reduced_data(max_points, year_range, crime_types)
+
+    rows = _select(joined.dropna(subset=["District"]), crime_types,
+                   None if year_range is None else range(year_range[0], year_range[1] + 1))
+    counts = rows.groupby(["District", "CrimeType"], observed=True).size()
+    counts = counts[counts > 0]
+
+    assert len(viz3.get_filtered_rows(year_range, crime_types)) == len(rows)
+    for district, group in reduced.groupby("District"):
+        district_counts = counts[district].sort_values(ascending=False)
+        assert sorted(group["crime_count"], reverse=True) == district_counts.iloc[:max_points].tolist()
+        assert group["crime_count"].tolist() == district_counts[group["CrimeType"]].tolist()
+    assert set(reduced["District"]) == set(counts.index.get_level_values("District"))
+
+    # Every point is an actual incident of its district and crime type
+    located = reduced.merge(rows, on=["Latitude", "Longitude", "District", "CrimeType"], how="left", indicator=True)
+    assert (located["_merge"] == "both").all()
+
+
+def test_default_map_inputs_use_the_prebuilt_reduced_layer(monkeypatch):
+    import app
+
+    prebuilt = pd.DataFrame({
+        "Latitude": [45.5123], "Longitude": [-73.5678], "PDQ": ["22"],
+        "District": ["Ville-Marie"], "CrimeType": ["Mischief"], "crime_count": [7],
+    })
+    requested = []
+
+    def get_artifact(name, *params, data_version=None):
+        if name == "viz3.reduced_data":
+            requested.append(params)
+            return prebuilt if params == (2, None, None) else None
+        return None
+
+    monkeypatch.setenv("CALLBACK_CACHE_DISABLED", "1")
+    monkeypatch.setattr(viz3.background_jobs, "get_artifact", get_artifact)
+    monkeypatch.setattr(viz3, "_cached_reduced_data", {})
+    first_year, last_year = viz3.build_grouped_arrays()['years']
+
+    # The values of the map controls in viz3.layout()
+    inputs = [
+        {"id": "max-points-slider", "property": "value", "value": 2},
+        {"id": "map-mode", "property": "value", "value": viz3.DEFAULT_MAP_MODE},
+        {"id": "map-viewport", "property": "data", "value": viz3.initial_viewport()},
+        {"id": "map-year-range", "property": "value", "value": [first_year, last_year]},
+        {"id": "map-crime-types", "property": "value", "value": list(viz3.COLOR_MAP)},
+    ]
+    response = app.server.test_client().post("/_dash-update-component", json={
+        "output": "crime-map.figure",
+        "outputs": {"id": "crime-map", "property": "figure"},
+        "inputs": inputs,
+        "changedPropIds": ["max-points-slider.value"],
+        "state": [],
+    })
+
+    assert response.status_code == 200
+    assert requested == [(2, None, None)]
+    assert b"45.5123" in response.data
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from visualizations import viz5
+
+# Counts and labels are compared, not the integer widths of the cube
+LOOSE_TYPES = dict(check_names=False, check_dtype=False, check_index_type=False)
+
+
+def _cube_series(cube, axes, labels):
+    """Cube counts summed down to axes, as a Series of the non-zero cells"""
+    counts = cube['counts'].sum(axis=tuple(a for a in range(cube['counts'].ndim) if a not in axes))
+    cells = np.nonzero(counts)
+    index = pd.MultiIndex.from_arrays([np.asarray(labels[a])[c] for a, c in zip(axes, cells)])
+    return pd.Series(counts[cells], index=index).sort_index()
+
+
+def test_count_cube_matches_groupby(incidents):
+    cube = viz5.get_count_cube()
+    data = incidents.dropna(subset=["DATE", "CrimeType"])
+    labels = {0: cube['pdqs'] + [np.nan], 1: cube['years'], 2: cube['crime_types'],
+              3: cube['shifts'] + [None], 4: cube['seasons']}
+
+    assert cube['counts'].sum() == len(data)
+    expected = data.groupby(["YEAR", data["CrimeType"].astype(str), "SEASON"]).size()
+    pd.testing.assert_series_equal(
+        _cube_series(cube, (1, 2, 4), labels), expected.sort_index(), **LOOSE_TYPES
+    )
+    expected = data.dropna(subset=["PDQ"]).groupby(["PDQ", "YEAR"]).size()
+    actual = _cube_series(cube, (0, 1), labels)
+    actual = actual[actual.index.get_level_values(0).notna()]
+    pd.testing.assert_series_equal(actual, expected.sort_index(), **LOOSE_TYPES)
+
+
+@pytest.mark.parametrize("pdq, year_range", [(None, None), (22.0, None), (None, (2018, 2020)), (38.0, (2016, 2022))])
+def test_heatmaps_match_crosstabs(incidents, pdq, year_range):
+    heat_time, heat_season, heat_year = viz5.get_heatmap_data(pdq, year_range)
+
+    data = incidents.dropna(subset=["DATE", "CrimeType"])
+    if pdq is not None:
+        data = data[data["PDQ"] == pdq]
+    if year_range is not None:
+        data = data[data["YEAR"].between(*year_range)]
+    crime = data["CrimeType"].astype(str).rename("CrimeType")
+
+    for heatmap, column in ((heat_time, "Shift"), (heat_season, "SEASON"), (heat_year, "YEAR")):
+        expected = pd.crosstab(crime, data[column].astype(object))
+        assert heatmap.sum().sum() == expected.sum().sum()
+        pd.testing.assert_frame_equal(
+            heatmap.sort_index().sort_index(axis=1), expected.sort_index().sort_index(axis=1),
+            check_names=False, check_dtype=False, check_column_type=False
+        )
@@ -0,0 +1,314 @@
+"""
+Tiled crime points for zoom-dependent map loading
+Serves the incidents of a z/x/y (slippy map) tile from a precomputed spatial
+index, clustering points at low zoom, with a per-tile cache. Until the viz3
+working set of the data version exists, tiles are answered with a 503 while it
+is built in the background
+"""
+
+import hashlib
+import logging
+import math
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from flask import abort, jsonify, request
+
+from data_manager import data_manager
+
+logger = logging.getLogger(__name__)
+
+# Zoom at which points are indexed; every tile of a lower zoom is a
+# contiguous range of the Morton-sorted index
+INDEX_ZOOM = 20
+
+# Below this zoom, points are clustered into a 2**CLUSTER_BITS grid per tile
+CLUSTER_UNTIL_ZOOM = 16
+CLUSTER_BITS = 4
+
+# Tiles fetched for one viewport are capped; coarser zooms are used beyond
+MAX_VIEWPORT_TILES = 24
+
+# Pixels of the dcc.Graph map, used when the client did not report its bounds
+VIEWPORT_SIZE = (1200, 700)
+
+# Tiles kept in the LRU cache, keyed by data version, tile and filters
+MAX_CACHED_TILES = 2048
+
+# Seconds a client waits before asking again for a tile whose index is being built
+RETRY_AFTER_S = 5
+
+_tile_index = None
+_tile_cache = OrderedDict()
+
+
+def _part1by1(v: np.ndarray) -> np.ndarray:
+    """Spreads the bits of v so that a zero sits between each of them"""
+    v = v.astype(np.uint64) & np.uint64(0x00000000FFFFFFFF)
+    v = (v | (v << np.uint64(16))) & np.uint64(0x0000FFFF0000FFFF)
+    v = (v | (v << np.uint64(8))) & np.uint64(0x00FF00FF00FF00FF)
+    v = (v | (v << np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    v = (v | (v << np.uint64(2))) & np.uint64(0x3333333333333333)
+    v = (v | (v << np.uint64(1))) & np.uint64(0x5555555555555555)
+    return v
+
+
+def _morton(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    return _part1by1(x) | (_part1by1(y) << np.uint64(1))
+
+
+def lonlat_to_tile(lon, lat, zoom: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Converts WGS84 coordinates to (fractional) slippy map tile coordinates"""
+    n = 2.0 ** zoom
+    lat_rad = np.radians(lat)
+    x = (np.asarray(lon) + 180.0) / 360.0 * n
+    y = (1.0 - np.arcsinh(np.tan(lat_rad)) / np.pi) / 2.0 * n
+    return x, y
+
+
+def build_tile_index() -> Dict[str, Any]:
+    """
+    Builds the spatial index over LATITUDE/LONGITUDE
+
+    Incidents are sorted by the Morton code of their tile at INDEX_ZOOM, so
+    the incidents of any tile are found with two binary searches. The index
+    records the data version it was built for and is rebuilt after a reload.
+    """
+    global _tile_index
+
+    data_version = data_manager.get_data_version()
+    if _tile_index is not None and _tile_index['version'] == data_version:
+        return _tile_index
+
+    from visualizations import viz3
+
+    incidents = viz3.load_and_process_data()['incidents']
+    lat = incidents["Latitude"].to_numpy(dtype=np.float64)
+    lon = incidents["Longitude"].to_numpy(dtype=np.float64)
+    years = incidents["YEAR"].to_numpy(dtype=np.int64)
+    crime_types = pd.Categorical(incidents["CrimeType"])
+
+    tx, ty = lonlat_to_tile(lon, lat, INDEX_ZOOM)
+    codes = _morton(tx.astype(np.uint64), ty.astype(np.uint64))
+    order = np.argsort(codes, kind="stable")
+
+    _tile_index = {
+        'version': data_version,
+        'codes': codes[order],
+        'lat': lat[order],
+        'lon': lon[order],
+        'year': years[order],
+        'crime_codes': crime_types.codes[order],
+        'crime_labels': list(crime_types.categories),
+    }
+    logger.info(f"Tile index built: {len(order)} incidents")
+    return _tile_index
+
+
+def _tile_slice(index: Dict[str, Any], z: int, x: int, y: int) -> slice:
+    shift = np.uint64(2 * (INDEX_ZOOM - z))
+    tile_code = _morton(np.array([x]), np.array([y]))[0]
+    start = np.searchsorted(index['codes'], tile_code << shift, side="left")
+    end = np.searchsorted(index['codes'], (tile_code + np.uint64(1)) << shift, side="left")
+    return slice(int(start), int(end))
+
+
+def is_index_ready() -> bool:
+    """
+    Whether build_tile_index can run without the spatial join
+
+    Otherwise the join is started in a background thread (see viz3.warm_up_in_background).
+    """
+    from visualizations import viz3
+
+    if _tile_index is not None and _tile_index['version'] == data_manager.get_data_version():
+        return True
+    if viz3.is_working_set_ready():
+        return True
+    viz3.warm_up_in_background()
+    return False
+
+
+def get_tile(z: int, x: int, y: int,
+             year_range: Optional[Tuple[int, int]] = None,
+             crime_types: Optional[Tuple[str, ...]] = None) -> Dict[str, Any]:
+    """
+    Returns the incidents of a tile as columnar lists
+
+    Below CLUSTER_UNTIL_ZOOM, incidents are grouped into sub-tile cells and
+    each cell is returned once with its count, centroid and dominant crime type.
+    Tiles are cached under the version of the index they were cut from.
+
+    Args:
+        z, x, y: Slippy map tile coordinates
+        year_range: Inclusive (first, last) years to keep, None for all
+        crime_types: Crime types to keep, None for all
+    """
+    index = build_tile_index()
+    cache_key = (index['version'], z, x, y, year_range, crime_types)
+    if cache_key in _tile_cache:
+        _tile_cache.move_to_end(cache_key)
+        return _tile_cache[cache_key]
+
+    tile = _build_tile(index, z, x, y, year_range, crime_types)
+    _tile_cache[cache_key] = tile
+    if len(_tile_cache) > MAX_CACHED_TILES:
+        _tile_cache.popitem(last=False)
+    return tile
+
+
+def _build_tile(index: Dict[str, Any], z: int, x: int, y: int,
+                year_range: Optional[Tuple[int, int]],
+                crime_types: Optional[Tuple[str, ...]]) -> Dict[str, Any]:
+    tile_rows = _tile_slice(index, z, x, y)
+    rows = np.arange(tile_rows.start, tile_rows.stop)
+    labels = index['crime_labels']
+
+    if year_range is not None:
+        years = index['year'][rows]
+        rows = rows[(years >= year_range[0]) & (years <= year_range[1])]
+    if crime_types is not None:
+        wanted = [labels.index(c) for c in crime_types if c in labels]
+        rows = rows[np.isin(index['crime_codes'][rows], wanted)]
+
+    lat = index['lat'][rows]
+    lon = index['lon'][rows]
+    crime_codes = index['crime_codes'][rows]
+
+    if z >= CLUSTER_UNTIL_ZOOM or len(lat) == 0:
+        return {
+            'z': z, 'x': x, 'y': y,
+            'clustered': False,
+            'lat': np.round(lat, 6).tolist(),
+            'lon': np.round(lon, 6).tolist(),
+            'count': [1] * len(lat),
+            'crime_type': [labels[c] for c in crime_codes],
+        }
+
+    cell_shift = np.uint64(2 * max(INDEX_ZOOM - z - CLUSTER_BITS, 0))
+    cells = pd.DataFrame({
+        'cell': index['codes'][rows] >> cell_shift,
+        'lat': lat,
+        'lon': lon,
+        'crime': crime_codes,
+    })
+    grouped = cells.groupby('cell', sort=True)
+    clusters = grouped.agg(lat=('lat', 'mean'), lon=('lon', 'mean'), count=('lat', 'size'))
+    dominant = (
+        cells.groupby(['cell', 'crime']).size()
+        .reset_index(name='n')
+        .sort_values(['cell', 'n'], ascending=[True, False])
+        .drop_duplicates('cell')
+        .set_index('cell')['crime']
+    )
+
+    return {
+        'z': z, 'x': x, 'y': y,
+        'clustered': True,
+        'lat': np.round(clusters['lat'].values, 6).tolist(),
+        'lon': np.round(clusters['lon'].values, 6).tolist(),
+        'count': clusters['count'].astype(int).tolist(),
+        'crime_type': [labels[c] for c in dominant.reindex(clusters.index).values],
+    }
+
+
+def viewport_bounds(viewport: Dict[str, Any]) -> Tuple[float, float, float, float]:
+    """
+    Returns (west, south, east, north) of a map viewport
+
+    Uses the corner coordinates reported by mapbox when available, otherwise
+    approximates them from the centre and zoom.
+    """
+    corners = (viewport.get('derived') or {}).get('coordinates')
+    if corners:
+        lons = [c[0] for c in corners]
+        lats = [c[1] for c in corners]
+        return min(lons), min(lats), max(lons), max(lats)
+
+    center = viewport['center']
+    deg_per_px = 360.0 / (512 * 2 ** viewport['zoom'])
+    half_w = VIEWPORT_SIZE[0] / 2 * deg_per_px
+    half_h = VIEWPORT_SIZE[1] / 2 * deg_per_px * math.cos(math.radians(center['lat']))
+    return center['lon'] - half_w, center['lat'] - half_h, center['lon'] + half_w, center['lat'] + half_h
+
+
+def tiles_for_viewport(viewport: Dict[str, Any]) -> List[Tuple[int, int, int]]:
+    """Lists the tiles covering a viewport (mapbox zoom uses 512 px tiles)"""
+    west, south, east, north = viewport_bounds(viewport)
+    z = min(max(int(viewport['zoom']) + 1, 0), INDEX_ZOOM)
+
+    while True:
+        x0, y0 = lonlat_to_tile(west, north, z)
+        x1, y1 = lonlat_to_tile(east, south, z)
+        max_tile = 2 ** z - 1
+        xs = range(max(int(x0), 0), min(int(x1), max_tile) + 1)
+        ys = range(max(int(y0), 0), min(int(y1), max_tile) + 1)
+        if len(xs) * len(ys) <= MAX_VIEWPORT_TILES or z == 0:
+            return [(z, x, y) for x in xs for y in ys]
+        z -= 1
+
+
+def get_viewport_points(viewport: Optional[Dict[str, Any]],
+                        year_range=None, crime_types=None) -> pd.DataFrame:
+    """Concatenates the (filtered) tiles of a viewport into one frame"""
+    columns = ['lat', 'lon', 'count', 'crime_type']
+    if not viewport:
+        return pd.DataFrame(columns=columns)
+
+    year_range = None if year_range is None else (int(year_range[0]), int(year_range[1]))
+    crime_types = None if crime_types is None else tuple(sorted(crime_types))
+    tiles = [get_tile(z, x, y, year_range, crime_types) for z, x, y in tiles_for_viewport(viewport)]
+    frames = [pd.DataFrame({c: tile[c] for c in columns}) for tile in tiles if tile['lat']]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)
+
+
+def clear_cache():
+    """Drops the spatial index and the tile cache"""
+    global _tile_index
+    _tile_index = None
+    _tile_cache.clear()
+
+
+def register_tile_routes(app):
+    """Registers the tile endpoint on the Flask server of the Dash app"""
+
+    @app.server.route("/tiles/crimes/<int:z>/<int:x>/<int:y>.json")
+    def crime_tile(z, x, y):
+        """Optional filters: ?years=2016-2020&crime_types=Mischief,Robbery"""
+        if not 0 <= z <= INDEX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            abort(404)
+
+        year_range = None
+        if request.args.get("years"):
+            try:
+                first, last = (int(year) for year in request.args["years"].split("-"))
+            except ValueError:
+                abort(400)
+            year_range = (first, last)
+
+        crime_types = None
+        if request.args.get("crime_types"):
+            crime_types = tuple(sorted(request.args["crime_types"].split(",")))
+
+        if not is_index_ready():
+            response = jsonify({'error': "The tile index is being built"})
+            response.status_code = 503
+            response.headers["Retry-After"] = str(RETRY_AFTER_S)
+            return response
+
+        # The URL does not change with the data: browsers revalidate against
+        # an ETag of the data version, answered with a 304 until a reload
+        etag = hashlib.sha1(
+            repr((data_manager.get_data_version(), z, x, y, year_range, crime_types)).encode()
+        ).hexdigest()
+        if etag in request.if_none_match:
+            response = app.server.response_class(status=304)
+        else:
+            response = jsonify(get_tile(z, x, y, year_range, crime_types))
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "public, no-cache"
+        return response
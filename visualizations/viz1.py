@@ -2,6 +2,11 @@ from dash import html, dcc
 import pandas as pd
 import plotly.graph_objects as go
 from data_manager import data_manager
+from serialization import decode, encode
+import artifacts
+import metrics
+
+_cached_figures = {}
 
 def layout():
     return html.Div([
@@ -92,3 +97,12 @@ def update_graph(view_option, chart_type):
     )
 
     return fig
+
+def get_graph_figure(view_option, chart_type):
+    """Series figure as plain JSON, built once per data version, view and chart type"""
+    cache_key = (data_manager.get_data_version(), view_option, chart_type)
+    metrics.record_cache("viz1_figure", cache_key in _cached_figures)
+    if cache_key not in _cached_figures:
+        encoded = artifacts.load("viz1.figure", view_option, chart_type)
+        _cached_figures[cache_key] = decode(encoded if encoded is not None else encode(update_graph(view_option, chart_type)))
+    return _cached_figures[cache_key]
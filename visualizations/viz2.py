@@ -1,6 +1,5 @@
 from dash import dcc, html, Input, Output
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 from data_manager import data_manager
 
@@ -30,12 +29,12 @@ pdq_names = {
     21: "Centre-Ville Est (Ville-Marie) / Îles Notre-Dame & Ste-Hélène / Vieux-Montréal",
     22: "Centre-Sud",
     23: "Hochelaga-Maisonneuve",
-    24: "Ancien PDQ – fusionné au PDQ 26 (Côte-des-Neiges) :contentReference[oaicite:2]{index=2}",
+    24: "Ancien PDQ – fusionné au PDQ 26 (Côte-des-Neiges)",
     26: "Côte-des-Neiges / Mont-Royal / Outremont",
     27: "Ahuntsic",
     30: "Saint-Michel",
     31: "Villeray / Parc-Extension",
-    33: "Ancien PDQ Parc-Extension (fusionné au PDQ 31) :contentReference[oaicite:3]{index=3}",
+    33: "Ancien PDQ Parc-Extension (fusionné au PDQ 31)",
     35: "La Petite-Italie / La Petite-Patrie / (partie d'Outremont)",
     38: "Le Plateau-Mont-Royal",
     39: "Montréal-Nord",
@@ -59,9 +58,9 @@ def filter_data(start_year, end_year, pdq=None):
         pdq=pdq
     )
 
-import plotly.express as px
-
 def create_bar_chart(df):
+    import plotly.express as px
+
     quart_counts = (
         df["Time of Day"]
           .value_counts()
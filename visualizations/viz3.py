@@ -1,17 +1,27 @@
-from dash import html, dcc, callback, Input, Output, Patch
+from dash import html, dcc, callback, ctx, Input, Output, State, Patch, no_update
 import pandas as pd
-import geopandas as gpd
 import plotly.graph_objects as go
-import json
-from shapely.geometry import Point
 import numpy as np
 import os
+import logging
 from data_manager import data_manager
+import geometry_manager
+import tile_server
+import background_jobs
+import callback_cache
+from callback_cache import memoize
 
 _cached_figure = None
 _cached_data = None
 _cached_reduced_data = {}  
 _cached_geojson_path = None
+_cached_grid_bins = None
+_cached_grouped_arrays = None
+_cached_version = None
+
+logger = logging.getLogger(__name__)
+
+INITIAL_ZOOM = 8.5
 
 def crime_hover_template(crime_type):
     return (
@@ -50,40 +60,59 @@ def _get_montreal_json_path():
     _cached_geojson_path = primary_path
     return _cached_geojson_path
 
+def _drop_stale_working_set():
+    """
+    Drops the working set built from a previous data version (hot reload)
+
+    Returns the current version. A computation started for it only stores its
+    result while it is still current, so a run overlapping a reload never
+    leaves old data in the working set of the new version.
+    """
+    global _cached_data, _cached_reduced_data, _cached_grid_bins, _cached_grouped_arrays, _cached_version
+    data_version = data_manager.get_data_version()
+    if data_version != _cached_version:
+        _cached_data = None
+        _cached_reduced_data = {}
+        _cached_grid_bins = None
+        _cached_grouped_arrays = None
+        _cached_version = data_version
+    return data_version
+
 def load_and_process_data():
     """OPTIMIZATION 2: Load data once with minimal processing"""
     global _cached_data
     
+    data_version = _drop_stale_working_set()
     if _cached_data is not None:
         return _cached_data
+
+    # Computed by a background job or another worker
+    cached = background_jobs.get_artifact("viz3.incidents")
+    if cached is not None:
+        if data_version == _cached_version:
+            _cached_data = cached
+        return cached
     
-    print("Loading and preprocessing data for optimal performance...")
-    
-    CRIME_TRANSLATION = {
-        "Vol De Véhicule À Moteur": "Motor Vehicle Theft",
-        "Méfait": "Mischief", 
-        "Vol Dans / Sur Véhicule À Moteur": "Theft From/In Motor Vehicle",
-        "Introduction": "Breaking And Entering",
-        "Vols Qualifiés": "Robbery",
-        "Infractions Entrainant La Mort": "Offences Causing Death"
-    }
+    logger.info("Loading and preprocessing data for optimal performance...")
+
+    # geopandas (and shapely/pyproj behind it) is only needed for the join
+    import geopandas as gpd
     
     montreal_json_path = _get_montreal_json_path()
-    with open(montreal_json_path) as f:
-        montreal_geo = json.load(f)
-
-    gdf_districts = gpd.read_file(montreal_json_path)
-    df = data_manager.get_data_for_viz3()
+    gdf_districts = gpd.read_file(montreal_json_path)[["NOM", "geometry"]]
+    df = data_manager.get_data_for_viz3()[["CrimeType", "LONGITUDE", "LATITUDE", "PDQ", "YEAR"]]
     df = df.rename(columns={
-        "CATEGORIE": "CrimeType",
         "LONGITUDE": "Longitude", 
-        "LATITUDE": "Latitude",
-        "PDQ": "PDQ"
+        "LATITUDE": "Latitude"
     }).dropna(subset=["Longitude", "Latitude"])
     
-    df["CrimeType"] = df["CrimeType"].str.strip().str.lower().str.title()
-    df["CrimeType"] = df["CrimeType"].map(CRIME_TRANSLATION).fillna(df["CrimeType"])
-    df["PDQ"] = df["PDQ"].astype(str)
+    # PDQ labels are built on the distinct values, not per row
+    pdq = pd.Categorical(df["PDQ"])
+    df["PDQ"] = (
+        pdq.rename_categories([str(int(p)) for p in pdq.categories])
+           .add_categories("Unknown")
+           .fillna("Unknown")
+    )
 
     df = df[
         (df["Latitude"].between(45.40, 45.70)) & 
@@ -93,61 +122,219 @@ def load_and_process_data():
     df["geometry"] = gpd.points_from_xy(df["Longitude"], df["Latitude"])
     gdf_crimes = gpd.GeoDataFrame(df, geometry="geometry", crs=gdf_districts.crs)
     gdf_joined = gpd.sjoin(gdf_crimes, gdf_districts, how="left", predicate="within")
-    gdf_joined["District"] = gdf_joined["NOM"]
-    
-    _cached_data = {
-        'montreal_geo': montreal_geo,
-        'gdf_joined': gdf_joined,
-        'districts': gdf_districts
+    joined_bytes = _frame_bytes(gdf_joined)
+
+    # Keep only compact columns; the per-row shapely points are dropped with gdf_joined
+    incidents = pd.DataFrame({
+        "Latitude": gdf_joined["Latitude"].to_numpy(dtype=np.float32),
+        "Longitude": gdf_joined["Longitude"].to_numpy(dtype=np.float32),
+        "CrimeType": gdf_joined["CrimeType"].values,
+        "District": gdf_joined["NOM"].astype("category").values,
+        "PDQ": gdf_joined["PDQ"].values,
+        "YEAR": gdf_joined["YEAR"].to_numpy(dtype=np.int16)
+    })
+    del gdf_crimes, gdf_joined
+
+    result = {
+        'incidents': incidents,
+        'district_names': gdf_districts["NOM"].tolist(),
+        # Peak size of the join, freed once the compact frame is built
+        'joined_bytes': joined_bytes
     }
-    
-    print(f"Data optimized and cached: {len(gdf_joined)} crime records")
-    return _cached_data
+    if data_version == _cached_version:
+        _cached_data = result
+    background_jobs.set_artifact("viz3.incidents", result, data_version=data_version)
+
+    logger.info(f"Data optimized and cached: {len(incidents)} crime records "
+          f"({joined_bytes / 1e6:.1f} MB joined GeoDataFrame -> {_frame_bytes(incidents) / 1e6:.1f} MB compact)")
+    return result
+
+def is_working_set_ready():
+    """Whether the incidents and grouped arrays of the current version exist, in this worker or as artifacts"""
+    _drop_stale_working_set()
+    if _cached_data is not None and _cached_grouped_arrays is not None:
+        return True
+    return background_jobs.has_artifact("viz3.incidents") and background_jobs.has_artifact("viz3.grouped_arrays")
+
+def prepare_working_set():
+    """Runs the spatial join and the grouping of the current version (once across workers)"""
+    with background_jobs.job_lock("warmup:viz3"):
+        load_and_process_data()
+        build_grouped_arrays()
+        precompute_reduced_data(DEFAULT_MAX_POINTS)
+
+def warm_up_in_background():
+    """Starts prepare_working_set in a thread of this worker, never in the request thread"""
+    background_jobs.run_in_thread("warmup:viz3", prepare_working_set)
+
+def _frame_bytes(frame):
+    """Deep memory of a frame; shapely geometries are counted at their WKB size"""
+    total = int(frame.drop(columns="geometry", errors="ignore").memory_usage(deep=True).sum())
+    if "geometry" in frame:
+        import shapely
+        total += int(shapely.to_wkb(frame["geometry"].values).astype(bytes).nbytes) if len(frame) else 0
+    return total
+
+def get_memory_report():
+    """Bytes held by the viz3 working set"""
+    if _cached_data is None:
+        return {'incidents_bytes': 0, 'rows': 0}
+    return {
+        'incidents_bytes': _frame_bytes(_cached_data['incidents']),
+        'rows': len(_cached_data['incidents'])
+    }
+
+def build_grouped_arrays():
+    """Sort the joined incidents once by (year, crime type, district) into flat arrays
+
+    Every (year, crime type) pair is then a contiguous run, so a filter on
+    years and crime types is a handful of slices instead of a frame scan.
+    """
+    global _cached_grouped_arrays
+
+    data_version = _drop_stale_working_set()
+    if _cached_grouped_arrays is not None:
+        return _cached_grouped_arrays
+
+    cached = background_jobs.get_artifact("viz3.grouped_arrays")
+    if cached is not None:
+        if data_version == _cached_version:
+            _cached_grouped_arrays = cached
+        return cached
+
+    incidents = load_and_process_data()['incidents'].dropna(subset=['District'])
+    crime = pd.Categorical(incidents["CrimeType"]).remove_unused_categories()
+    district = pd.Categorical(incidents["District"]).remove_unused_categories()
+    year = incidents["YEAR"].to_numpy(dtype=np.int64)
+
+    order = np.lexsort((district.codes, crime.codes, year))
+    year = year[order]
+    crime_codes = crime.codes[order].astype(np.int64)
 
-def precompute_reduced_data(gdf_joined, max_points_per_district):
+    run_keys = year * len(crime.categories) + crime_codes
+    starts = np.flatnonzero(np.r_[True, run_keys[1:] != run_keys[:-1]])
+    ends = np.r_[starts[1:], len(run_keys)]
+
+    result = {
+        'year': year,
+        'crime': crime_codes,
+        'district': district.codes[order].astype(np.int64),
+        'lat': incidents["Latitude"].to_numpy()[order],
+        'lon': incidents["Longitude"].to_numpy()[order],
+        'pdq': incidents["PDQ"].to_numpy()[order],
+        'crime_labels': list(crime.categories),
+        'district_labels': list(district.categories),
+        'runs': {
+            (int(year[start]), int(crime_codes[start])): (int(start), int(end))
+            for start, end in zip(starts, ends)
+        },
+        'years': (int(year.min()), int(year.max())) if len(year) else (2015, 2025)
+    }
+    if data_version == _cached_version:
+        _cached_grouped_arrays = result
+    background_jobs.set_artifact("viz3.grouped_arrays", result, data_version=data_version)
+    return result
+
+def get_filtered_rows(year_range=None, crime_types=None):
+    """Row positions in the grouped arrays matching a year range and crime types"""
+    arrays = build_grouped_arrays()
+    crime_labels = arrays['crime_labels']
+    wanted_crimes = None if crime_types is None else {
+        crime_labels.index(crime_type) for crime_type in crime_types if crime_type in crime_labels
+    }
+
+    slices = [
+        np.arange(start, end)
+        for (year, crime), (start, end) in arrays['runs'].items()
+        if (year_range is None or year_range[0] <= year <= year_range[1])
+        and (wanted_crimes is None or crime in wanted_crimes)
+    ]
+    return np.concatenate(slices) if slices else np.array([], dtype=np.int64)
+
+def _filter_key(year_range=None, crime_types=None):
+    """Hashable (years, crime types) filter, None for a selection covering all the data
+
+    The default slider and dropdown values thus share the entries (and the
+    build-time artifacts) of the unfiltered map.
+    """
+    arrays = build_grouped_arrays()
+    years = None if year_range is None else (int(year_range[0]), int(year_range[1]))
+    if years is not None and years[0] <= arrays['years'][0] and years[1] >= arrays['years'][1]:
+        years = None
+    crimes = None if crime_types is None else tuple(sorted(crime_types))
+    if crimes is not None and set(arrays['crime_labels']) <= set(crimes):
+        crimes = None
+    return years, crimes
+
+def precompute_reduced_data(max_points_per_district, year_range=None, crime_types=None):
     """OPTIMIZATION 6: Precompute and cache different reduction levels"""
     global _cached_reduced_data
     
-    cache_key = f"reduced_{max_points_per_district}"
-    if cache_key in _cached_reduced_data:
-        return _cached_reduced_data[cache_key]
-    
-    print(f"Precomputing reduced dataset for {max_points_per_district} points per district...")
-    
+    data_version = _drop_stale_working_set()
+    working_set = _cached_reduced_data
+    year_range, crime_types = _filter_key(year_range, crime_types)
+    cache_key = ("reduced", max_points_per_district, year_range, crime_types)
+    if cache_key in working_set:
+        return working_set[cache_key]
 
-    district_groups = gdf_joined.dropna(subset=['District']).groupby('District')
-    reduced_data = []
+    result = background_jobs.get_artifact("viz3.reduced_data", *cache_key[1:])
+    if result is not None:
+        working_set[cache_key] = result
+        return result
     
-    for district, district_data in district_groups:
-        crime_counts = district_data['CrimeType'].value_counts()
-        top_crimes = crime_counts.head(max_points_per_district)
-        
-        for crime_type, count in top_crimes.items():
-            crime_subset = district_data[district_data['CrimeType'] == crime_type]
-            representative_idx = len(crime_subset) // 2
-            representative = crime_subset.iloc[representative_idx].copy()
-            representative['crime_count'] = count
-            reduced_data.append(representative)
-    
-    result = pd.DataFrame(reduced_data)
-    _cached_reduced_data[cache_key] = result
-    print(f"Cached reduced dataset: {len(result)} points")
+    logger.info(f"Precomputing reduced dataset for {max_points_per_district} points per district...")
+
+    arrays = build_grouped_arrays()
+    rows = get_filtered_rows(year_range, crime_types)
+    n_crimes = len(arrays['crime_labels'])
+
+    # Incident counts per (district, crime type), then the top crime types of each district
+    pair = arrays['district'][rows] * n_crimes + arrays['crime'][rows]
+    counts = np.bincount(pair, minlength=len(arrays['district_labels']) * n_crimes)
+    counts = counts.reshape(len(arrays['district_labels']), n_crimes)
+    top_crimes = np.argsort(-counts, axis=1, kind="stable")[:, :max_points_per_district]
+
+    districts = np.repeat(np.arange(counts.shape[0]), top_crimes.shape[1])
+    crimes = top_crimes.ravel()
+    selected_counts = counts[districts, crimes]
+    keep = selected_counts > 0
+    districts, crimes, selected_counts = districts[keep], crimes[keep], selected_counts[keep]
+
+    # Representative incident: the middle one of each (district, crime type) group
+    pair_order = np.argsort(pair, kind="stable")
+    group_start = np.searchsorted(pair[pair_order], districts * n_crimes + crimes)
+    representative = rows[pair_order[group_start + selected_counts // 2]]
+
+    result = pd.DataFrame({
+        "Latitude": arrays['lat'][representative],
+        "Longitude": arrays['lon'][representative],
+        "PDQ": arrays['pdq'][representative],
+        "District": [arrays['district_labels'][d] for d in districts],
+        "CrimeType": [arrays['crime_labels'][c] for c in crimes],
+        "crime_count": selected_counts
+    })
+    # A reload replaces the dict: a result of the previous version lands in the dropped one
+    working_set[cache_key] = result
+    background_jobs.set_artifact("viz3.reduced_data", result, *cache_key[1:], data_version=data_version)
+    logger.info(f"Cached reduced dataset: {len(result)} points")
     return result
 
 def create_initial_figure():
     """OPTIMIZATION 8: Create base figure once and reuse structure"""
-    print("Creating optimized base figure...")
+    logger.info("Creating optimized base figure...")
     
     data = load_and_process_data()
-    montreal_geo = data['montreal_geo']
+    district_geo = geometry_manager.get_simplified_geojson(
+        _get_montreal_json_path(), geometry_manager.get_level_for_zoom(INITIAL_ZOOM)
+    )
     
     fig = go.Figure()
 
-    neighborhoods = [feature["properties"]["NOM"] for feature in montreal_geo["features"]]
+    neighborhoods = data['district_names']
     z_vals = [1] * len(neighborhoods)
 
     fig.add_choroplethmapbox(
-        geojson=montreal_geo, 
+        geojson=district_geo, 
         locations=neighborhoods,
         z=z_vals,
         featureidkey="properties.NOM",
@@ -162,8 +349,8 @@ def create_initial_figure():
     
     fig.update_layout(
         mapbox_style="white-bg",
-        mapbox_zoom=8.5,
-        mapbox_center={"lat": 45.55, "lon": -73.6},
+        mapbox_zoom=INITIAL_ZOOM,
+        mapbox_center=initial_viewport()["center"],
         mapbox_bounds={"west": -74.1, "east": -73.3, "south": 45.35, "north": 45.75},
         height=700,
         margin=dict(t=60, r=10, l=10, b=10),
@@ -187,53 +374,218 @@ def create_initial_figure():
     
     return fig
 
-def update_crime_traces(fig, max_points):
-    """OPTIMIZATION 10: Update only crime traces, not entire figure"""
-    data = load_and_process_data()
-    gdf_joined = data['gdf_joined']
-    reduced_gdf = precompute_reduced_data(gdf_joined, max_points)
-    
-    COLOR_MAP = {
-        "Motor Vehicle Theft": "#626ff5",
-        "Mischief": "#E74C3C", 
-        "Theft From/In Motor Vehicle": "#1ABC9C",
-        "Breaking And Entering": "#9B59B6",
-        "Robbery": "#F39C12",
-        "Offences Causing Death": "#00BCD4"
+COLOR_MAP = {
+    "Motor Vehicle Theft": "#626ff5",
+    "Mischief": "#E74C3C", 
+    "Theft From/In Motor Vehicle": "#1ABC9C",
+    "Breaking And Entering": "#9B59B6",
+    "Robbery": "#F39C12",
+    "Offences Causing Death": "#00BCD4"
+}
+
+DEFAULT_MAX_POINTS = 3
+
+MAP_MODES = {
+    "points": "Top crime types per district",
+    "density": "Density of all incidents",
+    "viewport": "Incidents in view (tiled)",
+}
+DEFAULT_MAP_MODE = "points"
+
+# Square density grid over the same bounding box used to clean coordinates
+GRID_BOUNDS = {"west": -73.95, "east": -73.45, "south": 45.40, "north": 45.70}
+GRID_CELL_SIZE = 0.004  # degrees, ~300-450 m
+GRID_COLS = int(np.ceil((GRID_BOUNDS["east"] - GRID_BOUNDS["west"]) / GRID_CELL_SIZE))
+
+def build_crime_traces(max_points, mode=DEFAULT_MAP_MODE, year_range=None, crime_types=None):
+    """Build one scattermapbox trace per crime type, in COLOR_MAP order.
+
+    Empty crime types still get an (empty) trace so that trace indices stay
+    stable and can be targeted by partial updates.
+    """
+    if mode == "points":
+        reduced_gdf = precompute_reduced_data(max_points, year_range, crime_types)
+    else:
+        reduced_gdf = pd.DataFrame()
+
+    traces = []
+    for crime_type, color in COLOR_MAP.items():
+        if reduced_gdf.empty:
+            crime_data = pd.DataFrame(columns=["Latitude", "Longitude", "PDQ", "District", "crime_count"])
+        else:
+            crime_data = reduced_gdf[reduced_gdf["CrimeType"] == crime_type]
+        
+        base_size = 8
+        sizes = np.minimum(20, base_size + (crime_data['crime_count'].fillna(0) / 10))
+
+        traces.append(go.Scattermapbox(
+            lat=crime_data["Latitude"].values,
+            lon=crime_data["Longitude"].values,
+            mode="markers",
+            marker=dict(
+                size=sizes.tolist(),
+                color=color,
+                opacity=0.8
+            ),
+            name=crime_type,
+            customdata=crime_data[["PDQ", "District", "crime_count"]].values,
+            hovertemplate=crime_hover_template(crime_type),
+            showlegend=not crime_data.empty
+        ))
+
+    return traces
+
+def precompute_grid_bins():
+    """Bin every incident into the square grid, one count series per (crime type, year)"""
+    global _cached_grid_bins
+
+    data_version = _drop_stale_working_set()
+    if _cached_grid_bins is not None:
+        return _cached_grid_bins
+
+    cached = background_jobs.get_artifact("viz3.grid_bins")
+    if cached is not None:
+        if data_version == _cached_version:
+            _cached_grid_bins = cached
+        return cached
+
+    logger.info("Binning all incidents into the density grid...")
+
+    incidents = load_and_process_data()['incidents']
+    col = ((incidents["Longitude"].values - GRID_BOUNDS["west"]) // GRID_CELL_SIZE).astype(np.int64)
+    row = ((incidents["Latitude"].values - GRID_BOUNDS["south"]) // GRID_CELL_SIZE).astype(np.int64)
+
+    cells = pd.DataFrame({
+        "CrimeType": incidents["CrimeType"].values,
+        "YEAR": incidents["YEAR"].values,
+        "cell": row * GRID_COLS + col
+    })
+    counts = cells.groupby(["CrimeType", "YEAR", "cell"], observed=True).size()
+
+    result = {
+        key: group.droplevel([0, 1])
+        for key, group in counts.groupby(level=[0, 1], observed=True)
     }
 
- 
+    if data_version == _cached_version:
+        _cached_grid_bins = result
+    background_jobs.set_artifact("viz3.grid_bins", result, data_version=data_version)
+    logger.info(f"Cached density grid: {len(counts)} non-empty (crime type, year, cell) bins")
+    return result
+
+def get_grid_density(crime_types=None, years=None):
+    """Sum the cached bins matching the crime types and years (None = all)"""
+    grid_bins = precompute_grid_bins()
+    selected = [
+        counts for (crime_type, year), counts in grid_bins.items()
+        if (crime_types is None or crime_type in crime_types)
+        and (years is None or year in years)
+    ]
+
+    if not selected:
+        return pd.DataFrame(columns=["Latitude", "Longitude", "crime_count"])
+
+    totals = pd.concat(selected).groupby(level=0).sum()
+    cell_ids = totals.index.values
+    return pd.DataFrame({
+        "Latitude": np.round(GRID_BOUNDS["south"] + (cell_ids // GRID_COLS + 0.5) * GRID_CELL_SIZE, 5),
+        "Longitude": np.round(GRID_BOUNDS["west"] + (cell_ids % GRID_COLS + 0.5) * GRID_CELL_SIZE, 5),
+        "crime_count": totals.values
+    })
+
+def build_density_trace(mode=DEFAULT_MAP_MODE, year_range=None, crime_types=None):
+    """Density layer over grid cell centres (empty outside density mode)"""
+    if mode == "density":
+        years = None if year_range is None else range(year_range[0], year_range[1] + 1)
+        grid = get_grid_density(crime_types, years)
+    else:
+        grid = pd.DataFrame(columns=["Latitude", "Longitude", "crime_count"])
+
+    return go.Densitymapbox(
+        lat=grid["Latitude"].values,
+        lon=grid["Longitude"].values,
+        z=grid["crime_count"].values,
+        radius=12,
+        colorscale="YlOrRd",
+        opacity=0.7,
+        name="Incident density",
+        colorbar=dict(title="Crimes per cell", x=1.0),
+        showscale=not grid.empty,
+        hovertemplate="Crimes in cell: %{z:,}<extra></extra>"
+    )
+
+def build_viewport_trace(mode=DEFAULT_MAP_MODE, viewport=None, year_range=None, crime_types=None):
+    """Incidents of the tiles covering the viewport, clustered at low zoom"""
+    if mode == "viewport":
+        points = tile_server.get_viewport_points(viewport, year_range, crime_types)
+    else:
+        points = tile_server.get_viewport_points(None)
+
+    counts = points["count"].astype(float)
+    return go.Scattermapbox(
+        lat=points["lat"].values,
+        lon=points["lon"].values,
+        mode="markers",
+        marker=dict(
+            size=np.minimum(24, 6 + 3 * np.log2(counts + 1)).tolist(),
+            color=[COLOR_MAP.get(crime_type, "#7f8c8d") for crime_type in points["crime_type"]],
+            opacity=0.7
+        ),
+        name="Incidents in view",
+        customdata=points[["crime_type", "count"]].values,
+        hovertemplate="<b>%{customdata[0]}</b><br>Incidents: %{customdata[1]}<extra></extra>",
+        showlegend=False
+    )
+
+def build_map_traces(max_points, mode=DEFAULT_MAP_MODE, viewport=None, year_range=None, crime_types=None):
+    """All overlay traces in figure order: crime types (1..6), density, viewport tiles"""
+    return (
+        build_crime_traces(max_points, mode, year_range, crime_types)
+        + [
+            build_density_trace(mode, year_range, crime_types),
+            build_viewport_trace(mode, viewport, year_range, crime_types)
+        ]
+    )
+
+def map_title(max_points, mode=DEFAULT_MAP_MODE):
+    if mode == "density":
+        return "Montreal Crime Map - Density of All Incidents"
+    if mode == "viewport":
+        return "Montreal Crime Map - Incidents in View"
+    return f"Montreal Crime Map - Top {max_points} Crime Types per District"
+
+def update_crime_traces(fig, max_points, mode=DEFAULT_MAP_MODE):
+    """OPTIMIZATION 10: Update only crime traces, not entire figure"""
     fig.data = fig.data[:1] 
     
-    for crime_type, color in COLOR_MAP.items():
-        crime_data = reduced_gdf[reduced_gdf["CrimeType"] == crime_type]
-        
-        if not crime_data.empty:
-            base_size = 8
-            sizes = np.minimum(20, base_size + (crime_data['crime_count'].fillna(0) / 10))
-
-            fig.add_trace(go.Scattermapbox(
-                lat=crime_data["Latitude"].values,
-                lon=crime_data["Longitude"].values,
-                mode="markers",
-                marker=dict(
-                    size=sizes.tolist(),
-                    color=color,
-                    opacity=0.8
-                ),
-                name=crime_type,
-                customdata=crime_data[["PDQ", "District", "crime_count"]].values,
-                hovertemplate=crime_hover_template(crime_type)
-            ))
+    for trace in build_map_traces(max_points, mode):
+        fig.add_trace(trace)
 
     fig.update_layout(
-        title_text=f"Montreal Crime Map - Top {max_points} Crime Types per District"
+        title_text=map_title(max_points, mode)
     )
     
     return fig
 
+def patch_crime_traces(max_points, mode=DEFAULT_MAP_MODE, viewport=None, year_range=None, crime_types=None):
+    """Partial figure update: replaces the overlay traces and the title only.
+
+    The choropleth layer (trace 0, carrying montreal.json) is sent once with
+    the layout and never re-serialized on slider changes.
+    """
+    patched_fig = Patch()
+    for i, trace in enumerate(build_map_traces(max_points, mode, viewport, year_range, crime_types), start=1):
+        patched_fig["data"][i] = trace.to_plotly_json()
+    patched_fig["layout"]["title"]["text"] = map_title(max_points, mode)
+    return patched_fig
+
+def initial_viewport():
+    return {"center": {"lat": 45.55, "lon": -73.6}, "zoom": INITIAL_ZOOM}
+
 def layout():
     """OPTIMIZATION 11: Simplified layout with faster initial load"""
+    first_year, last_year = build_grouped_arrays()['years']
+
     return html.Div([
         # Header
         html.Div([
@@ -250,20 +602,59 @@ def layout():
                           style={'fontWeight': 'bold', 'marginBottom': '5px'}),
                 dcc.Slider(
                     id='max-points-slider',
-                    min=1, max=5, step=1, value=3,
+                    min=1, max=5, step=1, value=DEFAULT_MAX_POINTS,
                     marks={i: str(i) for i in range(1, 6)},
                     tooltip={"placement": "bottom", "always_visible": True}
                 )
-            ], style={'width': '100%', 'textAlign': 'center'})
+            ], style={'width': '100%', 'textAlign': 'center'}),
+
+            html.Div([
+                html.Label("Map mode:", 
+                          style={'fontWeight': 'bold', 'marginBottom': '5px'}),
+                dcc.RadioItems(
+                    id='map-mode',
+                    options=[{'label': label, 'value': value} for value, label in MAP_MODES.items()],
+                    value=DEFAULT_MAP_MODE,
+                    inline=True,
+                    inputStyle={'marginRight': '5px', 'marginLeft': '15px'}
+                )
+            ], style={'width': '100%', 'textAlign': 'center', 'marginTop': '15px'}),
+
+            html.Div([
+                html.Div([
+                    html.Label("Years:", 
+                              style={'fontWeight': 'bold', 'marginBottom': '5px'}),
+                    dcc.RangeSlider(
+                        id='map-year-range',
+                        min=first_year, max=last_year, step=1,
+                        value=[first_year, last_year],
+                        marks={year: str(year) for year in range(first_year, last_year + 1)}
+                    )
+                ], style={'width': '55%', 'display': 'inline-block', 'verticalAlign': 'top'}),
+
+                html.Div([
+                    html.Label("Crime types:", 
+                              style={'fontWeight': 'bold', 'marginBottom': '5px'}),
+                    dcc.Dropdown(
+                        id='map-crime-types',
+                        options=[{'label': crime_type, 'value': crime_type} for crime_type in COLOR_MAP],
+                        value=list(COLOR_MAP),
+                        multi=True
+                    )
+                ], style={'width': '40%', 'display': 'inline-block', 'marginLeft': '5%'})
+            ], style={'width': '100%', 'marginTop': '15px', 'textAlign': 'left'})
         ], style={'margin': '20px 0', 'padding': '15px', 
                  'backgroundColor': '#f8f9fa', 'borderRadius': '5px'}),
         
+        dcc.Store(id='map-geometry-level', data=geometry_manager.get_level_for_zoom(INITIAL_ZOOM)),
+        dcc.Store(id='map-viewport', data=initial_viewport()),
+
         # Map with loading
         html.Div([
             dcc.Loading(
                 dcc.Graph(
                     id='crime-map', 
-                    figure=create_initial_figure(),
+                    figure=update_crime_traces(create_initial_figure(), DEFAULT_MAX_POINTS),
                     style={'height': '700px'}
                 ),
                 type="circle"
@@ -279,29 +670,87 @@ def layout():
 
 def clear_cache():
     """Enhanced cache clearing"""
-    global _cached_figure, _cached_data, _cached_reduced_data, _cached_geojson_path
+    global _cached_figure, _cached_data, _cached_reduced_data, _cached_geojson_path, _cached_grid_bins
+    global _cached_grouped_arrays
     _cached_figure = None
     _cached_data = None
     _cached_reduced_data = {}
+    _cached_grid_bins = None
+    _cached_grouped_arrays = None
     _cached_geojson_path = None
+    geometry_manager.clear_cache()
+    tile_server.clear_cache()
+    callback_cache.clear_cache()
+    background_jobs.clear_artifacts()
     data_manager.clear_cache()
-    print("All caches cleared")
+    logger.info("All caches cleared")
 
 
 @callback(
     Output('crime-map', 'figure'),
-    [Input('max-points-slider', 'value')]
+    [Input('max-points-slider', 'value'),
+     Input('map-mode', 'value'),
+     Input('map-viewport', 'data'),
+     Input('map-year-range', 'value'),
+     Input('map-crime-types', 'value')],
+    prevent_initial_call=True
+)
+def update_map(max_points, mode, viewport, year_range, crime_types):
+    """Fast update: patch the crime traces, keep the base choropleth client-side"""
+    if ctx.triggered_id == 'map-viewport' and mode != "viewport":
+        return no_update
+    if not is_working_set_ready():
+        # Dropped by a data reload: the map keeps its traces until the new working set is built
+        warm_up_in_background()
+        return no_update
+    if mode != "viewport":
+        viewport = None  # only the viewport mode depends on it; share entries across pans
+    year_range, crime_types = _filter_key(year_range, crime_types or [])
+    return get_map_patch(max_points, mode, viewport, year_range, crime_types)
+
+
+@memoize("update_map")
+def get_map_patch(max_points, mode, viewport, year_range, crime_types):
+    return patch_crime_traces(max_points, mode, viewport, year_range, crime_types)
+
+
+@callback(
+    Output('map-viewport', 'data'),
+    Input('crime-map', 'relayoutData'),
+    State('map-viewport', 'data'),
+    prevent_initial_call=True
 )
-def update_map(max_points):
-    """Fast update using optimized trace management"""
+def track_viewport(relayout_data, viewport):
+    """Keep the current mapbox centre, zoom and corner coordinates"""
+    relayout_data = relayout_data or {}
+    keys = {'mapbox.center': 'center', 'mapbox.zoom': 'zoom', 'mapbox._derived': 'derived'}
+    if not any(key in relayout_data for key in keys):
+        return no_update
+
+    viewport = dict(viewport or initial_viewport())
+    for key, name in keys.items():
+        if key in relayout_data:
+            viewport[name] = relayout_data[key]
+    return viewport
 
-    if max_points == 3:  
-        return update_crime_traces(create_initial_figure(), max_points)
 
-    try:
-        current_fig = create_initial_figure()
-        return update_crime_traces(current_fig, max_points)
-    except Exception as e:
-        print(f"Update error: {e}")
-        return update_crime_traces(create_initial_figure(), max_points)
+@callback(
+    Output('crime-map', 'figure', allow_duplicate=True),
+    Output('map-geometry-level', 'data'),
+    Input('map-viewport', 'data'),
+    State('map-geometry-level', 'data'),
+    prevent_initial_call=True
+)
+def update_map_geometry(viewport, current_level):
+    """Swap the district outlines for the level of detail matching the zoom"""
+    zoom = (viewport or {}).get('zoom')
+    if zoom is None:
+        return no_update, no_update
+
+    level = geometry_manager.get_level_for_zoom(zoom)
+    if level == current_level:
+        return no_update, no_update
 
+    patched_fig = Patch()
+    patched_fig["data"][0]["geojson"] = geometry_manager.get_simplified_geojson(_get_montreal_json_path(), level)
+    return patched_fig, level
@@ -1,8 +1,12 @@
 from dash import html, dcc, callback, Input, Output, dash_table
+from collections import OrderedDict
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 from data_manager import data_manager
+from callback_cache import memoize
+import background_jobs
+from serialization import decode, encode
+import metrics
 
 def create_pdq_dimension_table():
     """
@@ -54,13 +58,74 @@ def create_pdq_dimension_table():
     return pd.DataFrame.from_dict(pdq_data, orient='index').reset_index().\
            rename(columns={'index': 'PDQ'})
 
+_pdq_dimension_table = None
+_cached_summary = {}
+_cached_figures = OrderedDict()
+MAX_CACHED_FIGURES = 64
+
+def get_pdq_dimension_table():
+    """
+    Dimension table built once and shared (treat as read-only)
+    """
+    global _pdq_dimension_table
+    if _pdq_dimension_table is None:
+        _pdq_dimension_table = create_pdq_dimension_table()
+    return _pdq_dimension_table
+
+def get_pdq_year_summary():
+    """
+    One row per (PDQ, YEAR): crime count, dominant crime type and PDQ info,
+    computed in a single groupby and cached per data version
+    """
+    data_version = data_manager.get_data_version()
+    if data_version in _cached_summary:
+        return _cached_summary[data_version]
+
+    summary = background_jobs.get_artifact("viz4.summary")
+    if summary is not None:
+        _cached_summary.clear()
+        _cached_summary[data_version] = summary
+        return summary
+
+    df = data_manager.get_data_for_viz4()
+
+    # sort=False keeps first-appearance order, so ties resolve like value_counts()
+    counts = (
+        df.groupby(['PDQ', 'YEAR', 'CrimeType'], observed=True, sort=False)
+          .size()
+          .reset_index(name='count')
+    )
+    totals = counts.groupby(['PDQ', 'YEAR'])['count'].sum().rename('crimes_this_year')
+    dominant = (
+        counts.sort_values(['PDQ', 'YEAR', 'count'], ascending=[True, True, False], kind='stable')
+              .drop_duplicates(['PDQ', 'YEAR'])
+              .set_index(['PDQ', 'YEAR'])['CrimeType']
+              .astype(object)
+              .rename('dominant_crime')
+    )
+
+    summary = pd.concat([totals, dominant], axis=1).reset_index()
+    summary = summary.merge(get_pdq_dimension_table(), on='PDQ', how='left')
+
+    # Integer PDQ numbers: the row loop formatted the float column ("PDQ 22.0")
+    pdq_label = "PDQ " + summary['PDQ'].astype(int).astype(str)
+    summary['PDQ_Info'] = pdq_label.where(
+        summary['area'].isna(),
+        pdq_label + " - " + summary['area'] + " (" + summary['type'] + "): " + summary['description']
+    )
+    summary = summary[['YEAR', 'PDQ', 'PDQ_Info', 'crimes_this_year', 'dominant_crime', 'district']]
+
+    _cached_summary.clear()
+    _cached_summary[data_version] = summary
+    background_jobs.set_artifact("viz4.summary", summary, data_version=data_version)
+    return summary
+
 def layout():
     try:
-        df = data_manager.get_data_for_viz4()
-        df['YEAR'] = df['DATE'].dt.year
-        pdq_dim = create_pdq_dimension_table()
+        summary = get_pdq_year_summary()
+        pdq_dim = get_pdq_dimension_table()
         
-        years = [int(year) for year in sorted(df['YEAR'].unique())]
+        years = [int(year) for year in sorted(summary['YEAR'].unique())]
         districts = sorted(pdq_dim['district'].unique())
         
     except Exception:
@@ -97,7 +162,8 @@ def layout():
             ], style={'width': '48%', 'display': 'inline-block'})
         ], style={'background-color': '#f8f9fa', 'padding': '20px', 'border-radius': '10px', 'margin-bottom': '20px'}),
         
-        dcc.Graph(id='crime-scatter-plot', figure=create_scatter_plot()),
+        # Filled by update_scatter_plot on first render
+        dcc.Loading(dcc.Graph(id='crime-scatter-plot'), type="default"),
         
         html.Div([
             html.H4("PDQ (Police District) Reference Guide", style={'margin-top': '40px'}),
@@ -118,14 +184,34 @@ def update_pdq_table(selected_districts):
     [Input('year-filter', 'value'),
      Input('district-filter', 'value')]
 )
+@memoize("update_scatter_plot")
 def update_scatter_plot(year_range, selected_districts):
-    return create_scatter_plot(year_range, selected_districts)
+    return get_scatter_figure(year_range, selected_districts)
+
+def get_scatter_figure(year_range=None, selected_districts=None):
+    """
+    Scatter figure as plain JSON, cached per data version and filter values (LRU-bounded)
+    """
+    cache_key = (
+        data_manager.get_data_version(),
+        tuple(year_range) if year_range else None,
+        tuple(sorted(selected_districts)) if selected_districts else None
+    )
+    metrics.record_cache("viz4_figure", cache_key in _cached_figures)
+    if cache_key in _cached_figures:
+        _cached_figures.move_to_end(cache_key)
+        return _cached_figures[cache_key]
+
+    _cached_figures[cache_key] = decode(encode(create_scatter_plot(year_range, selected_districts)))
+    if len(_cached_figures) > MAX_CACHED_FIGURES:
+        _cached_figures.popitem(last=False)
+    return _cached_figures[cache_key]
 
 def create_pdq_table(selected_districts=None):
     """
     Create a formatted table showing PDQ information - now interactive
     """
-    pdq_dim = create_pdq_dimension_table()
+    pdq_dim = get_pdq_dimension_table()
     
     if selected_districts:
         pdq_dim = pdq_dim[pdq_dim['district'].isin(selected_districts)]
@@ -157,51 +243,18 @@ def create_scatter_plot(year_range=None, selected_districts=None):
     Create the scatter plot figure with enhanced PDQ information
     YOUR ORIGINAL FUNCTION - just added filtering parameters
     """
+    import plotly.express as px
+
     try:
-        df = data_manager.get_data_for_viz4()
-        df['YEAR'] = df['DATE'].dt.year
+        scatter_df = get_pdq_year_summary()
         
         if year_range:
-            df = df[(df['YEAR'] >= year_range[0]) & (df['YEAR'] <= year_range[1])]
+            scatter_df = scatter_df[scatter_df['YEAR'].between(year_range[0], year_range[1])]
         
         if selected_districts:
-            pdq_dim = create_pdq_dimension_table()
-            district_pdqs = pdq_dim[pdq_dim['district'].isin(selected_districts)]['PDQ'].tolist()
-            df = df[df['PDQ'].isin(district_pdqs)]
-            
-        pdq_dim = create_pdq_dimension_table()
-        
-        scatter_data = []
-        
-        pdq_dim = create_pdq_dimension_table()
-        
-        for pdq in df['PDQ'].unique():
-            pdq_data = df[df['PDQ'] == pdq]
-            
-            pdq_info = pdq_dim[pdq_dim['PDQ'] == pdq]
-            if not pdq_info.empty:
-                area = pdq_info.iloc[0]['area']
-                area_type = pdq_info.iloc[0]['type']
-                description = pdq_info.iloc[0]['description']
-                pdq_tooltip = f"PDQ {pdq} - {area} ({area_type}): {description}"
-            else:
-                pdq_tooltip = f"PDQ {pdq}"
-            
-            for year in pdq_data['YEAR'].unique():
-                year_data = pdq_data[pdq_data['YEAR'] == year]
-                crime_counts = year_data['CATEGORIE'].value_counts()
-                dominant_crime = crime_counts.index[0] if len(crime_counts) > 0 else 'Unknown'
-                crimes_this_year = len(year_data)
-                
-                scatter_data.append({
-                    'YEAR': year,
-                    'PDQ': pdq,
-                    'PDQ_Info': pdq_tooltip,  
-                    'crimes_this_year': crimes_this_year,
-                    'dominant_crime': dominant_crime
-                })
+            scatter_df = scatter_df[scatter_df['district'].isin(selected_districts)]
         
-        scatter_df = pd.DataFrame(scatter_data)
+        scatter_df = scatter_df.copy()
         scatter_df['opacity'] = 0.7
         
         fig = px.scatter(
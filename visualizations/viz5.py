@@ -1,67 +1,113 @@
+from collections import OrderedDict
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
-from dash import html, dcc
+from dash import html, dcc, callback, Input, Output
 from data_manager import data_manager
+from visualizations.viz2 import pdq_names
+from serialization import decode, encode
+import metrics
+import background_jobs
 
+_cached_cube = {}
+_cached_figures = OrderedDict()
+MAX_CACHED_FIGURES = 64
 
-def get_season(m):
-    return (
-        "Winter" if m in [12, 1, 2] else
-        "Spring" if m in [3, 4, 5] else
-        "Summer" if m in [6, 7, 8] else
-        "Fall"
-    )
 
 def get_processed_data():
     """Obtient et traite les données pour viz5 avec mise en cache"""
     df = data_manager.get_data_for_viz5()
-    
-    
-    df = df.rename(columns={
-        "CATEGORIE": "CrimeType",
-        "LONGITUDE": "Longitude",
-        "LATITUDE": "Latitude"
-    })
-    
-   
     df = df.dropna(subset=["DATE"])
-    df["Month"] = df["DATE"].dt.month
-    df["Season"] = df["Month"].apply(get_season)
-    df["CrimeType"] = df["CrimeType"].str.strip().str.lower().str.title()
-
-  
-    time_translation = {
-        "Jour": "Day",
-        "Soir": "Evening",
-        "Nuit": "Night"
-    }
 
-    crime_translation = {
-        "Vol De Véhicule À Moteur": "Motor Vehicle Theft",
-        "Méfait": "Mischief",
-        "Vol Dans / Sur Véhicule À Moteur": "Theft From/In Motor Vehicle",
-        "Introduction": "Breaking And Entering",
-        "Vols Qualifiés": "Robbery",
-        "Infractions Entrainant La Mort": "Offences Causing Death"
+    # CrimeType, Shift and SEASON are canonical columns prepared by the data manager
+    return df
+
+def _codes(values, categories=None):
+    categorical = pd.Categorical(values, categories=categories)
+    return categorical.codes.astype(np.int64), list(categorical.categories)
+
+def get_count_cube():
+    """
+    Incident counts per (PDQ, year, crime type, shift, season), built once per data version
+
+    PDQ and shift keep an extra last slot for missing values so that
+    unfiltered totals match the whole dataset.
+    """
+    data_version = data_manager.get_data_version()
+    if data_version in _cached_cube:
+        return _cached_cube[data_version]
+
+    cube = background_jobs.get_artifact("viz5.cube")
+    if cube is not None:
+        _cached_cube.clear()
+        _cached_cube[data_version] = cube
+        return cube
+
+    df = get_processed_data().dropna(subset=["CrimeType"])
+
+    pdq_codes, pdqs = _codes(df["PDQ"])
+    year_codes, years = _codes(df["YEAR"])
+    crime_codes, crime_types = _codes(df["CrimeType"].astype(str), sorted(df["CrimeType"].dropna().unique()))
+    shift_codes, shifts = _codes(df["Shift"].astype(object), sorted(df["Shift"].dropna().unique()))
+    season_codes, seasons = _codes(df["SEASON"], sorted(df["SEASON"].dropna().unique()))
+
+    pdq_codes[pdq_codes < 0] = len(pdqs)
+    shift_codes[shift_codes < 0] = len(shifts)
+
+    shape = (len(pdqs) + 1, len(years), len(crime_types), len(shifts) + 1, len(seasons))
+    flat = np.ravel_multi_index((pdq_codes, year_codes, crime_codes, shift_codes, season_codes), shape)
+    counts = np.bincount(flat, minlength=int(np.prod(shape))).reshape(shape)
+
+    cube = {
+        'counts': counts,
+        'pdqs': pdqs,
+        'years': [int(year) for year in years],
+        'crime_types': crime_types,
+        'shifts': shifts,
+        'seasons': seasons
     }
+    _cached_cube.clear()
+    _cached_cube[data_version] = cube
+    background_jobs.set_artifact("viz5.cube", cube, data_version=data_version)
+    return cube
 
-    df["QUART"] = df["QUART"].str.strip().str.capitalize().map(time_translation)
-    df["CrimeType"] = df["CrimeType"].map(crime_translation).fillna(df["CrimeType"])
-    
-    return df
+def _matrix(counts, index, columns):
+    frame = pd.DataFrame(counts, index=pd.Index(index, name="CrimeType"), columns=columns)
+    return frame.loc[frame.sum(axis=1) > 0, frame.sum(axis=0) > 0]
 
-def get_heatmap_data():
-    """Calcule les données pour les heatmaps avec mise en cache"""
-    df = get_processed_data()
-    
-    heat_time = df.groupby(["CrimeType", "QUART"]).size().unstack(fill_value=0)
-    heat_season = df.groupby(["CrimeType", "Season"]).size().unstack(fill_value=0)
-    heat_year = df.groupby(["CrimeType", "YEAR"]).size().unstack(fill_value=0)
+def get_heatmap_data(pdq=None, year_range=None):
+    """
+    Matrices crime type x shift, season and year, obtenues en sommant des
+    tranches du cube pré-agrégé
+
+    Args:
+        pdq: Numéro PDQ à garder (None pour tous)
+        year_range: Années (début, fin) incluses (None pour toutes)
+    """
+    cube = get_count_cube()
+    counts = cube['counts']
+
+    if pdq is not None:
+        pdq_index = [i for i, p in enumerate(cube['pdqs']) if p == pdq]
+        counts = counts[pdq_index]
+
+    years = np.array(cube['years'])
+    year_mask = np.ones(len(years), dtype=bool)
+    if year_range is not None:
+        year_mask = (years >= year_range[0]) & (years <= year_range[1])
+    counts = counts[:, year_mask]
+
+    by_year = counts.sum(axis=(0, 3, 4))          # year x crime
+    by_crime = counts.sum(axis=(0, 1))            # crime x shift x season
+
+    heat_time = _matrix(by_crime.sum(axis=2)[:, :-1], cube['crime_types'], pd.Index(cube['shifts'], name="Shift"))
+    heat_season = _matrix(by_crime.sum(axis=1), cube['crime_types'], pd.Index(cube['seasons'], name="Season"))
+    heat_year = _matrix(by_year.T, cube['crime_types'], pd.Index(years[year_mask], name="YEAR"))
     
     return heat_time, heat_season, heat_year
 
-def layout():
-    heat_time, heat_season, heat_year = get_heatmap_data()
+def create_heatmap_figure(pdq=None, year_range=None):
+    heat_time, heat_season, heat_year = get_heatmap_data(pdq, year_range)
     
     fig = go.Figure()
 
@@ -134,9 +180,63 @@ def layout():
     ]
 )
 
+    return fig
+
+def get_heatmap_figure(pdq=None, year_range=None):
+    """Heatmap figure as plain JSON, cached per data version and filter values (LRU-bounded)"""
+    cache_key = (
+        data_manager.get_data_version(),
+        pdq,
+        tuple(year_range) if year_range else None
+    )
+    metrics.record_cache("viz5_figure", cache_key in _cached_figures)
+    if cache_key in _cached_figures:
+        _cached_figures.move_to_end(cache_key)
+        return _cached_figures[cache_key]
+
+    _cached_figures[cache_key] = decode(encode(create_heatmap_figure(pdq, year_range)))
+    if len(_cached_figures) > MAX_CACHED_FIGURES:
+        _cached_figures.popitem(last=False)
+    return _cached_figures[cache_key]
+
+def layout():
+    cube = get_count_cube()
+    start_year, end_year = min(cube['years']), max(cube['years'])
+    pdq_options = [{'label': 'All PDQs', 'value': 'All'}] + [
+        {'label': f"{int(p)} – {pdq_names.get(p, f'PDQ {int(p)}')}", 'value': p}
+        for p in cube['pdqs']
+    ]
+
     return html.Div([
         html.H3("Crime Heatmap Analysis"),
         html.P("Interactive heatmaps showing crime patterns across different time dimensions. Use the buttons above the chart to switch between views."),
-        dcc.Graph(figure=fig)
+
+        html.Div([
+            html.Label("Select PDQ:"),
+            dcc.Dropdown(id='viz5-pdq-dropdown', options=pdq_options, value='All', clearable=False)
+        ], style={'width': '40%', 'display': 'inline-block'}),
+
+        html.Div([
+            html.Label("Select Year Range:"),
+            dcc.RangeSlider(
+                id='viz5-year-slider',
+                min=start_year,
+                max=end_year,
+                step=1,
+                value=[start_year, end_year],
+                marks={year: str(year) for year in range(start_year, end_year + 1)}
+            )
+        ], style={'marginTop': 20}),
+
+        # Filled by update_heatmap on first render
+        dcc.Loading(dcc.Graph(id='viz5-heatmap'), type="default")
     ])
 
+@callback(
+    Output('viz5-heatmap', 'figure'),
+    Input('viz5-pdq-dropdown', 'value'),
+    Input('viz5-year-slider', 'value')
+)
+def update_heatmap(selected_pdq, selected_years):
+    pdq = None if selected_pdq == "All" else selected_pdq
+    return get_heatmap_figure(pdq, selected_years)